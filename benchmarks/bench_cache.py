@@ -0,0 +1,61 @@
+"""
+Compares the OP cache backends on a synthetic dataset: cold start (open and
+first lookup), lookup latency and process memory growth.
+
+Usage: python -m benchmarks.bench_cache [ops] [json|sqlite|binary ...]
+"""
+
+import gc
+import pathlib
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+from benchmarks.synthetic import synthetic_export_html
+from src.core.binary_cache import BinaryOrderCache
+from src.core.export_parser import parse_export_text
+from src.core.order_cache import OrderCache
+from src.core.order_store import SqliteOrderStore
+
+BACKENDS = {"json": OrderCache, "sqlite": SqliteOrderStore, "binary": BinaryOrderCache}
+LOOKUPS = 10000
+
+
+def run(ops_count: int, backends) -> None:
+    ops = parse_export_text(synthetic_export_html(ops_count))
+    codes = list(ops)
+    rng = random.Random(1)
+    probes = [rng.choice(codes) for _ in range(LOOKUPS)]
+    print(f"--- {len(ops)} OPs ---")
+
+    for name in backends:
+        folder = pathlib.Path(tempfile.mkdtemp(prefix=f"bench_cache_{name}_"))
+        BACKENDS[name](folder).apply(ops, (), date.today(), date.today())
+        gc.collect()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        snapshot = BACKENDS[name](folder).snapshot()
+        snapshot.get(probes[0])
+        cold = time.perf_counter() - start
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for code in probes:
+            snapshot.get(code)
+        per_lookup = (time.perf_counter() - start) / LOOKUPS
+
+        print(
+            f"{name:>7}: cold start {cold * 1000:8.1f} ms  "
+            f"lookup {per_lookup * 1e6:6.1f} us  "
+            f"retained {retained / 1024 / 1024:6.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    run(count, sys.argv[2:] or list(BACKENDS))
@@ -0,0 +1,104 @@
+"""
+Renders the shipping labels of a synthetic OP in every output format and
+reports the time per job (rendered in memory, then with the files written),
+the output size and, for the 1-bit PNG mode, how many pixels differ from the
+RGB labels thresholded to black and white.
+With `workers` > 1 the MWM labels are also rendered on a LabelRenderPool.
+
+Usage: python -m benchmarks.bench_labels [boxes] [workers]
+"""
+
+import pathlib
+import sys
+import tempfile
+import time
+from datetime import datetime as dt
+
+from PIL import Image, ImageChops
+
+from src.models.schema import OrdemDeProducao
+from src.utils import labels
+from src.utils.labels import LabelRenderPool, ShippingLabelGenerator
+
+FORMATS = ("", "mono", "zpl", "pdf")
+FIXED_DATE = dt(2026, 1, 15, 8, 0)
+
+
+def _op(material_code: str, boxes: int) -> OrdemDeProducao:
+    return OrdemDeProducao(
+        code=123456,
+        material_code=material_code,
+        client="TRUCKS CONTROL INDUSTRIA LTDA",
+        description="CHICOTE ELETRICO 12 VIAS COM CONECTOR (TRUCKS: TC-100)",
+        quantity=boxes * 10,
+        box_count=boxes,
+        weight="1.5",
+    )
+
+
+def _render(op: OrdemDeProducao, output_format: str, pool=None) -> tuple:
+    # Formats share file names, each one renders into its own folder
+    labels.LABELS_FOLDER = pathlib.Path(tempfile.mkdtemp())
+    generator = ShippingLabelGenerator(op, output_format, pool)
+    generator.is_linux = True
+    generator.today_date = FIXED_DATE
+    start = time.perf_counter()
+    success, error, documents = generator.render()
+    rendered = time.perf_counter() - start
+    if not success:
+        raise SystemExit(f"Rendering failed: {error}")
+    paths = generator.save(documents)
+    elapsed = time.perf_counter() - start
+    return paths, rendered, elapsed
+
+
+def _thresholded(path: str) -> Image.Image:
+    return Image.open(path).convert("L").point(lambda value: 255 if value >= 128 else 0)
+
+
+def _files(paths: list) -> list:
+    return [(pathlib.Path(path).name, pathlib.Path(path).read_bytes()) for path in paths]
+
+
+def run(boxes: int, workers: int = 1) -> None:
+    for material_code in ("PA12345", "MWM-99"):
+        op = _op(material_code, boxes)
+        print(f"--- {material_code}, {boxes} boxes ---")
+        rendered = {}
+        for output_format in FORMATS:
+            paths, in_memory, elapsed = _render(op, output_format)
+            rendered[output_format] = paths
+            size = sum(pathlib.Path(path).stat().st_size for path in paths)
+            print(
+                f"{output_format or 'rgb':>6}: {in_memory * 1000:8.1f} ms in memory  "
+                f"{elapsed * 1000:8.1f} ms with files  "
+                f"{elapsed * 1000 / boxes:6.2f} ms/box  {len(paths):4d} files  "
+                f"{size / boxes / 1024:7.2f} KiB/box"
+            )
+
+        rgb, mono = _thresholded(rendered[""][0]), _thresholded(rendered["mono"][0])
+        diff = ImageChops.difference(rgb, mono)
+        pixels = diff.width * diff.height
+        changed = pixels - diff.histogram()[0]
+        print(f"  mono vs thresholded rgb: {changed} of {pixels} pixels differ ({changed / pixels:.2%})")
+
+        if workers > 1 and material_code.startswith("MWM"):
+            pool = LabelRenderPool(workers=workers, min_boxes=1)
+            pool.warm_up()
+            try:
+                _render(_op(material_code, 1), "", pool)
+                paths, _, elapsed = _render(op, "", pool)
+            finally:
+                pool.shutdown()
+            same = _files(paths) == _files(rendered[""])
+            print(
+                f"   rgb x{workers}: {elapsed * 1000:8.1f} ms  {elapsed * 1000 / boxes:6.2f} ms/box  "
+                f"identical to sequential: {same}"
+            )
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1,
+    )
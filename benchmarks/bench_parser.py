@@ -0,0 +1,78 @@
+"""
+Compares the BeautifulSoup tree parser, the streaming parser and the process
+pool parser on synthetic 10k/50k-row exports.
+
+Usage: python -m benchmarks.bench_parser [rows ...]
+"""
+
+import asyncio
+import sys
+import time
+import tracemalloc
+
+from benchmarks.synthetic import synthetic_export_html
+from src.core.export_parser import (
+    ParallelExportParser,
+    parse_export_chunks,
+    parse_export_html,
+)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _measure(func, make_args):
+    """
+    Runs `func` twice: once timed and once under tracemalloc (which slows it down).
+    Returns its result, elapsed seconds and peak traced memory.
+    """
+    start = time.perf_counter()
+    result = func(*make_args())
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(*make_args())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _chunks(payload: bytes):
+    for i in range(0, len(payload), CHUNK_SIZE):
+        yield payload[i : i + CHUNK_SIZE]
+
+
+def run(rows: int) -> None:
+    html = synthetic_export_html(rows)
+    payload = html.encode("utf-8")
+    print(f"--- {rows} rows ({len(payload) / 1024 / 1024:.1f} MiB) ---")
+
+    tree_ops, tree_s, tree_peak = _measure(parse_export_html, lambda: (html,))
+    stream_ops, stream_s, stream_peak = _measure(
+        parse_export_chunks, lambda: (_chunks(payload),)
+    )
+
+    pool = ParallelExportParser()
+    # Start the workers before timing so the measurement covers the parse only
+    asyncio.run(pool.parse(html))
+    start = time.perf_counter()
+    pool_ops = asyncio.run(pool.parse(html))
+    pool_s = time.perf_counter() - start
+    pool.shutdown()
+
+    for name, ops, elapsed, peak in (
+        ("tree", tree_ops, tree_s, tree_peak),
+        ("stream", stream_ops, stream_s, stream_peak),
+        (f"pool/{pool.workers}", pool_ops, pool_s, None),
+    ):
+        peak_text = f"peak {peak / 1024 / 1024:7.1f} MiB" if peak is not None else " " * 17
+        print(
+            f"{name:>7}: {elapsed:7.2f} s  {rows / elapsed:9.0f} rows/s  "
+            f"{peak_text}  ({len(ops)} OPs)"
+        )
+
+    print(f"identical output: {tree_ops == stream_ops == pool_ops}")
+
+
+if __name__ == "__main__":
+    for size in [int(arg) for arg in sys.argv[1:]] or [10_000, 50_000]:
+        run(size)
@@ -0,0 +1,76 @@
+"""
+Compares the in-memory representation and codec of the JSON OP cache:
+dict-of-dicts loaded with json (the original format) against the columnar
+OpTable format (orjson when installed, json otherwise).
+
+Usage: python -m benchmarks.bench_records [ops]
+"""
+
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from benchmarks.synthetic import synthetic_export_html
+from src.core import op_records
+from src.core.export_parser import parse_export_text
+from src.core.op_records import decode_ops, encode_ops
+
+# Distinct products in the synthetic dataset; real plants repeat products a lot
+PRODUCTS = 2000
+
+
+def _legacy_load(data: bytes) -> dict:
+    return {int(k): v for k, v in json.loads(data).items()}
+
+
+def _legacy_save(ops: dict) -> bytes:
+    return json.dumps(ops, indent=4, ensure_ascii=False).encode("utf-8")
+
+
+LOOKUPS = 10000
+
+
+def _measure(name: str, save, load, ops: dict) -> None:
+    start = time.perf_counter()
+    data = save(ops)
+    save_time = time.perf_counter() - start
+
+    gc.collect()
+    start = time.perf_counter()
+    loaded = load(data)
+    load_time = time.perf_counter() - start
+
+    probes = random.Random(1).choices(list(ops), k=LOOKUPS)
+    start = time.perf_counter()
+    for code in probes:
+        loaded[code].get("client")
+    lookup_time = (time.perf_counter() - start) / LOOKUPS
+    del loaded
+
+    # Memory is measured on a separate run, tracemalloc slows the decoding down
+    gc.collect()
+    tracemalloc.start()
+    loaded = load(data)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{name:>22}: save {save_time * 1000:7.1f} ms  load {load_time * 1000:7.1f} ms  "
+        f"lookup {lookup_time * 1e6:5.2f} us  file {len(data) / 1024 / 1024:6.1f} MiB  "
+        f"memory {retained / len(loaded):6.0f} B/OP"
+    )
+
+
+def run(ops_count: int) -> None:
+    ops = parse_export_text(synthetic_export_html(ops_count, products=PRODUCTS))
+    codec = "orjson" if op_records.orjson is not None else "json"
+    print(f"--- {len(ops)} OPs, {PRODUCTS} products ---")
+    _measure("dict-of-dicts (json)", _legacy_save, _legacy_load, ops)
+    _measure(f"OpTable ({codec})", encode_ops, decode_ops, ops)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
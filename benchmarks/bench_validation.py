@@ -0,0 +1,72 @@
+"""
+Compares the validation of export rows: one OrdemDeProducao plus
+`model_dump()` per row (the original path) against the batched
+`validate_op_rows`, on cells extracted beforehand from a synthetic export.
+
+Usage: python -m benchmarks.bench_validation [rows ...]
+"""
+
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from benchmarks.synthetic import synthetic_export_html
+from src.core.export_parser import parse_export_text, row_to_op, row_to_values
+from src.models.schema import validate_op_rows
+
+ROUNDS = 3
+
+
+def _export_cells(html_content: str) -> list:
+    soup = BeautifulSoup(html_content, "html.parser")
+    return [
+        [td.get_text(separator="", strip=True) for td in tr.find_all("td")]
+        for tr in soup.find_all("tr")[1:]
+    ]
+
+
+def _per_row(cells: list) -> dict:
+    ops_dict = {}
+    for row_cells in cells:
+        op = row_to_op(row_cells)
+        if op is not None:
+            ops_dict[op.code] = op.model_dump()
+    return ops_dict
+
+
+def _batched(cells: list) -> dict:
+    rows = [row for row in map(row_to_values, cells) if row is not None]
+    return {op["code"]: op for op in validate_op_rows(rows)}
+
+
+def _best_time(func, arg) -> tuple:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def run(rows: int) -> None:
+    html_content = synthetic_export_html(rows)
+    cells = _export_cells(html_content)
+    print(f"--- {rows} rows ---")
+
+    results = []
+    for name, func in (("per-row model_dump", _per_row), ("validate_op_rows", _batched)):
+        result, elapsed = _best_time(func, cells)
+        results.append(result)
+        print(f"{name:>20}: {elapsed * 1000:8.1f} ms  {len(result) / elapsed:10,.0f} rows/s")
+
+    _, elapsed = _best_time(parse_export_text, html_content)
+    print(f"{'parse_export_text':>20}: {elapsed * 1000:8.1f} ms  {rows / elapsed:10,.0f} rows/s")
+
+    if results[0] != results[1]:
+        raise SystemExit("Batched validation does not match the per-row results.")
+
+
+if __name__ == "__main__":
+    for rows in [int(arg) for arg in sys.argv[1:]] or [10000, 50000]:
+        run(rows)
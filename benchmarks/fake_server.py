@@ -0,0 +1,221 @@
+"""
+Local stand-in for the CargaMaquina server, built on aiohttp.
+Serves the CSRF login page, the login POST and 'exportarOrdens' with synthetic
+orders, with configurable size, latency and failure rate.
+
+Usage: python -m benchmarks.fake_server [--rows 50000] [--port 8080]
+       [--latency 0.2] [--failure-rate 0.0]
+
+Point the app at it by setting "server_url" in configs.json to
+http://127.0.0.1:<port>/ (any username/password pair from the command line).
+"""
+
+import argparse
+import asyncio
+import random
+import secrets
+from datetime import date, datetime as dt, timedelta
+from typing import List, Optional
+
+from aiohttp import web
+
+from benchmarks.synthetic import HEADER_ROW, synthetic_row
+
+LOGIN_CODE = "lanx"
+SESSION_COOKIE = "PHPSESSID"
+STREAM_ROWS = 500
+
+LOGIN_PAGE = """<html><body>
+<form id="login-form" action="/site/login/c/{code}" method="post">
+<input type="hidden" value="{csrf}" name="YII_CSRF_TOKEN" />
+<input name="LoginForm[username]" type="text" />
+<input name="LoginForm[password]" type="password" />
+<input name="LoginForm[codigoConexao]" type="hidden" value="{code}" />
+<input type="submit" name="yt0" value="Entrar" />
+</form></body></html>"""
+
+
+class SyntheticOrder:
+    """One synthetic OP with the dates the export can be filtered by."""
+
+    __slots__ = ("code", "delivery", "created", "row")
+
+    def __init__(self, code: int, delivery: date, created: date, row: str) -> None:
+        self.code = code
+        self.delivery = delivery
+        self.created = created
+        self.row = row
+
+
+def _parse_date(value: str) -> Optional[date]:
+    return dt.strptime(value, "%d/%m/%Y").date() if value else None
+
+
+class FakeCargaMaquina:
+    """
+    In-memory CargaMaquina stand-in.
+
+    Attributes:
+        latency (float): Seconds added before every response.
+        failure_rate (float): Probability of answering an export with HTTP 500.
+        requests (int): Number of export requests served.
+    """
+
+    def __init__(
+        self,
+        rows: int = 10000,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        username: str = "bench",
+        password: str = "bench",
+        seed: int = 42,
+    ) -> None:
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.username = username
+        self.password = password
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._csrf_tokens = set()
+        self._sessions = set()
+        self.orders: List[SyntheticOrder] = []
+        self.add_orders(rows)
+
+    def add_orders(
+        self, rows: int, created: Optional[date] = None, delivery_days: int = 60
+    ) -> None:
+        """Appends `rows` new OPs, delivered within ±`delivery_days` days of today."""
+        today = date.today()
+        first_code = 100000 + len(self.orders)
+        for code in range(first_code, first_code + rows):
+            delivery = today + timedelta(days=self._rng.randint(-delivery_days, delivery_days))
+            created_on = created or min(
+                today, delivery - timedelta(days=self._rng.randint(0, 30))
+            )
+            self.orders.append(
+                SyntheticOrder(code, delivery, created_on, synthetic_row(code, self._rng))
+            )
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/", self.handle_root)
+        app.router.add_get("/site/login/c/{code}", self.handle_login_page)
+        app.router.add_post("/site/login/c/{code}", self.handle_login)
+        app.router.add_get("/site/index", self.handle_index)
+        app.router.add_get("/ordemProducao/exportarOrdens", self.handle_export)
+        return app
+
+    async def _delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _login_page(self) -> web.Response:
+        csrf = secrets.token_hex(16)
+        self._csrf_tokens.add(csrf)
+        return web.Response(
+            text=LOGIN_PAGE.format(code=LOGIN_CODE, csrf=csrf), content_type="text/html"
+        )
+
+    async def handle_root(self, request: web.Request) -> web.Response:
+        raise web.HTTPFound(f"/site/login/c/{LOGIN_CODE}")
+
+    async def handle_login_page(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return self._login_page()
+
+    async def handle_login(self, request: web.Request) -> web.Response:
+        await self._delay()
+        form = await request.post()
+        valid = (
+            form.get("YII_CSRF_TOKEN") in self._csrf_tokens
+            and form.get("LoginForm[username]") == self.username
+            and form.get("LoginForm[password]") == self.password
+        )
+        if not valid:
+            return self._login_page()
+
+        session_id = secrets.token_hex(16)
+        self._sessions.add(session_id)
+        response = web.HTTPFound("/site/index")
+        response.set_cookie(SESSION_COOKIE, session_id)
+        raise response
+
+    async def handle_index(self, request: web.Request) -> web.Response:
+        return web.Response(text="<html><body>Painel</body></html>", content_type="text/html")
+
+    async def handle_export(self, request: web.Request) -> web.StreamResponse:
+        await self._delay()
+        if request.cookies.get(SESSION_COOKIE) not in self._sessions:
+            # The real server answers unauthenticated requests with the login page
+            return self._login_page()
+
+        self.requests += 1
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise web.HTTPInternalServerError(text="Synthetic failure")
+
+        query = request.query
+        code = query.get("OrdemProducao[codigo]", "")
+        delivery_from = _parse_date(query.get("OrdemProducao[_inicioEntrega]", ""))
+        delivery_to = _parse_date(query.get("OrdemProducao[_fimEntrega]", ""))
+        created_from = _parse_date(query.get("OrdemProducao[_inicioCriacao]", ""))
+        created_to = _parse_date(query.get("OrdemProducao[_fimCriacao]", ""))
+        page_size = int(query.get("pageSize", "10000"))
+
+        def matches(order: SyntheticOrder) -> bool:
+            return (
+                (not code or code in str(order.code))
+                and (delivery_from is None or order.delivery >= delivery_from)
+                and (delivery_to is None or order.delivery <= delivery_to)
+                and (created_from is None or order.created >= created_from)
+                and (created_to is None or order.created <= created_to)
+            )
+
+        selected = [order for order in self.orders if matches(order)][:page_size]
+
+        response = web.StreamResponse()
+        response.content_type = "text/html"
+        response.charset = "utf-8"
+        await response.prepare(request)
+        await response.write(("<html><body><table>\n" + HEADER_ROW).encode("utf-8"))
+        for index in range(0, len(selected), STREAM_ROWS):
+            rows = selected[index : index + STREAM_ROWS]
+            await response.write("".join(order.row for order in rows).encode("utf-8"))
+        await response.write(b"</table></body></html>\n")
+        await response.write_eof()
+        return response
+
+
+async def start_server(
+    server: FakeCargaMaquina, host: str = "127.0.0.1", port: int = 0
+) -> tuple:
+    """
+    Starts the stand-in and returns (runner, base_url). Port 0 picks a free port.
+    The URL uses 'localhost' because aiohttp's cookie jar ignores cookies set by
+    bare IP addresses.
+    """
+    runner = web.AppRunner(server.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://localhost:{bound_port}/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--username", default="bench")
+    parser.add_argument("--password", default="bench")
+    args = parser.parse_args()
+
+    fake = FakeCargaMaquina(
+        rows=args.rows,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        username=args.username,
+        password=args.password,
+    )
+    web.run_app(fake.make_app(), host="127.0.0.1", port=args.port)
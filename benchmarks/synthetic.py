@@ -0,0 +1,82 @@
+"""
+Synthetic CargaMaquina data used by the benchmarks.
+Generates 'exportarOrdens' HTML tables shaped like the real export.
+"""
+
+import random
+from typing import Iterator, List, Optional, Tuple
+
+CLIENTS = [
+    "TRUCKS CONTROL INDUSTRIA LTDA",
+    "MWM MOTORES E GERADORES",
+    "METALURGICA SAO JOAO S/A",
+    "AUTOPECAS PAULISTA LTDA",
+    "COMERCIAL ELETRICA BRASIL",
+]
+
+HEADER_ROW = (
+    "<tr><th>Status</th><th>Etapa</th><th>OP</th><th>Cliente</th>"
+    "<th>Material</th><th>Descrição</th><th>Quantidade</th></tr>\n"
+)
+
+
+def synthetic_product(rng: random.Random) -> Tuple[str, str, str]:
+    """Returns a random (client, material, description)."""
+    client = rng.choice(CLIENTS)
+    material = f"PA{rng.randint(10000, 99999)}"
+    if client.startswith("TRUCKS"):
+        client_code = f"TRUCKS: TC-{rng.randint(100, 999)}"
+    else:
+        client_code = f"{rng.randint(1000000, 9999999)}"
+    description = f"CHICOTE ELETRICO {rng.randint(1, 500)} VIAS ({client_code})"
+    return client, material, description
+
+
+def synthetic_row(
+    code: int,
+    rng: random.Random,
+    catalog: Optional[List[Tuple[str, str, str]]] = None,
+) -> str:
+    """
+    Builds one <tr> of the export for the given OP code. With a `catalog`
+    the product is picked from it, as in a plant with recurring products.
+    """
+    if catalog:
+        client, material, description = rng.choice(catalog)
+    else:
+        client, material, description = synthetic_product(rng)
+    quantity = f"{rng.randint(1, 20000):,}".replace(",", ".")
+    return (
+        "<tr>"
+        '<td><span class="label">Liberada</span></td>'
+        "<td>Montagem</td>"
+        f'<td><a href="/ordemProducao/view/{code}">OP-{code}</a></td>'
+        f"<td>{client}</td>"
+        f"<td> {material} </td>"
+        f"<td>{description}</td>"
+        f"<td>{quantity}</td>"
+        "</tr>\n"
+    )
+
+
+def iter_export_html(
+    rows: int, seed: int = 42, first_code: int = 100000, products: int = 0
+) -> Iterator[str]:
+    """
+    Yields the export document piece by piece. `products` > 0 limits the
+    OPs to a catalog of that many products; 0 makes every OP unique.
+    """
+    rng = random.Random(seed)
+    catalog = [synthetic_product(rng) for _ in range(products)]
+    yield "<html><body><table>\n"
+    yield HEADER_ROW
+    for code in range(first_code, first_code + rows):
+        yield synthetic_row(code, rng, catalog)
+    yield "</table></body></html>\n"
+
+
+def synthetic_export_html(
+    rows: int, seed: int = 42, first_code: int = 100000, products: int = 0
+) -> str:
+    """Returns a full export document with `rows` OP rows."""
+    return "".join(iter_export_html(rows, seed, first_code, products))
@@ -4,12 +4,13 @@ import asyncio
 import logging
 from PySide6.QtWidgets import QApplication, QMessageBox, QDialog
 import qasync
-import glob
 
 from src.core.config import ConfigManager
 from src.core.session_manager import SessionManager
+from src.core.order_sync import OrderSyncService
 from src.core.balance import BalanceCommunication
 from src.utils.printer import PrinterManager
+from src.utils.labels import preload_label_fonts
 from src.frontend.interface import ShippingInterface
 from src.frontend.dialogs.login_dialog import LoginDialog
 
@@ -65,19 +66,18 @@ def main() -> None:
     session_manager = SessionManager(config_manager)
     printer_manager = PrinterManager()
     balance = BalanceCommunication()
+    order_sync = OrderSyncService(config_manager, session_manager)
 
-    # If a local orders JSON exists, skip authentication
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    tmp_dir = os.path.join(base_dir, "tmp")
-    orders_files = glob.glob(os.path.join(tmp_dir, "ordens_*.json"))
-
-    if orders_files:
+    # If a fresh local orders cache exists, open the UI right away and let
+    # the background sync authenticate and refresh it. The cache itself is
+    # loaded in a worker thread once the window is shown.
+    order_sync.read_state()
+    if order_sync.is_fresh():
         is_connected = False
-        logging.info(
-            "Found local orders JSON (%s). Skipping authentication.",
-            os.path.basename(orders_files[0]),
-        )
+        logging.info("Local orders cache found. Authenticating in the background.")
     else:
+        if order_sync.synced_at is not None:
+            logging.info("Local orders cache is stale. Authenticating before opening.")
         # Run background startup logic (Login)
         is_connected = loop.run_until_complete(
             startup_logic(config_manager, session_manager)
@@ -89,9 +89,13 @@ def main() -> None:
         printer_manager=printer_manager,
         balance=balance,
         session_manager=session_manager,
+        order_sync=order_sync,
         is_connected=is_connected,
     )
     window.show()
+    preload_label_fonts()
+    order_sync.warm_load()
+    order_sync.start()
 
     app.setQuitOnLastWindowClosed(True)
     with loop:
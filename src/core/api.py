@@ -3,20 +3,32 @@ Module containing functions to retrieve production order data from the CargaMaqu
 Uses Pydantic models for validation and pure aiohttp for headless data extraction.
 """
 
-import json
-import re
+import asyncio
 import pathlib
 import logging
-from datetime import timedelta, datetime as dt
-from typing import Dict, Optional
-from bs4 import BeautifulSoup
+from datetime import date, timedelta, datetime as dt
+from typing import Callable, Dict, Mapping, Optional, Set, Tuple
 
-from src.models.schema import OrdemDeProducao
+from src.core.export_fetch import (
+    ShardedExportFetcher,
+    build_export_params,
+    fetch_op_export,
+)
+from src.core.export_parser import ParallelExportParser, parse_export_html
+from src.core.order_cache import OrderCache
 from src.core.session_manager import SessionManager
+from src.models.schema import SyncState
 
 TMP_PATH = pathlib.Path("./tmp")
 TMP_PATH.mkdir(parents=True, exist_ok=True)
 
+# Delivery window (in days around today) covered by the local cache
+SYNC_WINDOW_DAYS = 50
+# Creation dates are filtered by day, so delta syncs re-read the last day
+DELTA_OVERLAP = timedelta(days=1)
+# Delta syncs cannot see edits or removals of old OPs; a full sync is forced after this
+FULL_SYNC_INTERVAL = timedelta(hours=24)
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
@@ -24,6 +36,30 @@ logging.basicConfig(
 )
 
 
+def save_ops_to_json(
+    ops_dict: Dict[int, dict], start_date: str, end_date: str
+) -> Optional[Dict[int, dict]]:
+    """
+    Saves the parsed OPs to the local JSON cache for the given delivery window.
+    """
+    if not ops_dict:
+        logging.warning("Failed to extract OP data.")
+        return None
+
+    file_path = OrderCache().save(
+        ops_dict,
+        dt.strptime(start_date, "%d/%m/%Y").date(),
+        dt.strptime(end_date, "%d/%m/%Y").date(),
+    )
+    if file_path is None:
+        return None
+
+    logging.info(
+        f"Synchronization complete. Total OPs saved: {len(ops_dict)} at {file_path.name}"
+    )
+    return ops_dict
+
+
 def format_carga_maquina_html_to_pydantic(
     html_content: str, start_date: str, end_date: str
 ) -> Optional[Dict[int, dict]]:
@@ -32,117 +68,164 @@ def format_carga_maquina_html_to_pydantic(
     Pydantic models, and saves them to a JSON file.
     """
     logging.info("Parsing CargaMaquina OP data via BeautifulSoup.")
-    soup = BeautifulSoup(html_content, "html.parser")
+    ops_dict = parse_export_html(html_content)
+    return save_ops_to_json(ops_dict, start_date, end_date)
 
-    ops_dict: Dict[int, dict] = {}
 
-    trs = soup.find_all("tr")
-    if len(trs) <= 1:
-        logging.warning("No OP rows found in the returned HTML.")
-        return None
+def delivery_window(now: Optional[dt] = None) -> Tuple[date, date]:
+    """Returns the delivery window (start, end) synchronized into the cache."""
+    today = (now or dt.now()).date()
+    window = timedelta(days=SYNC_WINDOW_DAYS)
+    return today - window, today + window
 
-    for tr in trs[1:]:
-        tds = tr.find_all("td")
-        if len(tds) < 7:
-            continue
-
-        try:
-            raw_code_text = tds[2].get_text(separator="", strip=True)
-            raw_code = raw_code_text.split("-")[-1]
-            code = int(re.sub(r"\D", "", raw_code))
-
-            client = tds[3].get_text(separator="", strip=True)
-            material_code = tds[4].get_text(separator="", strip=True)
-            description = tds[5].get_text(separator="", strip=True)
-
-            raw_qty = tds[6].get_text(separator="", strip=True).replace(".", "")
-            quantity = int(raw_qty)
-
-            op = OrdemDeProducao(
-                code=code,
-                material_code=material_code,
-                client=client,
-                description=description,
-                quantity=quantity,
-                box_count=1,
-                weight=0,
-            )
 
-            ops_dict[op.code] = op.model_dump()
-
-        except (ValueError, IndexError, AttributeError) as e:
-            continue
+async def get_single_op_data_on_carga_maquina(
+    session_manager: SessionManager, op_number: int
+) -> Optional[Dict[int, dict]]:
+    """
+    Fetches a single OP by its code, regardless of its delivery date.
 
-    if not ops_dict:
-        logging.warning("Failed to extract OP data.")
+    Returns:
+        Optional[Dict[int, dict]]: {op_number: data} if found, an empty dict if
+        the export came back without the OP, or None on failure, including an
+        expired session (the session is then flagged as logged out).
+    """
+    logging.info(f"Fetching OP {op_number} from CargaMaquina...")
+    page = await fetch_op_export(
+        session_manager, build_export_params(code=str(op_number))
+    )
+    if page is None:
         return None
 
-    safe_start = start_date.replace("/", "-")
-    safe_end = end_date.replace("/", "-")
-    file_path = TMP_PATH / f"ordens_{safe_start}_{safe_end}.json"
-
-    try:
-        with open(file_path, "w", encoding="utf-8") as file:
-            json.dump(ops_dict, file, indent=4, ensure_ascii=False)
-        logging.info(
-            f"Synchronization complete. Total OPs saved: {len(ops_dict)} at {file_path.name}"
-        )
-        return ops_dict
-    except IOError as e:
-        logging.error(f"Failed to write local JSON cache: {e}")
-        return None
+    # The code filter may match partially, keep only the exact OP
+    op_data = page.ops.get(op_number)
+    return {op_number: op_data} if op_data else {}
 
 
 async def get_all_op_data_on_carga_maquina(
-    session_manager: SessionManager,
-) -> Optional[Dict[int, dict]]:
+    session_manager: SessionManager, streaming: bool = True
+) -> Optional[Mapping[int, dict]]:
     """
     Fetches production orders data from CargaMaquina using an authenticated HTTP session.
+    Downloads the whole delivery window and replaces the local cache.
     """
-    if not session_manager.session:
-        logging.error("HTTP Session not initialized. Please login first.")
-        return None
+    return await sync_op_data_on_carga_maquina(
+        session_manager, mode="full", streaming=streaming
+    )
 
-    start_date = (dt.now() - timedelta(days=50)).strftime("%d/%m/%Y")
-    end_date = (dt.now() + timedelta(days=50)).strftime("%d/%m/%Y")
-
-    endpoint = f"{session_manager.base_url}/ordemProducao/exportarOrdens"
-
-    headers = {
-        "Accept": "*/*",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": f"{session_manager.base_url}/ordemProducao",
-    }
-    params = {
-        "OrdemProducao[codigo]": "",
-        "OrdemProducao[_nomeCliente]": "",
-        "OrdemProducao[_nomeMaterial]": "",
-        "OrdemProducao[status_op_id]": "Todos",
-        "OrdemProducao[_etapasPlanejadas]": "",
-        "OrdemProducao[forecast]": "0",
-        "OrdemProducao[_inicioCriacao]": "",
-        "OrdemProducao[_fimCriacao]": "",
-        "OrdemProducao[_inicioEntrega]": start_date,
-        "OrdemProducao[_fimEntrega]": end_date,
-        "OrdemProducao[_limparFiltro]": "0",
-        "pageSize": "10000",
-    }
-
-    try:
+
+async def sync_op_data_on_carga_maquina(
+    session_manager: SessionManager,
+    mode: str = "delta",
+    full_sync_interval: timedelta = FULL_SYNC_INTERVAL,
+    streaming: bool = True,
+    shards: int = 1,
+    max_concurrency: int = 4,
+    parse_pool: Optional[ParallelExportParser] = None,
+    cache: Optional[OrderCache] = None,
+    on_apply: Optional[Callable[[Dict[int, dict], Set[int]], None]] = None,
+) -> Optional[Mapping[int, dict]]:
+    """
+    Synchronizes the local OP cache (by default the JSON one in ./tmp) with CargaMaquina.
+
+    In "delta" mode only the slices that can hold new OPs are requested: OPs
+    created since the last sync (high-water mark) and the delivery days that
+    entered the window since then. The results are upserted into the existing
+    cache. A "full" sync downloads the whole window and removes (tombstones)
+    the OPs that are no longer returned; it is used when there is no usable
+    cache or the last full sync is older than `full_sync_interval`.
+
+    Every slice is downloaded through a ShardedExportFetcher, split into
+    `shards` date shards fetched `max_concurrency` at a time. If a shard is
+    truncated by the page size, no tombstones are applied. With a `parse_pool`
+    the downloaded exports are parsed on worker processes. `on_apply` is
+    called with the upserted OPs and the removed codes once they are merged.
+
+    Returns:
+        Optional[Mapping[int, dict]]: The cache snapshot after the merge, or None on failure.
+    """
+    # Cache reads and writes run in worker threads, off the (UI) event loop
+    cache = cache or OrderCache()
+    state = await asyncio.to_thread(cache.load_state)
+
+    sync_started = dt.now()
+    start_date, end_date = delivery_window(sync_started)
+    fetcher = ShardedExportFetcher(
+        session_manager,
+        shards=shards,
+        max_concurrency=max_concurrency,
+        streaming=streaming,
+        parse_pool=parse_pool,
+    )
+
+    is_full = (
+        mode != "delta"
+        or state is None
+        or sync_started - state.last_full_sync > full_sync_interval
+        or state.end_date < start_date
+    )
+    if not is_full:
+        # An empty cache is refilled by a full sync
+        is_full = not await asyncio.to_thread(cache.snapshot)
+
+    if is_full:
         logging.info(
-            f"Starting OP data synchronization ({start_date} to {end_date})..."
+            f"Starting full OP data synchronization ({start_date:%d/%m/%Y} to {end_date:%d/%m/%Y})..."
         )
-
-        async with session_manager.session.get(
-            endpoint, params=params, headers=headers
-        ) as response:
-            response.raise_for_status()
-            html_content = await response.text()
-
-            return format_carga_maquina_html_to_pydantic(
-                html_content, start_date, end_date
+        result = await fetcher.fetch(start_date, end_date)
+        if result is None or not result.ops:
+            logging.warning("Failed to extract OP data.")
+            return None
+
+        fresh = result.ops
+        if result.truncated:
+            logging.warning("Export was truncated, skipping removal of missing OPs.")
+            tombstones = set()
+        else:
+            tombstones = await asyncio.to_thread(cache.codes) - set(fresh)
+        last_full_sync = sync_started
+    else:
+        created_from = (state.last_sync - DELTA_OVERLAP).date()
+        logging.info(
+            f"Starting delta OP data synchronization (created since {created_from:%d/%m/%Y})..."
+        )
+        slices = [
+            (start_date, end_date, created_from, sync_started.date()),
+        ]
+        if end_date > state.end_date:
+            slices.append((state.end_date + timedelta(days=1), end_date, None, None))
+
+        fresh = {}
+        for slice_start, slice_end, slice_created_from, slice_created_to in slices:
+            result = await fetcher.fetch(
+                slice_start, slice_end, slice_created_from, slice_created_to
             )
+            if result is None:
+                return None
+            fresh.update(result.ops)
+
+        tombstones = set()
+        last_full_sync = state.last_full_sync
 
-    except Exception as e:
-        logging.exception(f"Failed to fetch OP data: {e}")
+    report = await asyncio.to_thread(cache.apply, fresh, tombstones, start_date, end_date)
+    if report is None:
         return None
+    logging.info(f"Merge report: {report}")
+    if on_apply is not None:
+        on_apply(fresh, tombstones)
+
+    await asyncio.to_thread(
+        cache.save_state,
+        SyncState(
+            last_sync=sync_started,
+            last_full_sync=last_full_sync,
+            start_date=start_date,
+            end_date=end_date,
+            cache_file=cache.location,
+        ),
+    )
+    snapshot = await asyncio.to_thread(cache.snapshot)
+    logging.info(
+        f"Synchronization complete. Total OPs saved: {len(snapshot)} at {cache.location}"
+    )
+    return snapshot
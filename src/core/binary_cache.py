@@ -0,0 +1,423 @@
+"""
+Memory-mapped compact binary OP cache for stations that only look up by OP number.
+
+File layout (little endian):
+    header   magic "OPCB", version, record count, hash slot count, section offsets
+    records  one fixed-size record per OP (numbers + string references), sorted by code
+    slots    open-addressing hash table: (code, record index + 1), 0 marks an empty slot
+    heap     UTF-8 strings, each distinct string stored once
+
+Lookups hash the code, probe the slot table and decode a single record straight
+from the mapped file, so opening the cache costs nothing and memory does not
+grow with its size.
+
+Usage: python -m src.core.binary_cache to-binary|to-json <source> <destination>
+"""
+
+import logging
+import mmap
+import pathlib
+import struct
+import sys
+import threading
+from datetime import date, datetime as dt
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Mapping, Optional, Set
+
+from pydantic import ValidationError
+
+from src.core.cache_generations import (
+    DEFAULT_KEEP_GENERATIONS,
+    CacheGenerations,
+    atomic_write,
+)
+from src.core.op_records import decode_ops, encode_ops
+from src.core.order_cache import TMP_PATH, OrderCache
+from src.models.schema import MergeReport, SyncState
+
+MAGIC = b"OPCB"
+VERSION = 1
+STATE_FILE = "sync_state_binary.json"
+
+# magic, version, record count, slot count, records/slots/heap offsets
+_HEADER = struct.Struct("<4sHxxIIQQQ")
+# code, quantity, box_count, weight is int flag,
+# (offset, length) of material_code, client, description, client_code, barcode, weight
+_RECORD = struct.Struct("<qqiB3x" + "II" * 6)
+# code, record index + 1
+_SLOT = struct.Struct("<qI4x")
+
+STRING_FIELDS = ("material_code", "client", "description", "client_code", "barcode")
+
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_HASH_MASK64 = (1 << 64) - 1
+
+
+def _slot_count(records: int) -> int:
+    """Power of two with a load factor of at most 50%."""
+    size = 1
+    while size < records * 2:
+        size <<= 1
+    return size
+
+
+def _hash(code: int, mask: int) -> int:
+    return ((code * _HASH_MULTIPLIER) & _HASH_MASK64) >> 32 & mask
+
+
+def _write_records(file: BinaryIO, ops: Mapping[int, dict]) -> None:
+    """Serializes the OPs into an open binary file."""
+    heap = bytearray()
+    heap_refs: Dict[str, tuple] = {}
+
+    def ref(value: str) -> tuple:
+        found = heap_refs.get(value)
+        if found is None:
+            encoded = value.encode("utf-8")
+            found = heap_refs[value] = (len(heap), len(encoded))
+            heap.extend(encoded)
+        return found
+
+    codes = sorted(ops)
+    records = bytearray()
+    for code in codes:
+        op_data = ops[code]
+        weight = op_data.get("weight", 0)
+        refs = []
+        for field in STRING_FIELDS:
+            refs.extend(ref(op_data.get(field) or ""))
+        refs.extend(ref(str(weight)))
+        records.extend(
+            _RECORD.pack(
+                code,
+                op_data.get("quantity", 0),
+                op_data.get("box_count", 1),
+                1 if isinstance(weight, int) else 0,
+                *refs,
+            )
+        )
+
+    slot_count = _slot_count(len(codes))
+    mask = slot_count - 1
+    slots = bytearray(slot_count * _SLOT.size)
+    for index, code in enumerate(codes):
+        slot = _hash(code, mask)
+        while _SLOT.unpack_from(slots, slot * _SLOT.size)[1]:
+            slot = (slot + 1) & mask
+        _SLOT.pack_into(slots, slot * _SLOT.size, code, index + 1)
+
+    records_offset = _HEADER.size
+    slots_offset = records_offset + len(records)
+    heap_offset = slots_offset + len(slots)
+
+    file.write(
+        _HEADER.pack(
+            MAGIC,
+            VERSION,
+            len(codes),
+            slot_count,
+            records_offset,
+            slots_offset,
+            heap_offset,
+        )
+    )
+    file.write(records)
+    file.write(slots)
+    file.write(heap)
+
+
+def write_binary_cache(path: pathlib.Path, ops: Mapping[int, dict]) -> None:
+    """Writes the OPs to a binary cache file (via a temporary file)."""
+    atomic_write(path, lambda file: _write_records(file, ops))
+
+
+class BinaryOrderView(Mapping):
+    """Read-only mapping over a memory-mapped binary cache file."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        with open(path, "rb") as file:
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            version,
+            self._count,
+            slot_count,
+            self._records_offset,
+            self._slots_offset,
+            self._heap_offset,
+        ) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path.name} is not a version {VERSION} OP cache file.")
+        self._mask = slot_count - 1
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._heap_offset + offset
+        return self._mm[start : start + length].decode("utf-8")
+
+    def _record(self, index: int) -> dict:
+        values = _RECORD.unpack_from(self._mm, self._records_offset + index * _RECORD.size)
+        code, quantity, box_count, weight_is_int = values[:4]
+        refs = values[4:]
+
+        op_data = {"code": code}
+        strings = [self._string(refs[i], refs[i + 1]) for i in range(0, len(refs), 2)]
+        weight = strings.pop()
+        op_data.update(
+            material_code=strings[0],
+            client=strings[1],
+            description=strings[2],
+            quantity=quantity,
+            box_count=box_count,
+            weight=int(weight) if weight_is_int else weight,
+            client_code=strings[3],
+            barcode=strings[4],
+        )
+        return op_data
+
+    def _find(self, code: int) -> int:
+        """Returns the record index of `code`, or -1."""
+        slot = _hash(code, self._mask)
+        while True:
+            slot_code, record = _SLOT.unpack_from(
+                self._mm, self._slots_offset + slot * _SLOT.size
+            )
+            if not record:
+                return -1
+            if slot_code == code:
+                return record - 1
+            slot = (slot + 1) & self._mask
+
+    def __getitem__(self, code: int) -> dict:
+        if not isinstance(code, int) or not self._count:
+            raise KeyError(code)
+        index = self._find(code)
+        if index < 0:
+            raise KeyError(code)
+        return self._record(index)
+
+    def __contains__(self, code) -> bool:
+        return isinstance(code, int) and self._count > 0 and self._find(code) >= 0
+
+    def codes(self) -> Iterator[int]:
+        for index in range(self._count):
+            yield struct.unpack_from(
+                "<q", self._mm, self._records_offset + index * _RECORD.size
+            )[0]
+
+    def __iter__(self) -> Iterator[int]:
+        return self.codes()
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class BinaryOrderCache:
+    """
+    OP cache backend stored as memory-mapped binary files. Implements the same
+    interface as OrderCache. Every write produces a new cache generation that
+    replaces the current view, so readers keep a consistent snapshot. A
+    replaced view stays mapped until the next write, giving the readers that
+    got it from `snapshot()` a whole sync to move on, and is closed then. The
+    JSON cache is converted automatically on first run.
+    """
+
+    def __init__(
+        self,
+        folder: pathlib.Path = TMP_PATH,
+        keep_generations: int = DEFAULT_KEEP_GENERATIONS,
+        max_bytes: int = 0,
+    ) -> None:
+        self.folder = folder
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.folder / STATE_FILE
+        self.generations = CacheGenerations(
+            self.folder, ".opcb", keep=keep_generations, max_bytes=max_bytes
+        )
+        self._lock = threading.Lock()
+        self._view: Optional[BinaryOrderView] = None
+        # Views replaced by a newer generation, closed on the next write
+        self._retired: List[BinaryOrderView] = []
+
+        self._open_current()
+        if self._view is None:
+            self._migrate_json_cache()
+
+    @property
+    def location(self) -> str:
+        return self._view.path.name if self._view else ""
+
+    def _open_current(self) -> None:
+        """Maps the newest readable generation."""
+        candidates = [self.generations.path(g) for g in self.generations.valid()]
+        if not candidates:
+            # Files written before the manifest existed
+            candidates = sorted(self.folder.glob("ordens_*.opcb"), reverse=True)
+
+        for path in candidates:
+            try:
+                self._view = BinaryOrderView(path)
+                return
+            except (OSError, ValueError, struct.error) as e:
+                logging.warning("Ignoring unreadable binary cache %s: %s", path.name, e)
+
+    def _replace(
+        self,
+        ops: Mapping[int, dict],
+        start_date: Optional[date],
+        end_date: Optional[date],
+        synced_at: Optional[dt] = None,
+    ) -> bool:
+        """Writes a new generation and swaps it in. Callers hold `_lock`."""
+        # Unmap the views retired by the previous write first, so that their
+        # files can be pruned (Windows cannot delete a mapped file)
+        self._close_retired()
+
+        generation = self.generations.commit(
+            lambda file: _write_records(file, ops),
+            len(ops),
+            start_date,
+            end_date,
+            synced_at,
+        )
+        if generation is None:
+            return False
+
+        try:
+            view = BinaryOrderView(self.generations.path(generation))
+        except (OSError, ValueError) as e:
+            logging.error("Failed to open binary OP cache: %s", e)
+            return False
+
+        previous, self._view = self._view, view
+        if previous is not None:
+            self._retired.append(previous)
+        return True
+
+    def _close_retired(self) -> None:
+        for view in self._retired:
+            view.close()
+        self._retired = []
+
+    def close(self) -> None:
+        """Unmaps every view; the cache cannot be read afterwards."""
+        with self._lock:
+            self._close_retired()
+            if self._view is not None:
+                self._view.close()
+                self._view = None
+
+    def snapshot(self) -> Optional[Mapping[int, dict]]:
+        return self._view if self._view is not None and len(self._view) else None
+
+    def codes(self) -> Set[int]:
+        return set(self._view.codes()) if self._view else set()
+
+    def load(self) -> Optional[Dict[int, dict]]:
+        """Decodes every OP into a dict (used for merges and conversion)."""
+        if self._view is None:
+            return None
+        return {code: self._view[code] for code in self._view.codes()} or None
+
+    def apply(
+        self,
+        fresh: Dict[int, dict],
+        tombstones: Iterable[int],
+        start_date: date,
+        end_date: date,
+    ) -> Optional[MergeReport]:
+        with self._lock:
+            current = self.load() or {}
+            report = OrderCache.merge(current, fresh, tombstones)
+            changed = report.added or report.updated or report.removed
+            if changed or self._view is None:
+                if not self._replace(current, start_date, end_date):
+                    return None
+            return report
+
+    def upsert(self, ops_dict: Dict[int, dict]) -> Optional[MergeReport]:
+        """Upserts a few OPs, keeping the window and sync time of the current generation."""
+        with self._lock:
+            current = self.load()
+            if current is None:
+                return None
+
+            report = OrderCache.merge(current, ops_dict)
+            if report.added or report.updated:
+                latest = self.generations.latest()
+                if latest is None:
+                    replaced = self._replace(current, None, None)
+                else:
+                    replaced = self._replace(
+                        current, latest.start_date, latest.end_date, latest.synced_at
+                    )
+                if not replaced:
+                    return None
+            return report
+
+    def load_state(self) -> Optional[SyncState]:
+        if not self.state_path.exists():
+            return None
+        try:
+            return SyncState.model_validate_json(self.state_path.read_text("utf-8"))
+        except (IOError, ValidationError) as e:
+            logging.warning("Ignoring invalid sync state: %s", e)
+            return None
+
+    def save_state(self, state: SyncState) -> None:
+        try:
+            data = state.model_dump_json(indent=4).encode("utf-8")
+            atomic_write(self.state_path, lambda file: file.write(data))
+        except IOError as e:
+            logging.error("Failed to write sync state: %s", e)
+
+    def _migrate_json_cache(self) -> None:
+        json_cache = OrderCache(self.folder)
+        ops = json_cache.load()
+        if not ops:
+            return
+
+        state = json_cache.load_state()
+        if state is None:
+            replaced = self._replace(ops, None, None)
+        else:
+            replaced = self._replace(ops, state.start_date, state.end_date, state.last_sync)
+        if not replaced:
+            return
+        if state is not None:
+            self.save_state(state.model_copy(update={"cache_file": self.location}))
+        logging.info("Converted %d OPs from the JSON cache to %s.", len(ops), self.location)
+
+
+def convert_json_to_binary(json_path: pathlib.Path, binary_path: pathlib.Path) -> int:
+    """Converts an 'ordens_*.json' file to the binary format. Returns the OP count."""
+    ops = decode_ops(json_path.read_bytes())
+    write_binary_cache(binary_path, ops)
+    return len(ops)
+
+
+def convert_binary_to_json(binary_path: pathlib.Path, json_path: pathlib.Path) -> int:
+    """Converts a binary cache file back to the 'ordens_*.json' format."""
+    view = BinaryOrderView(binary_path)
+    try:
+        ops = {code: view[code] for code in view.codes()}
+    finally:
+        view.close()
+    json_path.write_bytes(encode_ops(ops))
+    return len(ops)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("to-binary", "to-json"):
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    command = sys.argv[1]
+    source, destination = pathlib.Path(sys.argv[2]), pathlib.Path(sys.argv[3])
+    convert = convert_json_to_binary if command == "to-binary" else convert_binary_to_json
+    count = convert(source, destination)
+    print(f"Converted {count} OPs: {source} -> {destination}")
@@ -0,0 +1,232 @@
+"""
+Versioned generations of the file-based OP caches (JSON and binary).
+
+Every write produces a new generation file: the data goes to a temporary file
+that is fsynced and renamed into place, so a crash never leaves a half-written
+cache behind. A manifest records the sync time, delivery window, row count and
+size of each generation. Readers take the newest generation whose file still
+matches the manifest, and old generations are pruned by count and total size
+once the manifest without them is on disk. A lost or unreadable manifest is
+rebuilt from the generation files found in the folder.
+"""
+
+import logging
+import os
+import pathlib
+import re
+from datetime import date, datetime as dt
+from typing import BinaryIO, Callable, Iterable, List, Optional
+
+from pydantic import ValidationError
+
+from src.models.schema import CacheGeneration, CacheManifest
+
+# Generations kept on disk by default, the newest one included
+DEFAULT_KEEP_GENERATIONS = 3
+
+
+def atomic_write(path: pathlib.Path, write: Callable[[BinaryIO], None]) -> int:
+    """
+    Writes a file through a temporary file that is fsynced and then renamed
+    over `path`, so readers see either the old or the new content.
+
+    Returns:
+        int: Size of the written file in bytes.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return path.stat().st_size
+
+
+class CacheGenerations:
+    """
+    Manages the generation files '<prefix><number><suffix>' of one cache format
+    in a folder, together with their manifest.
+    """
+
+    def __init__(
+        self,
+        folder: pathlib.Path,
+        suffix: str,
+        prefix: str = "ordens_",
+        keep: int = DEFAULT_KEEP_GENERATIONS,
+        max_bytes: int = 0,
+    ) -> None:
+        self.folder = folder
+        self.prefix = prefix
+        self.suffix = suffix
+        self.keep = max(1, keep)
+        self.max_bytes = max_bytes
+        self.manifest_path = folder / f"cache_manifest_{suffix.lstrip('.')}.json"
+        self._file_re = re.compile(rf"{re.escape(prefix)}(\d{{6}}){re.escape(suffix)}")
+
+    def path(self, generation: CacheGeneration) -> pathlib.Path:
+        return self.folder / generation.file
+
+    def is_generation_file(self, path: pathlib.Path) -> bool:
+        return self._file_re.fullmatch(path.name) is not None
+
+    def _read_manifest(self) -> Optional[CacheManifest]:
+        """The manifest on disk, or None if it is missing or unreadable."""
+        if not self.manifest_path.exists():
+            return None
+        try:
+            return CacheManifest.model_validate_json(self.manifest_path.read_text("utf-8"))
+        except (IOError, ValidationError) as e:
+            logging.warning("Ignoring invalid cache manifest %s: %s", self.manifest_path.name, e)
+            return None
+
+    def _rebuild_manifest(self) -> CacheManifest:
+        """
+        Manifest listing the generation files found in the folder, used when
+        the real one is lost. Windows and row counts are unknown; the sync
+        time is taken from the file's modification time.
+        """
+        generations = []
+        for path in self.folder.glob(f"{self.prefix}*{self.suffix}"):
+            match = self._file_re.fullmatch(path.name)
+            if match is None:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            generations.append(
+                CacheGeneration(
+                    number=int(match.group(1)),
+                    file=path.name,
+                    synced_at=dt.fromtimestamp(stat.st_mtime),
+                    rows=0,
+                    size=stat.st_size,
+                )
+            )
+        generations.sort(key=lambda generation: generation.number)
+        return CacheManifest(generations=generations)
+
+    def _load_manifest(self) -> CacheManifest:
+        manifest = self._read_manifest()
+        return manifest if manifest is not None else self._rebuild_manifest()
+
+    def _save_manifest(self, manifest: CacheManifest) -> None:
+        data = manifest.model_dump_json(indent=4).encode("utf-8")
+        atomic_write(self.manifest_path, lambda file: file.write(data))
+
+    def valid(self) -> List[CacheGeneration]:
+        """Generations whose file exists with the recorded size, newest first."""
+        generations = []
+        for generation in reversed(self._load_manifest().generations):
+            try:
+                if self.path(generation).stat().st_size == generation.size:
+                    generations.append(generation)
+            except OSError:
+                continue
+        return generations
+
+    def latest(self) -> Optional[CacheGeneration]:
+        """The newest valid generation, if any."""
+        generations = self.valid()
+        return generations[0] if generations else None
+
+    def commit(
+        self,
+        write: Callable[[BinaryIO], None],
+        rows: int,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        synced_at: Optional[dt] = None,
+    ) -> Optional[CacheGeneration]:
+        """
+        Atomically writes a new generation, records it in the manifest and
+        prunes old generations. Files are only removed after the manifest
+        without them has been saved, so it never points at deleted files.
+
+        Returns:
+            Optional[CacheGeneration]: The new generation, or None on failure.
+        """
+        manifest = self._read_manifest()
+        # Without a manifest, the files on disk are the only record of the
+        # generations: none of them may be treated as an orphan
+        rebuilt = manifest is None
+        if rebuilt:
+            manifest = self._rebuild_manifest()
+        number = max((g.number for g in manifest.generations), default=0) + 1
+        path = self.folder / f"{self.prefix}{number:06d}{self.suffix}"
+
+        try:
+            size = atomic_write(path, write)
+        except OSError as e:
+            logging.error("Failed to write cache generation %s: %s", path.name, e)
+            return None
+
+        generation = CacheGeneration(
+            number=number,
+            file=path.name,
+            synced_at=synced_at or dt.now(),
+            start_date=start_date,
+            end_date=end_date,
+            rows=rows,
+            size=size,
+        )
+        manifest.generations.append(generation)
+        stale = self._prune(manifest, protect=(path,), sweep_orphans=not rebuilt)
+
+        try:
+            self._save_manifest(manifest)
+        except OSError as e:
+            logging.error("Failed to write cache manifest: %s", e)
+            return None
+
+        for stale_path in stale:
+            try:
+                stale_path.unlink(missing_ok=True)
+            except OSError:
+                # Still in use (e.g. mapped on Windows): swept on a later commit
+                pass
+        return generation
+
+    def _prune(
+        self,
+        manifest: CacheManifest,
+        protect: Iterable[pathlib.Path] = (),
+        sweep_orphans: bool = True,
+    ) -> List[pathlib.Path]:
+        """
+        Drops from the manifest the oldest generations beyond `keep` or
+        `max_bytes` (the newest one is always kept) and returns their files,
+        plus, with `sweep_orphans`, generation files the manifest does not
+        list. The caller removes them once the manifest is saved.
+        """
+        protect = set(protect)
+        kept: List[CacheGeneration] = []
+        stale: List[pathlib.Path] = []
+        total = 0
+        for generation in reversed(manifest.generations):
+            over_limit = len(kept) >= self.keep or (
+                self.max_bytes and kept and total + generation.size > self.max_bytes
+            )
+            if over_limit and self.path(generation) not in protect:
+                stale.append(self.path(generation))
+                continue
+            kept.append(generation)
+            total += generation.size
+        manifest.generations = list(reversed(kept))
+
+        if sweep_orphans:
+            known = {generation.file for generation in manifest.generations}
+            for path in self.folder.glob(f"{self.prefix}*{self.suffix}"):
+                if (
+                    path.name not in known
+                    and path not in protect
+                    and path not in stale
+                    and self.is_generation_file(path)
+                ):
+                    stale.append(path)
+        return stale
@@ -24,7 +24,23 @@ class ConfigManager:
         default_config = {
             "username": "",
             "password": "",
-            "printer_name": ""
+            "printer_name": "",
+            "printer_label_formats": {},
+            "label_render_workers": 0,
+            "archive_labels": False,
+            "cache_backend": "sqlite",
+            "cache_max_age_hours": 12,
+            "cache_keep_generations": 3,
+            "cache_max_size_mb": 0,
+            "server_url": "https://lanx.cargamaquina.com.br/",
+            "sync_mode": "delta",
+            "full_sync_interval_hours": 24,
+            "fetch_shards": 4,
+            "fetch_max_concurrency": 4,
+            "sync_interval_minutes": 15,
+            "parse_mode": "stream",
+            "parse_workers": 0,
+            "negative_cache_ttl_seconds": 60
         }
 
         if not os.path.exists(self.config_path):
@@ -69,4 +85,33 @@ class ConfigManager:
         """Updates the session credentials and saves them."""
         self.config["username"] = session_config.get("username", "")
         self.config["password"] = session_config.get("password", "")
-        self.save()
\ No newline at end of file
+        self.save()
+
+    def get_label_format(self, printer_name: str) -> str:
+        """
+        Label output format configured for a printer: "zpl" for Zebra printers
+        fed raw ZPL II, or "" for the platform default (PNG on Linux, PDF on Windows).
+        """
+        return self.get("printer_label_formats", {}).get(printer_name, "")
+
+    def get_cache_config(self) -> Dict[str, Any]:
+        """Retrieves the local OP cache settings."""
+        return {
+            "backend": self.get("cache_backend", "sqlite"),
+            "max_age_hours": self.get("cache_max_age_hours", 12),
+            "keep_generations": self.get("cache_keep_generations", 3),
+            "max_size_mb": self.get("cache_max_size_mb", 0)
+        }
+
+    def get_sync_config(self) -> Dict[str, Any]:
+        """Retrieves the OP synchronization settings."""
+        return {
+            "mode": self.get("sync_mode", "delta"),
+            "full_sync_interval_hours": self.get("full_sync_interval_hours", 24),
+            "shards": self.get("fetch_shards", 4),
+            "max_concurrency": self.get("fetch_max_concurrency", 4),
+            "interval_minutes": self.get("sync_interval_minutes", 15),
+            "parse_mode": self.get("parse_mode", "stream"),
+            "parse_workers": self.get("parse_workers", 0),
+            "negative_cache_ttl_seconds": self.get("negative_cache_ttl_seconds", 60)
+        }
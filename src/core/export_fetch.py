@@ -0,0 +1,269 @@
+"""
+Module for downloading the CargaMaquina order export ('exportarOrdens').
+Provides single requests and a sharded engine that splits the delivery window
+into date shards, fetches them concurrently over the shared SessionManager
+session and detects shards truncated by the page size.
+"""
+
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from src.core.export_parser import (
+    ParallelExportParser,
+    StreamingExportParser,
+    count_table_rows,
+    parse_export_html,
+    parse_export_stream,
+)
+from src.core.session_manager import SessionManager
+
+# Size of each chunk read from the export response in streaming mode
+STREAM_CHUNK_SIZE = 64 * 1024
+# Maximum number of rows the server returns for one request
+EXPORT_PAGE_SIZE = 10000
+
+DateRange = Tuple[date, date]
+
+
+class ExportPage(NamedTuple):
+    """One export response: the parsed OPs and the number of data rows the server sent."""
+    ops: Dict[int, dict]
+    # Raw <tr> rows after the header, including invalid and duplicate ones
+    rows: int
+
+
+class ShardedFetch(NamedTuple):
+    """Outcome of a ShardedExportFetcher.fetch call."""
+    ops: Dict[int, dict]
+    # Single-day shards that still hit the page size and may be incomplete
+    truncated: List[DateRange]
+    requests: int
+
+
+def build_export_params(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    code: str = "",
+    page_size: int = EXPORT_PAGE_SIZE,
+) -> Dict[str, str]:
+    """Builds the query string of the 'exportarOrdens' endpoint."""
+
+    def fmt(value: Optional[date]) -> str:
+        return value.strftime("%d/%m/%Y") if value else ""
+
+    return {
+        "OrdemProducao[codigo]": code,
+        "OrdemProducao[_nomeCliente]": "",
+        "OrdemProducao[_nomeMaterial]": "",
+        "OrdemProducao[status_op_id]": "Todos",
+        "OrdemProducao[_etapasPlanejadas]": "",
+        "OrdemProducao[forecast]": "0",
+        "OrdemProducao[_inicioCriacao]": fmt(created_from),
+        "OrdemProducao[_fimCriacao]": fmt(created_to),
+        "OrdemProducao[_inicioEntrega]": fmt(start_date),
+        "OrdemProducao[_fimEntrega]": fmt(end_date),
+        "OrdemProducao[_limparFiltro]": "0",
+        "pageSize": str(page_size),
+    }
+
+
+async def fetch_op_export(
+    session_manager: SessionManager,
+    params: Dict[str, str],
+    streaming: bool = True,
+    parse_pool: Optional[ParallelExportParser] = None,
+) -> Optional[ExportPage]:
+    """
+    Downloads and parses one export request without touching the local cache.
+    With a `parse_pool` the downloaded export is parsed on worker processes;
+    otherwise, with `streaming` enabled, it is parsed row by row while it downloads.
+
+    A response without any table row is not an export but another page,
+    usually the login page of an expired session: it is reported as a
+    failure and the session is flagged as logged out.
+
+    Returns:
+        Optional[ExportPage]: The parsed OPs (possibly empty) and the raw row
+        count, or None on failure.
+    """
+    if not session_manager.session:
+        logging.error("HTTP Session not initialized. Please login first.")
+        return None
+
+    endpoint = f"{session_manager.base_url}/ordemProducao/exportarOrdens"
+    headers = {
+        "Accept": "*/*",
+        "X-Requested-With": "XMLHttpRequest",
+        "Referer": f"{session_manager.base_url}/ordemProducao",
+    }
+
+    try:
+        async with session_manager.session.get(
+            endpoint, params=params, headers=headers
+        ) as response:
+            response.raise_for_status()
+
+            if streaming and parse_pool is None:
+                parser = StreamingExportParser(response.charset or "utf-8")
+                ops = await parse_export_stream(
+                    response.content.iter_chunked(STREAM_CHUNK_SIZE), parser=parser
+                )
+                table_rows = parser.row_count
+            else:
+                html_content = await response.text()
+                table_rows = count_table_rows(html_content)
+                ops = {}
+                if table_rows and parse_pool is not None:
+                    ops = await parse_pool.parse(html_content)
+                elif table_rows:
+                    ops = parse_export_html(html_content)
+
+        if not table_rows:
+            logging.error("The server did not return the export table; the session has probably expired.")
+            session_manager.is_authenticated = False
+            return None
+
+        # Both counts include the header row
+        return ExportPage(ops, table_rows - 1)
+
+    except Exception as e:
+        logging.exception(f"Failed to fetch OP data: {e}")
+        return None
+
+
+def split_window(start_date: date, end_date: date, shards: int) -> List[DateRange]:
+    """
+    Splits an inclusive date window into at most `shards` contiguous,
+    non-overlapping inclusive ranges of (almost) equal length.
+    """
+    total_days = (end_date - start_date).days + 1
+    shards = max(1, min(shards, total_days))
+
+    ranges = []
+    shard_start = start_date
+    for index in range(shards):
+        days = total_days // shards + (1 if index < total_days % shards else 0)
+        shard_end = shard_start + timedelta(days=days - 1)
+        ranges.append((shard_start, shard_end))
+        shard_start = shard_end + timedelta(days=1)
+    return ranges
+
+
+class ShardedExportFetcher:
+    """
+    Fetches an export window as concurrent date shards.
+
+    A shard whose response holds `page_size` rows may have been cut off by
+    the server, so it is split in half and fetched again. A single-day shard
+    that still hits the cap cannot be split further and is reported in the
+    result's `truncated`. Each call keeps its own state, so one fetcher can
+    serve concurrent fetches.
+    """
+
+    def __init__(
+        self,
+        session_manager: SessionManager,
+        shards: int = 4,
+        max_concurrency: int = 4,
+        page_size: int = EXPORT_PAGE_SIZE,
+        streaming: bool = True,
+        parse_pool: Optional[ParallelExportParser] = None,
+    ) -> None:
+        self.session_manager = session_manager
+        self.shards = max(1, shards)
+        self.page_size = page_size
+        self.streaming = streaming
+        self.parse_pool = parse_pool
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def fetch(
+        self,
+        start_date: date,
+        end_date: date,
+        created_from: Optional[date] = None,
+        created_to: Optional[date] = None,
+    ) -> Optional[ShardedFetch]:
+        """
+        Fetches every OP delivered within the window, merging all shards.
+
+        Returns:
+            Optional[ShardedFetch]: The merged OPs with the truncated shards and
+            the number of requests, or None if any shard failed.
+        """
+        filters = {"created_from": created_from, "created_to": created_to}
+
+        results = await asyncio.gather(
+            *(
+                self._fetch_shard(shard_start, shard_end, filters)
+                for shard_start, shard_end in split_window(
+                    start_date, end_date, self.shards
+                )
+            )
+        )
+        if any(result is None for result in results):
+            logging.error("Sharded fetch failed: at least one shard could not be downloaded.")
+            return None
+
+        merged = _merge(results)
+        for shard_start, shard_end in merged.truncated:
+            logging.warning(
+                f"Shard {shard_start:%d/%m/%Y}-{shard_end:%d/%m/%Y} hit the page size "
+                f"({self.page_size}) and may be incomplete."
+            )
+        logging.info(
+            f"Sharded fetch complete: {len(merged.ops)} OPs in {merged.requests} requests."
+        )
+        return merged
+
+    async def _fetch_shard(
+        self, start_date: date, end_date: date, filters: dict
+    ) -> Optional[ShardedFetch]:
+        """Fetches one shard, splitting it further if the page cap was reached."""
+        async with self._semaphore:
+            page = await fetch_op_export(
+                self.session_manager,
+                build_export_params(
+                    start_date, end_date, page_size=self.page_size, **filters
+                ),
+                self.streaming,
+                self.parse_pool,
+            )
+
+        if page is None:
+            return None
+        # Compare the rows sent, not the OPs kept: invalid or duplicate rows
+        # still count towards the server's cap
+        if page.rows < self.page_size:
+            return ShardedFetch(page.ops, [], 1)
+
+        if start_date == end_date:
+            return ShardedFetch(page.ops, [(start_date, end_date)], 1)
+
+        logging.info(
+            f"Shard {start_date:%d/%m/%Y}-{end_date:%d/%m/%Y} hit the page size, splitting."
+        )
+        halves = await asyncio.gather(
+            *(
+                self._fetch_shard(half_start, half_end, filters)
+                for half_start, half_end in split_window(start_date, end_date, 2)
+            )
+        )
+        if any(half is None for half in halves):
+            return None
+
+        merged = _merge(halves)
+        return merged._replace(requests=merged.requests + 1)
+
+
+def _merge(results: List[ShardedFetch]) -> ShardedFetch:
+    """Combines the results of adjacent shards, later shards winning on duplicates."""
+    ops: Dict[int, dict] = {}
+    truncated: List[DateRange] = []
+    for result in results:
+        ops.update(result.ops)
+        truncated += result.truncated
+    return ShardedFetch(ops, truncated, sum(result.requests for result in results))
@@ -0,0 +1,316 @@
+"""
+Parsers for the CargaMaquina 'exportarOrdens' HTML table.
+Provides the original BeautifulSoup tree parser, a streaming parser that
+collects the rows as they close and validates them in batches, and a process
+pool parser that validates row chunks on all cores off the event loop.
+"""
+
+import asyncio
+import codecs
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from typing import AsyncIterable, Dict, Iterable, List, Optional, Sequence
+
+from bs4 import BeautifulSoup
+
+from src.models.schema import OpRow, OrdemDeProducao, validate_op_rows
+
+# Minimum number of <td> cells a row needs to be considered an OP row
+MIN_ROW_CELLS = 7
+
+# Start of a table row, used to cut the export into row chunks
+ROW_START_RE = re.compile(r"<tr[\s>]", re.IGNORECASE)
+NON_DIGIT_RE = re.compile(r"\D")
+
+
+def row_to_values(cells: Sequence[str]) -> Optional[OpRow]:
+    """
+    Extracts the raw OP values from the stripped text of a table row's cells.
+    Returns None for rows that are too short or hold invalid numbers.
+    """
+    if len(cells) < MIN_ROW_CELLS:
+        return None
+
+    try:
+        raw_code = cells[2].split("-")[-1]
+        code = int(NON_DIGIT_RE.sub("", raw_code))
+
+        quantity = int(cells[6].replace(".", ""))
+    except (ValueError, IndexError, AttributeError):
+        return None
+
+    return OpRow(code, cells[4], cells[3], cells[5], quantity)
+
+
+def row_to_op(cells: Sequence[str]) -> Optional[OrdemDeProducao]:
+    """
+    Converts the stripped text of a table row's cells into an OrdemDeProducao.
+    Returns None for rows that are too short or hold invalid values.
+    """
+    row = row_to_values(cells)
+    if row is None:
+        return None
+
+    try:
+        return OrdemDeProducao(**row._asdict(), box_count=1, weight=0)
+    except ValueError:
+        return None
+
+
+def parse_export_html(html_content: str) -> Dict[int, dict]:
+    """Parses the whole export with a BeautifulSoup tree (reference implementation)."""
+    soup = BeautifulSoup(html_content, "html.parser")
+
+    ops_dict: Dict[int, dict] = {}
+    for tr in soup.find_all("tr")[1:]:
+        cells = [td.get_text(separator="", strip=True) for td in tr.find_all("td")]
+        op = row_to_op(cells)
+        if op is not None:
+            ops_dict[op.code] = op.model_dump()
+
+    return ops_dict
+
+
+class ExportRowParser(HTMLParser):
+    """
+    Incremental HTML parser that collects the text of each <td> and turns every
+    finished <tr> into raw OP values with `row_to_values`; `pop_ops` validates
+    the rows collected so far in one batch.
+
+    Text is joined the same way as BeautifulSoup's
+    `get_text(separator="", strip=True)`: each text node is stripped and empty
+    nodes are dropped, so both parsers produce identical cells.
+    """
+
+    def __init__(self, skip_header: bool = True) -> None:
+        super().__init__(convert_charrefs=True)
+        self.skip_header = skip_header
+        self.row_count = 0
+        self._rows: List[OpRow] = []
+        self._row: Optional[List[str]] = None
+        self._cell: Optional[List[str]] = None
+        self._text: List[str] = []
+
+    def _flush_text(self) -> None:
+        """Closes the current text node, keeping it only if non-blank."""
+        if not self._text:
+            return
+        text = "".join(self._text).strip()
+        self._text.clear()
+        if text and self._cell is not None:
+            self._cell.append(text)
+
+    def _close_cell(self) -> None:
+        if self._cell is not None and self._row is not None:
+            self._row.append("".join(self._cell))
+        self._cell = None
+
+    def _close_row(self) -> None:
+        self._close_cell()
+        if self._row is None:
+            return
+
+        cells, self._row = self._row, None
+        self.row_count += 1
+        if self.skip_header and self.row_count == 1:
+            return
+
+        row = row_to_values(cells)
+        if row is not None:
+            self._rows.append(row)
+
+    def handle_starttag(self, tag, attrs) -> None:
+        self._flush_text()
+        if tag == "tr":
+            self._close_row()
+            self._row = []
+        elif tag == "td" and self._row is not None:
+            self._close_cell()
+            self._cell = []
+
+    def handle_startendtag(self, tag, attrs) -> None:
+        self._flush_text()
+
+    def handle_endtag(self, tag) -> None:
+        self._flush_text()
+        if tag == "td":
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+
+    def handle_data(self, data) -> None:
+        if self._cell is not None:
+            self._text.append(data)
+
+    def handle_comment(self, data) -> None:
+        self._flush_text()
+
+    def close(self) -> None:
+        """Flushes buffered input and finishes a trailing unclosed row."""
+        super().close()
+        self._flush_text()
+        self._close_row()
+
+    def pop_ops(self) -> List[dict]:
+        """Validates and returns the OPs completed since the last call."""
+        rows, self._rows = self._rows, []
+        return validate_op_rows(rows) if rows else []
+
+
+class StreamingExportParser:
+    """Feeds raw response bytes into an ExportRowParser, decoding them incrementally."""
+
+    def __init__(self, encoding: str = "utf-8", skip_header: bool = True) -> None:
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._parser = ExportRowParser(skip_header=skip_header)
+
+    @property
+    def row_count(self) -> int:
+        """Number of <tr> rows seen so far, header included."""
+        return self._parser.row_count
+
+    def feed(self, chunk: bytes) -> List[dict]:
+        """Parses a chunk and returns the OPs whose rows closed inside it."""
+        self._parser.feed(self._decoder.decode(chunk))
+        return self._parser.pop_ops()
+
+    def close(self) -> List[dict]:
+        """Flushes buffered input and returns the remaining OPs."""
+        self._parser.feed(self._decoder.decode(b"", final=True))
+        self._parser.close()
+        return self._parser.pop_ops()
+
+
+def parse_export_chunks(
+    chunks: Iterable[bytes], encoding: str = "utf-8"
+) -> Dict[int, dict]:
+    """Parses the export from an iterable of byte chunks."""
+    parser = StreamingExportParser(encoding)
+    ops_dict: Dict[int, dict] = {}
+
+    for chunk in chunks:
+        for op in parser.feed(chunk):
+            ops_dict[op["code"]] = op
+    for op in parser.close():
+        ops_dict[op["code"]] = op
+
+    return ops_dict
+
+
+async def parse_export_stream(
+    chunks: AsyncIterable[bytes],
+    encoding: str = "utf-8",
+    parser: Optional[StreamingExportParser] = None,
+) -> Dict[int, dict]:
+    """
+    Parses the export from an async byte stream, e.g. aiohttp's `iter_chunked`.
+    A caller-supplied `parser` can be inspected afterwards (e.g. its `row_count`).
+    """
+    parser = parser or StreamingExportParser(encoding)
+    ops_dict: Dict[int, dict] = {}
+
+    async for chunk in chunks:
+        for op in parser.feed(chunk):
+            ops_dict[op["code"]] = op
+    for op in parser.close():
+        ops_dict[op["code"]] = op
+
+    return ops_dict
+
+
+def count_table_rows(html_content: str) -> int:
+    """Number of <tr> rows in a document, header included, valid or not."""
+    return len(ROW_START_RE.findall(html_content))
+
+
+def split_export_rows(html_content: str, chunk_rows: int) -> List[str]:
+    """
+    Cuts the export into fragments of `chunk_rows` complete <tr> rows each,
+    leaving out everything before the first data row (the header).
+    """
+    starts = [match.start() for match in ROW_START_RE.finditer(html_content)]
+    data_starts = starts[1:]
+    if not data_starts:
+        return []
+
+    chunks = []
+    for index in range(0, len(data_starts), chunk_rows):
+        chunk_start = data_starts[index]
+        next_index = index + chunk_rows
+        chunk_end = data_starts[next_index] if next_index < len(data_starts) else None
+        chunks.append(html_content[chunk_start:chunk_end])
+    return chunks
+
+
+def parse_export_text(html_content: str, skip_header: bool = True) -> Dict[int, dict]:
+    """
+    Parses an export document (or, with `skip_header` off, a fragment of data
+    rows) in-process. Pool workers run this on their row chunks.
+    """
+    parser = ExportRowParser(skip_header=skip_header)
+    parser.feed(html_content)
+    parser.close()
+    return {op["code"]: op for op in parser.pop_ops()}
+
+
+class ParallelExportParser:
+    """
+    Parses the export in a ProcessPoolExecutor so that HTML parsing and
+    Pydantic validation do not block the Qt event loop.
+
+    The export is cut into chunks of `chunk_rows` rows, parsed by `workers`
+    processes (all cores by default) and the partial dicts are merged back in
+    order on the loop. Payloads under `min_bytes` are parsed in-process, where
+    starting the pool would cost more than the parse itself.
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        chunk_rows: int = 2000,
+        min_bytes: int = 256 * 1024,
+    ) -> None:
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.chunk_rows = chunk_rows
+        self.min_bytes = min_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def parse(self, html_content: str) -> Dict[int, dict]:
+        """Parses a full export document."""
+        if self.workers <= 1 or len(html_content) < self.min_bytes:
+            return parse_export_text(html_content)
+
+        chunks = split_export_rows(html_content, self.chunk_rows)
+        if len(chunks) <= 1:
+            return parse_export_text(html_content)
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        logging.info(
+            "Parsing %d row chunks on %d worker processes.", len(chunks), self.workers
+        )
+        partials = await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, parse_export_text, chunk, False)
+                for chunk in chunks
+            )
+        )
+
+        ops_dict: Dict[int, dict] = {}
+        for partial in partials:
+            ops_dict.update(partial)
+        return ops_dict
+
+    def shutdown(self) -> None:
+        """Stops the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,265 @@
+"""
+Compact in-memory OP records and the codec of the JSON cache files.
+
+An OpRecord stores the OrdemDeProducao fields in slots instead of a dict and
+behaves as a read-only mapping, so code written against the `model_dump()`
+dicts keeps working. A whole cache is held as an OpTable: one column per
+field, numbers in arrays and the repetitive strings (client, material,
+description, codes) stored once and referenced by index.
+
+Cache files hold the table columns as JSON, without repeating the keys or
+the strings of every OP, and are encoded with orjson when it is installed.
+The older {code: {field: value}} files are still read.
+"""
+
+import json
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Sequence, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from src.models.schema import OrdemDeProducao
+
+FIELDS = tuple(OrdemDeProducao.model_fields)
+_FIELD_SET = frozenset(FIELDS)
+STRING_FIELDS = frozenset(
+    ("material_code", "client", "description", "client_code", "barcode")
+)
+# Array typecodes of the numeric columns; 'weight' may hold text and stays a list
+NUMBER_COLUMNS = {"code": "q", "quantity": "q", "box_count": "l"}
+STRING_INDEX_TYPE = "L"
+TABLE_FORMAT = 2
+
+
+class OpRecord(Mapping):
+    """
+    OP record with the fields of OrdemDeProducao, in the same order.
+    Records are shared between snapshots and must not be modified.
+    """
+
+    __slots__ = (
+        "code",
+        "material_code",
+        "client",
+        "description",
+        "quantity",
+        "box_count",
+        "weight",
+        "client_code",
+        "barcode",
+    )
+
+    def __init__(
+        self,
+        code: int,
+        material_code: str,
+        client: str,
+        description: str,
+        quantity: int,
+        box_count: int = 1,
+        weight: Union[int, str] = 0,
+        client_code: str = "",
+        barcode: str = "",
+    ) -> None:
+        self.code = code
+        self.material_code = material_code
+        self.client = client
+        self.description = description
+        self.quantity = quantity
+        self.box_count = box_count
+        self.weight = weight
+        self.client_code = client_code
+        self.barcode = barcode
+
+    @classmethod
+    def from_dict(cls, op_data: Mapping) -> "OpRecord":
+        """Builds a record from an OP dict, interning the repeated strings."""
+        if isinstance(op_data, OpRecord):
+            return op_data
+        return cls(
+            *[
+                _intern(op_data.get(field)) if field in STRING_FIELDS else op_data.get(field)
+                for field in FIELDS
+            ]
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in _FIELD_SET else default
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def values_tuple(self) -> tuple:
+        return (
+            self.code,
+            self.material_code,
+            self.client,
+            self.description,
+            self.quantity,
+            self.box_count,
+            self.weight,
+            self.client_code,
+            self.barcode,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, OpRecord):
+            return self.values_tuple() == other.values_tuple()
+        return Mapping.__eq__(self, other)
+
+    __hash__ = None
+
+    def to_dict(self) -> dict:
+        return dict(zip(FIELDS, self.values_tuple()))
+
+    def __repr__(self) -> str:
+        return f"OpRecord({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (OpRecord, self.values_tuple())
+
+
+# The slots above mirror the schema; fail loudly if a field is added there only
+if OpRecord.__slots__ != FIELDS:
+    raise RuntimeError("OpRecord fields are out of sync with OrdemDeProducao.")
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def compact_ops(ops_dict: Mapping[int, Mapping]) -> Dict[int, OpRecord]:
+    """Converts OP dicts (e.g. parser output) to records with interned strings."""
+    return {code: OpRecord.from_dict(op_data) for code, op_data in ops_dict.items()}
+
+
+class OpTable(Mapping):
+    """
+    Read-only columnar table of OPs sorted by code. Numbers are kept in
+    arrays and strings as indexes into a table of distinct strings, so an OP
+    costs a few dozen bytes; lookups bisect the codes and build an OpRecord.
+    """
+
+    def __init__(self, strings: List[Any], columns: Dict[str, Sequence]) -> None:
+        self._strings = strings
+        self._columns = columns
+        self._codes = columns["code"]
+        # (column, is a string index) in FIELDS order
+        self._layout = [(columns[field], field in STRING_FIELDS) for field in FIELDS]
+
+    @classmethod
+    def from_ops(cls, ops: Mapping[int, Mapping]) -> "OpTable":
+        if isinstance(ops, OpTable):
+            return ops
+
+        strings: List[Any] = []
+        string_refs: Dict[Any, int] = {}
+        values: Dict[str, list] = {field: [] for field in FIELDS}
+        for code in sorted(ops):
+            op_data = ops[code]
+            for field in FIELDS:
+                value = op_data.get(field)
+                if field in STRING_FIELDS:
+                    ref = string_refs.get(value)
+                    if ref is None:
+                        ref = string_refs[value] = len(strings)
+                        strings.append(value)
+                    value = ref
+                values[field].append(value)
+        return cls(strings, _to_columns(values))
+
+    def _find(self, code: int) -> int:
+        """Returns the row of `code`, or -1."""
+        codes = self._codes
+        row = bisect_left(codes, code)
+        if row < len(codes) and codes[row] == code:
+            return row
+        return -1
+
+    def _record(self, row: int) -> OpRecord:
+        strings = self._strings
+        return OpRecord(
+            *[
+                strings[column[row]] if is_string else column[row]
+                for column, is_string in self._layout
+            ]
+        )
+
+    def __getitem__(self, code: int) -> OpRecord:
+        row = self._find(code) if isinstance(code, int) else -1
+        if row < 0:
+            raise KeyError(code)
+        return self._record(row)
+
+    def __contains__(self, code: object) -> bool:
+        return isinstance(code, int) and self._find(code) >= 0
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._codes)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def to_document(self) -> dict:
+        """The table as a JSON-serializable cache document."""
+        return {
+            "format": TABLE_FORMAT,
+            "fields": FIELDS,
+            "strings": self._strings,
+            "columns": {
+                field: column.tolist() if isinstance(column, array) else column
+                for field, column in self._columns.items()
+            },
+        }
+
+
+def _to_columns(values: Dict[str, list]) -> Dict[str, Sequence]:
+    """Packs the column lists into arrays where the values allow it."""
+    columns: Dict[str, Sequence] = {}
+    for field, column in values.items():
+        typecode = STRING_INDEX_TYPE if field in STRING_FIELDS else NUMBER_COLUMNS.get(field)
+        columns[field] = array(typecode, column) if typecode else column
+    return columns
+
+
+def encode_ops(ops: Mapping[int, Mapping]) -> bytes:
+    """Encodes OPs to the columnar cache file format."""
+    document = OpTable.from_ops(ops).to_document()
+    if orjson is not None:
+        return orjson.dumps(document)
+    return json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_ops(data: bytes) -> OpTable:
+    """Decodes a cache file in the columnar or the older dict-of-dicts format."""
+    document = orjson.loads(data) if orjson is not None else json.loads(data)
+
+    if document.get("format") == TABLE_FORMAT:
+        values = document["columns"]
+        missing = set(FIELDS) - set(values)
+        if missing:
+            raise ValueError(f"Cache file is missing the columns {sorted(missing)}.")
+
+        table = OpTable(document["strings"], _to_columns(values))
+        codes = table._codes
+        if any(codes[i] >= codes[i + 1] for i in range(len(codes) - 1)):
+            raise ValueError("Cache file codes are not sorted.")
+        return table
+
+    return OpTable.from_ops(
+        {int(code): op_data for code, op_data in document.items()}
+    )
@@ -0,0 +1,219 @@
+"""
+Module for the local OP cache stored as 'ordens_*.json' files.
+Tracks the synchronization high-water mark and merges fresh data into the cache.
+
+Every cache backend exposes the same interface used by the synchronization:
+`load_state`/`save_state`, `snapshot`, `codes`, `apply`, `upsert` and `location`.
+"""
+
+import pathlib
+import logging
+from datetime import date, datetime as dt
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+from pydantic import ValidationError
+
+from src.core.cache_generations import (
+    DEFAULT_KEEP_GENERATIONS,
+    CacheGenerations,
+    atomic_write,
+)
+from src.core.op_records import OpTable, compact_ops, decode_ops, encode_ops
+from src.models.schema import MergeReport, SyncState
+
+TMP_PATH = pathlib.Path("./tmp")
+SYNC_STATE_FILE = "sync_state.json"
+
+
+class OrderCache:
+    """
+    Reads and writes the JSON OP cache and its synchronization state.
+    Each write creates a new cache generation (see CacheGenerations), and the
+    OPs are held in memory as a compact OpTable.
+    """
+
+    def __init__(
+        self,
+        folder: pathlib.Path = TMP_PATH,
+        keep_generations: int = DEFAULT_KEEP_GENERATIONS,
+        max_bytes: int = 0,
+    ) -> None:
+        self.folder = folder
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.folder / SYNC_STATE_FILE
+        self.generations = CacheGenerations(
+            self.folder, ".json", keep=keep_generations, max_bytes=max_bytes
+        )
+        self._ops: Optional[OpTable] = None
+
+    @property
+    def location(self) -> str:
+        """Name of the file currently backing the cache."""
+        path = self.find_cache_file()
+        return path.name if path else ""
+
+    def _legacy_files(self) -> List[pathlib.Path]:
+        """Window-named files written before cache generations, newest first."""
+        files = [
+            path
+            for path in self.folder.glob("ordens_*.json")
+            if not self.generations.is_generation_file(path)
+        ]
+        return sorted(files, key=lambda path: path.stat().st_mtime, reverse=True)
+
+    def _candidate_files(self) -> List[pathlib.Path]:
+        generations = [self.generations.path(g) for g in self.generations.valid()]
+        return generations + self._legacy_files()
+
+    def files(self) -> List[pathlib.Path]:
+        """Every file of the JSON cache: generations, legacy files, manifest and sync state."""
+        generation_files = [
+            path
+            for path in self.folder.glob("ordens_*.json")
+            if self.generations.is_generation_file(path)
+        ]
+        extra = [path for path in (self.generations.manifest_path, self.state_path) if path.exists()]
+        return generation_files + self._legacy_files() + extra
+
+    def find_cache_file(self) -> Optional[pathlib.Path]:
+        """Returns the newest valid cache generation, or the newest legacy file."""
+        candidates = self._candidate_files()
+        return candidates[0] if candidates else None
+
+    def load(self) -> Optional[OpTable]:
+        """
+        Loads the cached OPs from the newest readable file, or None if there
+        is no readable cache.
+        """
+        for path in self._candidate_files():
+            try:
+                return decode_ops(path.read_bytes())
+            except (IOError, ValueError, TypeError, AttributeError) as e:
+                logging.error("Failed to read local JSON cache %s: %s", path.name, e)
+        return None
+
+    def save(
+        self,
+        ops_dict: Mapping[int, Mapping],
+        start_date: Optional[date],
+        end_date: Optional[date],
+        synced_at: Optional[dt] = None,
+    ) -> Optional[pathlib.Path]:
+        """
+        Writes the OPs as a new cache generation for the given window and
+        removes the legacy files of previous versions.
+        """
+        generation = self.generations.commit(
+            lambda file: file.write(encode_ops(ops_dict)),
+            len(ops_dict),
+            start_date,
+            end_date,
+            synced_at,
+        )
+        if generation is None:
+            return None
+
+        for old_file in self._legacy_files():
+            old_file.unlink(missing_ok=True)
+
+        return self.generations.path(generation)
+
+    def snapshot(self) -> Optional[Mapping[int, dict]]:
+        """Returns the cached OPs, loading them on first use."""
+        if self._ops is None:
+            self._ops = self.load()
+        return self._ops
+
+    def codes(self) -> Set[int]:
+        """Returns the codes of every cached OP."""
+        return set(self.snapshot() or ())
+
+    def apply(
+        self,
+        fresh: Dict[int, dict],
+        tombstones: Iterable[int],
+        start_date: date,
+        end_date: date,
+    ) -> Optional[MergeReport]:
+        """
+        Merges a synchronization result into a fresh copy of the cache, writes
+        it for the new window and makes it the current snapshot.
+        """
+        current = dict(self.load() or {})
+        report = self.merge(current, compact_ops(fresh), tombstones)
+        table = OpTable.from_ops(current)
+        if self.save(table, start_date, end_date) is None:
+            return None
+
+        self._ops = table
+        return report
+
+    def upsert(self, ops_dict: Dict[int, dict]) -> Optional[MergeReport]:
+        """
+        Upserts a few OPs into the cache as a new generation that keeps the
+        window and sync time of the current one.
+        """
+        loaded = self.load()
+        if loaded is None:
+            return None
+
+        current = dict(loaded)
+        report = self.merge(current, compact_ops(ops_dict))
+        if report.added or report.updated:
+            latest = self.generations.latest()
+            if latest is None:
+                saved = self.save(current, None, None)
+            else:
+                saved = self.save(
+                    current, latest.start_date, latest.end_date, latest.synced_at
+                )
+            if saved is None:
+                return None
+        return report
+
+    def load_state(self) -> Optional[SyncState]:
+        """Loads the synchronization high-water mark, if any."""
+        if not self.state_path.exists():
+            return None
+
+        try:
+            return SyncState.model_validate_json(self.state_path.read_text("utf-8"))
+        except (IOError, ValidationError) as e:
+            logging.warning("Ignoring invalid sync state: %s", e)
+            return None
+
+    def save_state(self, state: SyncState) -> None:
+        """Persists the synchronization high-water mark."""
+        try:
+            data = state.model_dump_json(indent=4).encode("utf-8")
+            atomic_write(self.state_path, lambda file: file.write(data))
+        except IOError as e:
+            logging.error("Failed to write sync state: %s", e)
+
+    @staticmethod
+    def merge(
+        current: Dict[int, dict],
+        fresh: Dict[int, dict],
+        tombstones: Iterable[int] = (),
+    ) -> MergeReport:
+        """
+        Upserts `fresh` into `current` in place and deletes the tombstoned codes.
+        """
+        report = MergeReport()
+
+        for code, op_data in fresh.items():
+            previous = current.get(code)
+            if previous is None:
+                report.added += 1
+            elif previous != op_data:
+                report.updated += 1
+            else:
+                report.unchanged += 1
+                continue
+            current[code] = op_data
+
+        for code in tombstones:
+            if code not in fresh and current.pop(code, None) is not None:
+                report.removed += 1
+
+        return report
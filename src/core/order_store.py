@@ -0,0 +1,266 @@
+"""
+SQLite-backed OP store, an indexed replacement for the 'ordens_*.json' dump.
+Writes are batched upserts that only touch changed rows and reads are point
+queries, so nothing has to be loaded into memory at startup.
+"""
+
+import json
+import logging
+import pathlib
+import sqlite3
+import threading
+from datetime import date
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Set
+
+from pydantic import ValidationError
+
+from src.core.binary_cache import BinaryOrderCache
+from src.core.config import ConfigManager
+from src.core.order_cache import TMP_PATH, OrderCache
+from src.models.schema import MergeReport, OrdemDeProducao, SyncState
+
+STORE_FILE = "ordens.sqlite3"
+
+# Column order follows the OrdemDeProducao fields, `code` first
+FIELDS = tuple(OrdemDeProducao.model_fields)
+VALUE_FIELDS = tuple(field for field in FIELDS if field != "code")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS ops (
+    code INTEGER PRIMARY KEY,
+    {", ".join(VALUE_FIELDS)}
+);
+CREATE INDEX IF NOT EXISTS ix_ops_material_code ON ops (material_code);
+CREATE INDEX IF NOT EXISTS ix_ops_client ON ops (client);
+CREATE INDEX IF NOT EXISTS ix_ops_client_code ON ops (client_code);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# Insert new rows and update existing ones only if a value actually changed
+_UPSERT = f"""
+INSERT INTO ops ({", ".join(FIELDS)}) VALUES ({", ".join("?" for _ in FIELDS)})
+ON CONFLICT (code) DO UPDATE SET
+    {", ".join(f"{field} = excluded.{field}" for field in VALUE_FIELDS)}
+WHERE {" OR ".join(f"ops.{field} IS NOT excluded.{field}" for field in VALUE_FIELDS)}
+"""
+
+_SELECT_ONE = f"SELECT {', '.join(FIELDS)} FROM ops WHERE code = ?"
+
+
+def _row_to_dict(row: sqlite3.Row) -> dict:
+    return dict(zip(FIELDS, row))
+
+
+class OrderStoreView(Mapping):
+    """
+    Read-only mapping over the store used as the sync snapshot.
+    Every lookup is a primary-key query; nothing is held in memory.
+    """
+
+    def __init__(self, store: "SqliteOrderStore") -> None:
+        self._store = store
+
+    def __getitem__(self, code: int) -> dict:
+        op_data = self._store.get(code)
+        if op_data is None:
+            raise KeyError(code)
+        return op_data
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(sorted(self._store.codes()))
+
+    def __len__(self) -> int:
+        return self._store.count()
+
+
+class SqliteOrderStore:
+    """
+    OP cache stored in an SQLite database in WAL mode, so other tools can read
+    the file while the app writes to it. Implements the same interface as
+    OrderCache. Existing JSON caches are migrated on first run.
+    """
+
+    def __init__(self, folder: pathlib.Path = TMP_PATH) -> None:
+        self.folder = folder
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.path = self.folder / STORE_FILE
+        self._lock = threading.Lock()
+
+        # The store is shared by the event loop and worker threads
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        self._migrate_json_cache()
+
+    @property
+    def location(self) -> str:
+        return self.path.name
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, code: int) -> Optional[dict]:
+        """Point lookup of a single OP."""
+        with self._lock:
+            row = self._conn.execute(_SELECT_ONE, (code,)).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ops").fetchone()[0]
+
+    def codes(self) -> Set[int]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT code FROM ops")}
+
+    def snapshot(self) -> Optional[Mapping[int, dict]]:
+        return OrderStoreView(self) if self.count() else None
+
+    def load(self) -> Optional[Dict[int, dict]]:
+        """Loads every OP into a dict (for exports and tools; not used by lookups)."""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(FIELDS)} FROM ops").fetchall()
+        return {row[0]: _row_to_dict(row) for row in rows} or None
+
+    def apply(
+        self,
+        fresh: Dict[int, dict],
+        tombstones: Iterable[int],
+        start_date: date,
+        end_date: date,
+    ) -> Optional[MergeReport]:
+        """Upserts and deletes in a single transaction. The window is kept in the sync state."""
+        return self._write(fresh, tombstones)
+
+    def upsert(self, ops_dict: Dict[int, dict]) -> Optional[MergeReport]:
+        return self._write(ops_dict, ())
+
+    def _write(
+        self, fresh: Dict[int, dict], tombstones: Iterable[int]
+    ) -> Optional[MergeReport]:
+        tombstones = [(code,) for code in tombstones if code not in fresh]
+        report = MergeReport()
+
+        try:
+            with self._lock:
+                conn = self._conn
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    existing = {
+                        row[0]
+                        for row in conn.execute(
+                            f"SELECT code FROM ops WHERE code IN "
+                            f"(SELECT value FROM json_each(?))",
+                            (json.dumps(list(fresh)),),
+                        )
+                    }
+                    before = conn.total_changes
+                    conn.executemany(
+                        _UPSERT,
+                        (
+                            tuple(op_data.get(field) for field in FIELDS)
+                            for op_data in fresh.values()
+                        ),
+                    )
+                    changed = conn.total_changes - before
+
+                    before = conn.total_changes
+                    conn.executemany("DELETE FROM ops WHERE code = ?", tombstones)
+                    report.removed = conn.total_changes - before
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            logging.error("Failed to write the SQLite OP store: %s", e)
+            return None
+
+        report.added = len(fresh) - len(existing)
+        report.updated = changed - report.added
+        report.unchanged = len(fresh) - report.added - report.updated
+        return report
+
+    def load_state(self) -> Optional[SyncState]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'sync_state'"
+            ).fetchone()
+        if row is None:
+            return None
+
+        try:
+            return SyncState.model_validate_json(row[0])
+        except ValidationError as e:
+            logging.warning("Ignoring invalid sync state: %s", e)
+            return None
+
+    def save_state(self, state: SyncState) -> None:
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('sync_state', ?)",
+                    (state.model_dump_json(),),
+                )
+        except sqlite3.Error as e:
+            logging.error("Failed to write sync state: %s", e)
+
+    def _migrate_json_cache(self) -> None:
+        """
+        Imports an existing JSON cache (its newest readable generation and its
+        sync state) into an empty store, then moves every file of the JSON
+        cache out of the way, so neither that backend nor a later migration
+        picks up the stale data.
+        """
+        if self.count():
+            return
+
+        json_cache = OrderCache(self.folder)
+        ops = json_cache.load()
+        if not ops:
+            return
+
+        report = self.upsert(ops)
+        if report is None:
+            return
+
+        state = json_cache.load_state()
+        if state is not None:
+            self.save_state(state.model_copy(update={"cache_file": self.location}))
+
+        # Keep the old files around, but out of the way of the JSON backend
+        files = json_cache.files()
+        for path in files:
+            try:
+                path.replace(path.with_name(path.name + ".migrated"))
+            except OSError as e:
+                logging.warning("Failed to retire migrated cache file %s: %s", path.name, e)
+        logging.info(
+            "Migrated %d OPs from %d JSON cache files to %s.", report.added, len(files), self.location
+        )
+
+
+def open_order_cache(config_manager: ConfigManager, folder: pathlib.Path = TMP_PATH):
+    """
+    Opens the OP cache backend selected by the 'cache_backend' setting:
+    "sqlite" (default), "json" or "binary" (memory-mapped, lookups by OP number).
+    The file-based backends keep 'cache_keep_generations' generations on disk,
+    limited to 'cache_max_size_mb' in total (0 for no limit).
+    """
+    cache_cfg = config_manager.get_cache_config()
+    backend = cache_cfg["backend"]
+    generations = {
+        "keep_generations": cache_cfg["keep_generations"],
+        "max_bytes": int(cache_cfg["max_size_mb"] * 1024 * 1024),
+    }
+    if backend == "json":
+        return OrderCache(folder, **generations)
+    if backend == "binary":
+        return BinaryOrderCache(folder, **generations)
+    if backend != "sqlite":
+        logging.warning("Unknown cache backend '%s', using SQLite.", backend)
+    return SqliteOrderStore(folder)
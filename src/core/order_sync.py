@@ -0,0 +1,369 @@
+"""
+Background synchronization of the OP cache (stale-while-revalidate).
+Lookups are answered from the current in-memory snapshot while a refresh runs
+periodically on the asyncio (qasync) event loop. The on-disk cache is loaded
+in a worker thread once the window is shown, and a type-ahead search index
+is built from it off the UI thread and kept current after each sync.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime as dt, timedelta
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set
+
+from src.core.api import (
+    get_single_op_data_on_carga_maquina,
+    sync_op_data_on_carga_maquina,
+)
+from src.core.config import ConfigManager
+from src.core.export_parser import ParallelExportParser
+from src.core.order_store import open_order_cache
+from src.core.search_index import DEFAULT_LIMIT, OpSearchIndex, SearchHit
+from src.core.session_manager import SessionManager
+
+# Sync status values reported to listeners
+STATUS_IDLE = "idle"
+STATUS_SYNCING = "syncing"
+STATUS_ERROR = "error"
+STATUS_OFFLINE = "offline"
+
+# Syncs that change more OPs than this rebuild the search index in a worker
+# thread instead of updating it in place on the event loop
+INDEX_REBUILD_THRESHOLD = 2000
+
+
+class OrderSyncService:
+    """
+    Keeps an in-memory snapshot of the OP cache and refreshes it in the background.
+
+    Concurrent refresh triggers share a single in-flight request, and the new
+    snapshot replaces the old one in a single assignment once it completes, so
+    readers never see a partially merged cache.
+    """
+
+    def __init__(
+        self, config_manager: ConfigManager, session_manager: SessionManager
+    ) -> None:
+        self.config_manager = config_manager
+        self.session_manager = session_manager
+        self.cache = open_order_cache(config_manager)
+
+        self.snapshot: Optional[Mapping[int, dict]] = None
+        self.synced_at: Optional[dt] = None
+        self.status = STATUS_IDLE
+
+        self._parse_pool: Optional[ParallelExportParser] = None
+        self._warm_load: Optional[asyncio.Task] = None
+        self._loading = False
+        self._inflight: Optional[asyncio.Task] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        # Held while a sync or an on-demand upsert writes the on-disk cache
+        self._cache_lock = asyncio.Lock()
+        # The event loop only keeps weak references to tasks
+        self._background: Set[asyncio.Task] = set()
+        self._listeners: List[Callable[[], None]] = []
+        # OP code -> monotonic expiry time of a "not found" answer from the server
+        self._misses: Dict[int, float] = {}
+        # OPs fetched on demand, kept until the session ends
+        self._on_demand: Dict[int, dict] = {}
+
+        self.search_index: Optional[OpSearchIndex] = None
+        self._index_task: Optional[asyncio.Task] = None
+        self._index_stale = False
+
+        # Startup reference for the time-to-first-lookup measurement
+        self._created_at = time.perf_counter()
+        self._ready_after: Optional[float] = None
+        self._first_lookup_logged = False
+
+    @property
+    def interval(self) -> timedelta:
+        """Time between two background refreshes."""
+        minutes = self.config_manager.get_sync_config()["interval_minutes"]
+        return timedelta(minutes=minutes)
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether the on-disk cache has been loaded (or there is none to load)."""
+        return not self._loading
+
+    @property
+    def is_syncing(self) -> bool:
+        return self._inflight is not None and not self._inflight.done()
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Registers a callback invoked whenever the snapshot or the status changes."""
+        self._listeners.append(callback)
+
+    def _notify(self) -> None:
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception:
+                logging.exception("Order sync listener failed.")
+
+    def _set_status(self, status: str) -> None:
+        self.status = status
+        self._notify()
+
+    def read_state(self) -> None:
+        """Reads the time of the last sync without loading the cache itself."""
+        state = self.cache.load_state()
+        self.synced_at = state.last_sync if state else None
+
+    def warm_load(self) -> asyncio.Task:
+        """
+        Loads the on-disk cache in a worker thread. Listeners are notified
+        when it is ready; lookups issued meanwhile wait for this same load.
+        """
+        if self._warm_load is None:
+            self._loading = True
+            self._warm_load = asyncio.ensure_future(self._do_warm_load())
+            self._notify()
+        return self._warm_load
+
+    async def _do_warm_load(self) -> None:
+        started = time.perf_counter()
+        try:
+            ops = await asyncio.to_thread(self.cache.snapshot)
+        except Exception:
+            logging.exception("Failed to load the local OP cache.")
+            ops = None
+
+        # Keep a snapshot that a refresh may have swapped in meanwhile
+        if ops and self.snapshot is None:
+            self.snapshot = ops
+            self.read_state()
+            logging.info(
+                "Loaded %d OPs from the local cache in %.0f ms.",
+                len(ops),
+                (time.perf_counter() - started) * 1000,
+            )
+        self._ready_after = time.perf_counter() - self._created_at
+        self._loading = False
+        self._notify()
+        if self.snapshot is not None:
+            self._build_index()
+
+    async def wait_ready(self) -> None:
+        """Waits for the warm load, if one is running."""
+        if not self.is_ready:
+            await asyncio.shield(self._warm_load)
+
+    def snapshot_age(self) -> Optional[timedelta]:
+        """Age of the current snapshot, or None if it was never synchronized."""
+        if self.synced_at is None:
+            return None
+        return dt.now() - self.synced_at
+
+    def is_fresh(self) -> bool:
+        """Whether the snapshot is younger than 'cache_max_age_hours'."""
+        age = self.snapshot_age()
+        if age is None:
+            return False
+        max_age = self.config_manager.get_cache_config()["max_age_hours"]
+        return age <= timedelta(hours=max_age)
+
+    def search(
+        self, query: str, limit: int = DEFAULT_LIMIT, text: bool = True
+    ) -> List[SearchHit]:
+        """Type-ahead search over the snapshot; empty until the index is built."""
+        if self.search_index is None:
+            return []
+        return self.search_index.search(query, limit, text)
+
+    def _build_index(self) -> None:
+        """Rebuilds the search index from the snapshot in a worker thread."""
+        if self._index_task is not None and not self._index_task.done():
+            # Rebuild again once the running build finishes
+            self._index_stale = True
+            return
+        self._index_task = asyncio.ensure_future(self._do_build_index())
+
+    async def _do_build_index(self) -> None:
+        while True:
+            self._index_stale = False
+            started = time.perf_counter()
+            try:
+                index = await asyncio.to_thread(OpSearchIndex.from_ops, self.snapshot)
+            except Exception:
+                logging.exception("Failed to build the OP search index.")
+                return
+
+            index.update(self._on_demand)
+            self.search_index = index
+            logging.info(
+                "Built the OP search index (%d OPs) in %.0f ms.",
+                len(index),
+                (time.perf_counter() - started) * 1000,
+            )
+            if not self._index_stale:
+                break
+        self._notify()
+
+    def _update_index(self, upserted: Mapping[int, dict], removed: Iterable[int]) -> None:
+        """Applies a sync result to the search index."""
+        building = self._index_task is not None and not self._index_task.done()
+        if (
+            self.search_index is None
+            or building
+            or len(upserted) > INDEX_REBUILD_THRESHOLD
+        ):
+            self._build_index()
+            return
+        self.search_index.update(upserted)
+        self.search_index.remove(removed)
+
+    def get(self, op_number: int) -> Optional[dict]:
+        """Looks up an OP in the current snapshot without waiting for a refresh."""
+        snapshot = self.snapshot
+        op_data = snapshot.get(op_number) if snapshot else None
+        return op_data or self._on_demand.get(op_number)
+
+    async def lookup(self, op_number: int) -> Optional[dict]:
+        """
+        Looks up an OP in the snapshot and, on a miss, fetches only that OP
+        from the server. Found OPs are answered from memory for the rest of
+        the session and upserted into the on-disk cache; codes the server does not know are remembered for
+        'negative_cache_ttl_seconds' so repeated scans do not hit the server.
+        A lookup issued during the warm load waits for it.
+        """
+        waited = time.perf_counter()
+        await self.wait_ready()
+        waited = time.perf_counter() - waited
+
+        op_data = self.get(op_number)
+        if not self._first_lookup_logged:
+            self._first_lookup_logged = True
+            logging.info(
+                "Time to first lookup: %.0f ms (cache ready after %.0f ms, waited %.0f ms).",
+                (time.perf_counter() - self._created_at) * 1000,
+                (self._ready_after or 0) * 1000,
+                waited * 1000,
+            )
+
+        if op_data or not self.session_manager.is_authenticated:
+            return op_data
+
+        expiry = self._misses.get(op_number)
+        if expiry is not None:
+            if time.monotonic() < expiry:
+                return None
+            del self._misses[op_number]
+
+        result = await get_single_op_data_on_carga_maquina(
+            self.session_manager, op_number
+        )
+        if result is None:
+            # Failed request or expired session (is_authenticated is cleared
+            # for the next refresh to log in again): the OP may well exist
+            return None
+        if not result:
+            # The export came back without this OP
+            ttl = self.config_manager.get_sync_config()["negative_cache_ttl_seconds"]
+            self._misses[op_number] = time.monotonic() + ttl
+            return None
+
+        self._on_demand.update(result)
+        if self.search_index is not None:
+            self.search_index.update(result)
+        task = asyncio.ensure_future(self._persist(result))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return result[op_number]
+
+    async def _persist(self, ops: Dict[int, dict]) -> None:
+        """Writes OPs fetched on demand to disk, never while a sync is writing the cache."""
+        try:
+            async with self._cache_lock:
+                report = await asyncio.to_thread(self.cache.upsert, ops)
+                if report is not None:
+                    # Move on to the written generation: the binary cache
+                    # unmaps replaced views on its next write
+                    self.snapshot = await asyncio.to_thread(self.cache.snapshot) or self.snapshot
+        except Exception:
+            logging.exception("Failed to store on-demand OPs in the local cache.")
+
+    def start(self) -> None:
+        """Starts the periodic background refresh on the running event loop."""
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.ensure_future(self._run_scheduler())
+
+    def stop(self) -> None:
+        """Cancels the periodic refresh and any in-flight request."""
+        for task in (self._scheduler, self._inflight, self._index_task, *self._background):
+            if task is not None and not task.done():
+                task.cancel()
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+
+    def _get_parse_pool(self, sync_cfg: dict) -> Optional[ParallelExportParser]:
+        """Returns the process pool parser when 'parse_mode' is 'pool'."""
+        if sync_cfg["parse_mode"] != "pool":
+            return None
+        if self._parse_pool is None:
+            self._parse_pool = ParallelExportParser(workers=sync_cfg["parse_workers"])
+        return self._parse_pool
+
+    async def _run_scheduler(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval.total_seconds())
+
+    async def refresh(self) -> Optional[Dict[int, dict]]:
+        """
+        Refreshes the snapshot. Callers arriving while a refresh is already
+        running await that same request instead of starting another one.
+
+        Returns:
+            Optional[Dict[int, dict]]: The current snapshot after the refresh.
+        """
+        if not self.is_syncing:
+            self._inflight = asyncio.ensure_future(self._do_refresh())
+        return await asyncio.shield(self._inflight)
+
+    async def _do_refresh(self) -> Optional[Dict[int, dict]]:
+        # The sync merges into the loaded cache, never load it a second time
+        await self.wait_ready()
+        self._set_status(STATUS_SYNCING)
+
+        if not self.session_manager.is_authenticated:
+            if not await self.session_manager.login():
+                self._set_status(STATUS_OFFLINE)
+                return self.snapshot
+
+        sync_cfg = self.config_manager.get_sync_config()
+        full_sync_interval = timedelta(hours=sync_cfg["full_sync_interval_hours"])
+        changes = []
+        try:
+            async with self._cache_lock:
+                ops = await sync_op_data_on_carga_maquina(
+                    self.session_manager,
+                    mode=sync_cfg["mode"],
+                    full_sync_interval=full_sync_interval,
+                    shards=sync_cfg["shards"],
+                    max_concurrency=sync_cfg["max_concurrency"],
+                    parse_pool=self._get_parse_pool(sync_cfg),
+                    cache=self.cache,
+                    on_apply=lambda fresh, removed: changes.append((fresh, removed)),
+                )
+        except Exception:
+            logging.exception("Background OP synchronization failed.")
+            ops = None
+
+        if not ops:
+            # An expired session also ends up here; log in again on the next refresh
+            self.session_manager.is_authenticated = False
+            self._set_status(STATUS_ERROR)
+            return self.snapshot
+
+        # Swap in the freshly merged cache as a whole
+        self.snapshot = ops
+        self._misses.clear()
+        self.synced_at = dt.now()
+        for upserted, removed in changes:
+            self._update_index(upserted, removed)
+        self._set_status(STATUS_IDLE)
+        return self.snapshot
@@ -0,0 +1,232 @@
+"""
+In-memory type-ahead search over the OP cache.
+
+OP numbers and material codes are kept in sorted key lists, so a prefix
+query is a bisect followed by a scan of the matching range. Client names and
+descriptions are indexed by trigrams of their accent-insensitive form; since
+many OPs share the same product, each distinct (client, description) pair is
+indexed once and maps to the OPs that use it.
+"""
+
+import heapq
+import unicodedata
+from bisect import bisect_left, insort
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+NGRAM = 3
+DEFAULT_LIMIT = 20
+# Above this many matching products, newest OPs are found by a scan instead of a merge
+MERGE_MAX_PAIRS = 32
+
+# Field that matched, used to order the results
+MATCH_OP = "op"
+MATCH_MATERIAL = "material"
+MATCH_TEXT = "text"
+
+
+class SearchHit(NamedTuple):
+    code: int
+    material_code: str
+    client: str
+    description: str
+    match: str
+
+
+@lru_cache(maxsize=16384)
+def normalize(text: str) -> str:
+    """Case and accent-insensitive form of a text ("Ação" -> "acao")."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def ngrams(text: str) -> Set[str]:
+    return {text[i : i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def _prefix_range(keys: List[Tuple[str, int]], prefix: str) -> Iterable[Tuple[str, int]]:
+    """Yields the (key, code) entries whose key starts with `prefix`."""
+    for i in range(bisect_left(keys, (prefix,)), len(keys)):
+        key = keys[i]
+        if not key[0].startswith(prefix):
+            break
+        yield key
+
+
+class OpSearchIndex:
+    """
+    Type-ahead index over OP number, material code, client and description.
+
+    Build it with `from_ops` (e.g. in a worker thread) and keep it current
+    with `update`/`remove`. Instances are not thread-safe: once published,
+    an index must only be used and updated from one thread.
+    """
+
+    def __init__(self) -> None:
+        # code -> (material code, pair id)
+        self._entries: Dict[int, Tuple[str, int]] = {}
+        self._codes: List[int] = []
+        self._op_keys: List[Tuple[str, int]] = []
+        self._material_keys: List[Tuple[str, int]] = []
+
+        # Distinct (client, description) pairs and their normalized text
+        self._pairs: List[Tuple[str, str]] = []
+        self._pair_texts: List[str] = []
+        self._pair_ids: Dict[Tuple[str, str], int] = {}
+        # Sorted codes of the OPs of each pair
+        self._pair_codes: List[List[int]] = []
+        self._grams: Dict[str, Set[int]] = {}
+
+    @classmethod
+    def from_ops(cls, ops: Mapping[int, Mapping]) -> "OpSearchIndex":
+        """Builds an index over every OP of a snapshot."""
+        index = cls()
+        for code, op_data in ops.items():
+            index._add(code, op_data)
+        index._codes.sort()
+        index._op_keys.sort()
+        index._material_keys.sort()
+        for codes in index._pair_codes:
+            codes.sort()
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _pair_id(self, client: str, description: str) -> int:
+        pair = (client, description)
+        pair_id = self._pair_ids.get(pair)
+        if pair_id is None:
+            pair_id = self._pair_ids[pair] = len(self._pairs)
+            # Leading space so that " word" finds matches at the start of a word
+            text = " " + normalize(f"{client} {description}")
+            self._pairs.append(pair)
+            self._pair_texts.append(text)
+            self._pair_codes.append([])
+            for gram in ngrams(text):
+                self._grams.setdefault(gram, set()).add(pair_id)
+        return pair_id
+
+    def _add(self, code: int, op_data: Mapping, keep_sorted: bool = False) -> None:
+        material = op_data.get("material_code") or ""
+        pair_id = self._pair_id(op_data.get("client") or "", op_data.get("description") or "")
+        self._entries[code] = (material, pair_id)
+
+        add = insort if keep_sorted else list.append
+        add(self._codes, code)
+        add(self._pair_codes[pair_id], code)
+        add(self._op_keys, (str(code), code))
+        add(self._material_keys, (normalize(material), code))
+
+    def _discard(self, code: int) -> None:
+        entry = self._entries.pop(code, None)
+        if entry is None:
+            return
+        material, pair_id = entry
+        for keys, key in (
+            (self._codes, code),
+            (self._pair_codes[pair_id], code),
+            (self._op_keys, (str(code), code)),
+            (self._material_keys, (normalize(material), code)),
+        ):
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    def update(self, ops: Mapping[int, Mapping]) -> None:
+        """Adds or replaces OPs, e.g. after a delta sync or an on-demand fetch."""
+        for code, op_data in ops.items():
+            self._discard(code)
+            self._add(code, op_data, keep_sorted=True)
+
+    def remove(self, codes: Iterable[int]) -> None:
+        for code in codes:
+            self._discard(code)
+
+    def _hit(self, code: int, match: str) -> SearchHit:
+        material, pair_id = self._entries[code]
+        client, description = self._pairs[pair_id]
+        return SearchHit(code, material, client, description, match)
+
+    def _text_matches(self, words: List[str]) -> Tuple[List[int], List[int]]:
+        """
+        Pair ids whose text contains every word, split into matches at the
+        start of words and matches anywhere else.
+        """
+        grams = set()
+        for word in words:
+            grams |= ngrams(word)
+        if not grams:
+            return [], []
+
+        # Intersect the rarest grams first
+        candidates: Optional[Set[int]] = None
+        for gram in sorted(grams, key=lambda g: len(self._grams.get(g, ()))):
+            found = self._grams.get(gram)
+            if not found:
+                return [], []
+            candidates = set(found) if candidates is None else candidates & found
+            if not candidates:
+                return [], []
+
+        # One filtering pass per word keeps the loops in comprehensions
+        texts = self._pair_texts
+        matching = list(candidates)
+        for word in words:
+            matching = [i for i in matching if word in texts[i]]
+        best = matching
+        for word in words:
+            spaced = " " + word
+            best = [i for i in best if spaced in texts[i]]
+        best_ids = set(best)
+        return best, [i for i in matching if i not in best_ids]
+
+    def _newest(self, pair_ids: List[int]) -> Iterator[int]:
+        """Codes of the OPs of the given pairs, newest first."""
+        if len(pair_ids) <= MERGE_MAX_PAIRS:
+            return heapq.merge(
+                *(reversed(self._pair_codes[i]) for i in pair_ids), reverse=True
+            )
+        # Broad matches: walking all OPs from the newest finds enough quickly
+        wanted = set(pair_ids)
+        entries = self._entries
+        return (code for code in reversed(self._codes) if entries[code][1] in wanted)
+
+    def search(
+        self, query: str, limit: int = DEFAULT_LIMIT, text: bool = True
+    ) -> List[SearchHit]:
+        """
+        Returns up to `limit` OPs matching `query`: OP number prefixes first,
+        then material code prefixes, then client/description matches (newest
+        OPs first). `text=False` skips the client/description matching.
+        """
+        query = normalize(query.strip())
+        if not query or limit <= 0:
+            return []
+
+        hits: List[SearchHit] = []
+        seen: Set[int] = set()
+
+        def add(code: int, match: str) -> bool:
+            if code not in seen:
+                seen.add(code)
+                hits.append(self._hit(code, match))
+            return len(hits) >= limit
+
+        if query.isdigit():
+            for _, code in _prefix_range(self._op_keys, query):
+                if add(code, MATCH_OP):
+                    return hits
+
+        for _, code in _prefix_range(self._material_keys, query):
+            if add(code, MATCH_MATERIAL):
+                return hits
+
+        words = query.split()
+        if text and any(len(word) >= NGRAM for word in words):
+            for pair_ids in self._text_matches(words):
+                # Lazy and newest first: stops as soon as `limit` OPs are found
+                for code in self._newest(pair_ids):
+                    if add(code, MATCH_TEXT):
+                        return hits
+        return hits
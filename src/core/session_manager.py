@@ -9,6 +9,8 @@ from src.core.config import ConfigManager
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
+DEFAULT_SERVER_URL = "https://lanx.cargamaquina.com.br/"
+
 
 class SessionManager:
     """
@@ -21,6 +23,7 @@ class SessionManager:
         self.session = None
         self.base_url = ""
         self.login_code_url = ""
+        self.is_authenticated = False
 
     async def _ensure_session(self) -> None:
         """Ensures the aiohttp session is created within an active event loop."""
@@ -46,12 +49,12 @@ class SessionManager:
             logging.warning("Missing credentials. Cannot attempt login.")
             return False
         await self._ensure_session()
+        self.is_authenticated = False
 
         try:
             logging.info("Fetching CSRF token from CargaMaquina...")
-            async with self.session.get(
-                "https://lanx.cargamaquina.com.br/", allow_redirects=True
-            ) as response:
+            server_url = self.config_manager.get("server_url") or DEFAULT_SERVER_URL
+            async with self.session.get(server_url, allow_redirects=True) as response:
                 response.raise_for_status()
                 response_text = await response.text()
 
@@ -95,6 +98,7 @@ class SessionManager:
                         return False
 
                     logging.info("Login successful! Session is now authenticated.")
+                    self.is_authenticated = True
                     return True
 
         except aiohttp.ClientError as e:
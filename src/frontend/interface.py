@@ -5,6 +5,7 @@ from PySide6.QtGui import QCloseEvent
 
 from src.core.config import ConfigManager
 from src.core.session_manager import SessionManager
+from src.core.order_sync import OrderSyncService
 from src.core.balance import BalanceCommunication
 from src.utils.printer import PrinterManager
 from src.frontend.tabs.shipping_tab import ShippingTab
@@ -18,6 +19,7 @@ class ShippingInterface(QMainWindow):
         printer_manager: PrinterManager,
         balance: BalanceCommunication,
         session_manager: SessionManager,
+        order_sync: OrderSyncService,
         is_connected: bool = True,
     ):
         super().__init__()
@@ -25,6 +27,7 @@ class ShippingInterface(QMainWindow):
         self.printer_manager = printer_manager
         self.balance = balance
         self.session_manager = session_manager
+        self.order_sync = order_sync
         self.is_connected = is_connected
 
         self.setWindowTitle("Gerador de Etiquetas - Expedição")
@@ -40,6 +43,7 @@ class ShippingInterface(QMainWindow):
             self.printer_manager,
             self.balance,
             self.session_manager,
+            self.order_sync,
             self.is_connected,
         )
         self.config_tab = ConfigsTab(self.config_manager, self.printer_manager)
@@ -49,6 +53,11 @@ class ShippingInterface(QMainWindow):
 
     def closeEvent(self, event: QCloseEvent):
         logging.info("Shutting down application...")
+        if self.order_sync:
+            self.order_sync.stop()
+
+        self.shipping_tab.render_pool.shutdown()
+
         if self.balance and self.balance.is_open:
             self.balance.stop_serial()
             self.balance.close()
@@ -1,9 +1,8 @@
-import pathlib
-import json
+import asyncio
 import logging
 import webbrowser
+from typing import Optional, Tuple
 import qasync
-from datetime import datetime as dt, timedelta
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -16,16 +15,37 @@ from PySide6.QtWidgets import (
     QComboBox,
     QCheckBox,
     QMessageBox,
+    QCompleter,
 )
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QKeyEvent
+from PySide6.QtCore import Qt, QTimer, QModelIndex
+from PySide6.QtGui import QKeyEvent, QStandardItem, QStandardItemModel
 
-from src.core.api import get_all_op_data_on_carga_maquina
+from src.core.order_sync import STATUS_ERROR, STATUS_OFFLINE, STATUS_SYNCING
+from src.core.search_index import SearchHit
+from src.frontend.widgets.label_preview import LabelPreview
 from src.models.schema import OrdemDeProducao
-from src.utils.labels import ShippingLabelGenerator
+from src.utils.labels import LabelRenderPool, ShippingLabelGenerator, is_png_format
 from src.utils.csv_logger import log_print_action
 
 
+# Completer item role holding the OP code of the suggestion
+OP_CODE_ROLE = Qt.ItemDataRole.UserRole
+# Suggestions shown by the type-ahead completers
+COMPLETION_LIMIT = 15
+# Inputs drawn on the label, and the pause after an edit before the preview is re-rendered
+PREVIEW_INPUTS = (
+    "op_input",
+    "code_input",
+    "client_code_input",
+    "client_input",
+    "description_input",
+    "quantity_input",
+    "box_count_input",
+    "weight_input",
+)
+PREVIEW_DELAY_MS = 300
+
+
 class ShippingTab(QWidget):
     def __init__(
         self,
@@ -33,6 +53,7 @@ class ShippingTab(QWidget):
         printer_manager,
         balance,
         session_manager,
+        order_sync,
         is_connected=True,
         parent=None,
     ):
@@ -41,25 +62,30 @@ class ShippingTab(QWidget):
         self.printer_manager = printer_manager
         self.balance = balance
         self.session_manager = session_manager
+        self.order_sync = order_sync
         self.is_connected = is_connected
-
-        # In-memory cache for OPs fetched in the session
-        self.cached_ops = None
-
-        # Absolute path to the tmp folder at project root
-        project_root = pathlib.Path(__file__).parent.parent.parent.parent
-        tmp_dir = project_root / "tmp"
-
-        # Search for any existing ordens_*.json file to reuse
-        existing_files = list(tmp_dir.glob("ordens_*.json"))
-        if existing_files:
-            self.order_data_path = existing_files[0]
-        else:
-            start_date = (dt.now() - timedelta(days=50)).strftime("%d-%m-%Y")
-            end_date = (dt.now() + timedelta(days=50)).strftime("%d-%m-%Y")
-            self.order_data_path = tmp_dir / f"ordens_{start_date}_{end_date}.json"
+        # (configured printer, its label format); see label_format()
+        self._label_format: Optional[Tuple[str, str]] = None
+
+        # Worker processes for the per-box labels of large orders (0 = all cores),
+        # started ahead of the first order only when the printer takes PNGs;
+        # otherwise they are never used, or started by the first job needing them
+        self.render_pool = LabelRenderPool(
+            workers=self.config_manager.get("label_render_workers", 0)
+        )
+        if is_png_format(self.label_format()):
+            self.render_pool.warm_up()
 
         self.create_layout()
+        self.create_completers()
+        self.create_preview_timer()
+
+        # Keep the snapshot age label current between sync events
+        self.sync_status_timer = QTimer(self)
+        self.sync_status_timer.timeout.connect(self.update_sync_status)
+        self.sync_status_timer.start(30_000)
+        self.order_sync.add_listener(self.update_sync_status)
+        self.update_sync_status()
 
     def create_layout(self) -> None:
         """Constructs the UI layout."""
@@ -184,6 +210,8 @@ class ShippingTab(QWidget):
         self.author_button.setStyleSheet(
             "color: #475569; border: none; font-size: 12px; text-align: left;"
         )
+        self.sync_status_label = QLabel()
+        self.sync_status_label.setStyleSheet("color: #475569; font-size: 12px;")
 
         for i in range(1, 10):
             self.port_select.addItem(f"COM{i}")
@@ -196,8 +224,7 @@ class ShippingTab(QWidget):
         self.print_button.clicked.connect(self.on_print_button_clicked)
         self.author_button.clicked.connect(self.on_author_button_clicked)
 
-        if not self.is_connected:
-            self.search_button.setText("Busca Offline")
+        self.search_button.setText(self.search_button_text())
 
         self.grid_layout.addWidget(self.port_select, 0, 3)
         self.v_layout.addLayout(self.grid_layout)
@@ -210,10 +237,139 @@ class ShippingTab(QWidget):
         self.h_layout.addStretch()
         self.v_layout.addSpacing(20)
         self.v_layout.addLayout(self.h_layout)
-        self.v_layout.addStretch()
-        self.v_layout.addWidget(self.author_button)
+        self.v_layout.addSpacing(10)
+        self.label_preview = LabelPreview()
+        self.v_layout.addWidget(self.label_preview, 1)
+        self.footer_layout = QHBoxLayout()
+        self.footer_layout.addWidget(self.author_button)
+        self.footer_layout.addStretch()
+        self.footer_layout.addWidget(self.sync_status_label)
+        self.v_layout.addLayout(self.footer_layout)
         self.setLayout(self.v_layout)
 
+    def create_completers(self) -> None:
+        """
+        Type-ahead suggestions on the OP and product code inputs, answered by
+        the search index of the OP snapshot. Picking one searches that OP.
+        """
+        for name in ("op_input", "code_input"):
+            line_edit = getattr(self, name)
+            completer = QCompleter(QStandardItemModel(self), self)
+            completer.setCompletionMode(
+                QCompleter.CompletionMode.UnfilteredPopupCompletion
+            )
+            completer.setWidget(line_edit)
+            completer.activated[QModelIndex].connect(self.on_completion_activated)
+            line_edit.textEdited.connect(
+                lambda text, c=completer: self.update_completions(c, text)
+            )
+            setattr(self, f"{name}_completer", completer)
+
+    def create_preview_timer(self) -> None:
+        """Re-renders the label preview once the form stops changing."""
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DELAY_MS)
+        self.preview_timer.timeout.connect(self.update_preview)
+        # Renders still running when a newer one is requested are discarded
+        self.preview_request = 0
+        for name in PREVIEW_INPUTS:
+            getattr(self, name).textChanged.connect(lambda _text: self.preview_timer.start())
+
+    def form_order(self) -> OrdemDeProducao:
+        """OP described by the form inputs. Raises ValueError for invalid data."""
+        return OrdemDeProducao(
+            code=int(getattr(self, "op_input").text()),
+            material_code=getattr(self, "code_input").text(),
+            client=getattr(self, "client_input").text(),
+            description=getattr(self, "description_input").text(),
+            client_code=getattr(self, "client_code_input").text(),
+            quantity=int(getattr(self, "quantity_input").text()),
+            box_count=int(getattr(self, "box_count_input").text() or 1),
+            weight=getattr(self, "weight_input").text(),
+        )
+
+    def target_printer(self) -> str:
+        return (
+            self.config_manager.get("printer_name", "")
+            or self.printer_manager.get_default_printer()
+        )
+
+    def label_format(self) -> str:
+        """
+        Label format of the target printer, resolved again only when the
+        configured printer changes: without one, finding the system default
+        runs 'lpstat', too slow to repeat on every preview.
+        """
+        printer_name = self.config_manager.get("printer_name", "")
+        if self._label_format is None or self._label_format[0] != printer_name:
+            output_format = self.config_manager.get_label_format(self.target_printer())
+            self._label_format = (printer_name, output_format)
+        return self._label_format[1]
+
+    @qasync.asyncSlot()
+    async def update_preview(self) -> None:
+        """Renders the first box label of the form in memory, off the UI thread."""
+        self.preview_request += 1
+        request = self.preview_request
+
+        op_text = getattr(self, "op_input").text().strip()
+        qty_text = getattr(self, "quantity_input").text().strip()
+        if not op_text or not qty_text:
+            self.label_preview.show_message()
+            return
+
+        try:
+            op = self.form_order()
+        except ValueError:
+            self.label_preview.show_message("Dados da etiqueta inválidos")
+            return
+
+        generator = ShippingLabelGenerator(op, self.label_format())
+        try:
+            img = await asyncio.to_thread(generator.render_preview)
+        except Exception as e:
+            logging.warning(f"Failed to render label preview: {e}")
+            img = None
+
+        if request != self.preview_request:
+            return
+        if img is None:
+            self.label_preview.show_message("Falha ao gerar a pré-visualização")
+        else:
+            self.label_preview.set_label(img)
+
+    def update_completions(self, completer: QCompleter, text: str) -> None:
+        """Refreshes the suggestions of a completer for the typed text."""
+        hits = []
+        if len(text.strip()) >= 2:
+            hits = self.order_sync.search(text, COMPLETION_LIMIT)
+
+        model: QStandardItemModel = completer.model()
+        model.clear()
+        for hit in hits:
+            model.appendRow(self.completion_item(hit))
+
+        if hits:
+            completer.complete()
+        else:
+            completer.popup().hide()
+
+    @staticmethod
+    def completion_item(hit: SearchHit) -> QStandardItem:
+        item = QStandardItem(
+            f"{hit.code} · {hit.material_code} · {hit.client} · {hit.description}"
+        )
+        item.setData(hit.code, OP_CODE_ROLE)
+        return item
+
+    def on_completion_activated(self, index: QModelIndex) -> None:
+        op_code = index.data(OP_CODE_ROLE)
+        if op_code is None:
+            return
+        getattr(self, "op_input").setText(str(op_code))
+        self.on_search_button_clicked()
+
     def keyPressEvent(self, event: QKeyEvent) -> None:
         if (
             event.key() == Qt.Key.Key_Return
@@ -249,6 +405,46 @@ class ShippingTab(QWidget):
     def on_author_button_clicked(self):
         webbrowser.open("https://github.com/Rafaeros")
 
+    def update_sync_status(self) -> None:
+        """Shows the age of the OP snapshot and the background sync status."""
+        age = self.order_sync.snapshot_age()
+        if not self.order_sync.is_ready:
+            text = "Base de OPs: carregando..."
+        elif self.order_sync.snapshot is None:
+            text = "Base de OPs: não carregada"
+        elif age is None:
+            text = "Base de OPs: idade desconhecida"
+        else:
+            minutes = int(age.total_seconds() // 60)
+            if minutes < 1:
+                text = "Base de OPs: atualizada agora"
+            elif minutes < 60:
+                text = f"Base de OPs: atualizada há {minutes} min"
+            else:
+                text = f"Base de OPs: atualizada há {minutes // 60} h {minutes % 60} min"
+            if not self.order_sync.is_fresh():
+                text += " (desatualizada)"
+
+        status = self.order_sync.status
+        if status == STATUS_SYNCING:
+            text += " · Sincronizando..."
+        elif status == STATUS_OFFLINE:
+            text += " · Offline"
+        elif status == STATUS_ERROR:
+            text += " · Falha na sincronização"
+
+        self.sync_status_label.setText(text)
+
+        self.is_connected = self.session_manager.is_authenticated
+        if self.search_button.isEnabled():
+            self.search_button.setText(self.search_button_text())
+
+    def search_button_text(self) -> str:
+        """Search button label for the cache loading and connection state."""
+        if not self.order_sync.is_ready:
+            return "Carregando OPs..."
+        return "Buscar OP" if self.is_connected else "Busca Offline"
+
     @qasync.asyncSlot()
     async def on_search_button_clicked(self) -> None:
         op_str = getattr(self, "op_input").text().strip()
@@ -268,45 +464,22 @@ class ShippingTab(QWidget):
         self.search_button.setEnabled(False)
 
         try:
-            # 1. Check if data is already in memory (Session Cache)
-            if self.cached_ops is None:
-
-                # 2. Check if the daily orders file exists
-                if self.order_data_path.exists():
-                    logging.info(
-                        "Local file found: %s. Loading data...",
-                        self.order_data_path.name,
-                    )
-                    with open(self.order_data_path, "r", encoding="utf-8") as f:
-                        self.cached_ops = {int(k): v for k, v in json.load(f).items()}
+            # Answer from the current snapshot; only wait for a sync when
+            # there is no local data at all
+            await self.order_sync.wait_ready()
+            if self.order_sync.snapshot is None:
+                await self.order_sync.refresh()
 
-                # 3. If file doesn't exist, call API to download
-                else:
-                    logging.info(
-                        "Local file %s not found. Downloading from API...",
-                        self.order_data_path.name,
-                    )
-                    if self.is_connected:
-                        self.cached_ops = await get_all_op_data_on_carga_maquina(
-                            self.session_manager
-                        )
-                    else:
-                        QMessageBox.warning(
-                            self,
-                            "Modo Offline",
-                            "Você está offline e o arquivo de dados de hoje não foi encontrado.",
-                        )
-                        return
-
-                # Final fallback in case API fails
-                if not self.cached_ops:
+                if self.order_sync.snapshot is None:
                     QMessageBox.warning(
-                        self, "Erro", "Falha ao obter os dados das OPs."
+                        self,
+                        "Modo Offline" if not self.is_connected else "Erro",
+                        "Falha ao obter os dados das OPs.",
                     )
                     return
 
-            # Search memory cache
-            op_data = self.cached_ops.get(op_number)
+            # Falls back to fetching only this OP when it is not in the snapshot
+            op_data = await self.order_sync.lookup(op_number)
 
             if not op_data:
                 QMessageBox.warning(
@@ -341,13 +514,15 @@ class ShippingTab(QWidget):
                 self, "Erro", "Ocorreu um erro ao processar a busca da OP."
             )
         finally:
-            self.search_button.setText(
-                "Buscar OP" if self.is_connected else "Busca Offline"
-            )
+            self.search_button.setText(self.search_button_text())
             self.search_button.setEnabled(True)
 
     @qasync.asyncSlot()
     async def on_print_button_clicked(self):
+        # Enter on the weight input also prints; ignore it while a job renders
+        if not self.print_button.isEnabled():
+            return
+
         op_text = getattr(self, "op_input").text()
         qty_text = getattr(self, "quantity_input").text()
         weight_text = getattr(self, "weight_input").text()
@@ -365,38 +540,48 @@ class ShippingTab(QWidget):
             return
 
         try:
-            op = OrdemDeProducao(
-                code=int(op_text),
-                material_code=getattr(self, "code_input").text(),
-                client=getattr(self, "client_input").text(),
-                description=getattr(self, "description_input").text(),
-                client_code=getattr(self, "client_code_input").text(),
-                quantity=int(qty_text),
-                box_count=int(getattr(self, "box_count_input").text() or 1),
-                weight=weight_text,
-            )
+            op = self.form_order()
+            target_printer = self.target_printer()
 
-            generator = ShippingLabelGenerator(op)
-            success, error, paths = generator.generate()
+            generator = ShippingLabelGenerator(
+                op,
+                self.config_manager.get_label_format(target_printer),
+                self.render_pool,
+            )
+            # Rendering (and waiting for the render pool) runs off the UI thread
+            self.print_button.setEnabled(False)
+            try:
+                success, error, documents = await asyncio.to_thread(generator.render)
+            finally:
+                self.print_button.setEnabled(True)
 
             if not success:
                 QMessageBox.warning(self, "Erro", error)
                 return
 
-            target_printer = (
-                self.config_manager.get("printer_name", "")
-                or self.printer_manager.get_default_printer()
-            )
-
-            all_printed = True
-            for path in paths:
-                if not self.printer_manager.print_document(path, target_printer):
-                    all_printed = False
+            # Labels go to the spooler from memory; files are only written
+            # when archiving is enabled or the platform needs them to print
+            names = [document.name for document in documents]
+            in_memory = self.printer_manager.can_print_streams(names)
+            try:
+                paths = []
+                if self.config_manager.get("archive_labels", False) or not in_memory:
+                    paths = generator.save(documents)
+
+                # One job per OP: all box labels are submitted together
+                if in_memory:
+                    all_printed = self.printer_manager.print_streams(documents, target_printer)
+                else:
+                    all_printed = self.printer_manager.print_documents(paths, target_printer)
+            except OSError:
+                # Full disk, unwritable labels folder or /dev/shm, missing 'lp'
+                logging.exception("Failed to write or spool the shipping labels.")
+                all_printed = False
 
             if all_printed:
                 # Log metrics
                 is_manual_weight = self.weight_checkbox.isChecked()
-                log_print_action(op, len(paths), is_manual_weight)
+                log_print_action(op, op.box_count, is_manual_weight)
 
                 QMessageBox.information(
                     self, "Sucesso", "Etiqueta impressa com sucesso"
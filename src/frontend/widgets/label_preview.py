@@ -0,0 +1,63 @@
+from typing import Optional
+
+from PIL import Image
+from PySide6.QtCore import QRectF, Qt
+from PySide6.QtGui import QColor, QImage, QPainter, QPaintEvent, qRgb
+from PySide6.QtWidgets import QWidget
+
+
+class LabelPreview(QWidget):
+    """
+    Shows a label rendered in memory, scaled to fit the widget.
+    Pillow does not expose its pixel storage as a single buffer, so each
+    refresh makes one raw copy of the pixels (`tobytes()`, as `ImageQt`
+    does) for the QImage to wrap; the label is never encoded to PNG nor
+    written to a file.
+    """
+
+    PLACEHOLDER = "Pré-visualização da etiqueta"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._image: Optional[QImage] = None
+        # Pixels wrapped by _image; QImage does not keep its buffer alive
+        self._buffer: Optional[bytes] = None
+        self._message = self.PLACEHOLDER
+        self.setMinimumSize(360, 240)
+
+    def set_label(self, img: Image.Image) -> None:
+        """Displays a Pillow image in mode "RGB" or "1"."""
+        if img.mode == "1":
+            # Pillow packs 1-bit rows MSB first, padded to a byte, 1 = white
+            self._buffer = img.tobytes()
+            image = QImage(self._buffer, img.width, img.height, (img.width + 7) // 8, QImage.Format.Format_Mono)
+            image.setColorTable([qRgb(0, 0, 0), qRgb(255, 255, 255)])
+        else:
+            img = img.convert("RGB") if img.mode != "RGB" else img
+            self._buffer = img.tobytes()
+            image = QImage(self._buffer, img.width, img.height, img.width * 3, QImage.Format.Format_RGB888)
+        self._image = image
+        self.update()
+
+    def show_message(self, message: str = PLACEHOLDER) -> None:
+        """Replaces the preview with a message (e.g. while the form is incomplete)."""
+        self._image = None
+        self._buffer = None
+        self._message = message
+        self.update()
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#E2E8F0"))
+
+        if self._image is None:
+            painter.setPen(QColor("#475569"))
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, self._message)
+            return
+
+        # Largest rectangle with the label's aspect ratio, centered
+        scale = min(self.width() / self._image.width(), self.height() / self._image.height())
+        width, height = self._image.width() * scale, self._image.height() * scale
+        target = QRectF((self.width() - width) / 2, (self.height() - height) / 2, width, height)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.drawImage(target, self._image)
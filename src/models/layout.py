@@ -0,0 +1,124 @@
+"""
+Declarative label layouts.
+
+A layout is a list of elements (text, wrapped text, boxes, lines, icons,
+Code39 and QR barcodes) placed on a page with its origin at the bottom-left
+corner, in the layout's unit ("pt" or "mm"). Font sizes and line leading are
+always in points. Text, barcode values and QR data are `str.format`
+templates filled with the label values (e.g. "{client}", "{qty} UN"); an
+element with `when` set is only drawn when that value is not empty.
+"""
+
+from typing import Annotated, List, Literal, Optional, Tuple, Union
+
+from pydantic import BaseModel, Field
+
+
+class LayoutElement(BaseModel):
+    when: str = ""
+
+
+class TextAfter(BaseModel):
+    """Text whose rendered width is added to the x of the element that follows it."""
+    text: str
+    font: str
+    size: float
+
+
+class TextElement(LayoutElement):
+    type: Literal["text"]
+    x: float
+    y: float
+    text: str
+    font: str
+    size: float
+    centered: bool = False
+    after: Optional[TextAfter] = None
+
+
+class TextBlockElement(LayoutElement):
+    """Text wrapped into lines of `width`; `y` is the baseline of the first line."""
+    type: Literal["text_block"]
+    x: float
+    y: float
+    width: float
+    text: str
+    font: str
+    size: float
+    leading: float
+    max_lines: int = Field(default=1, ge=1)
+
+
+class RectElement(LayoutElement):
+    type: Literal["rect"]
+    x: float
+    y: float
+    width: float
+    height: float
+    line_width: float
+
+
+class LineElement(LayoutElement):
+    type: Literal["line"]
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+    line_width: float
+
+
+class IconElement(LayoutElement):
+    """Square frame with line segments (x1, y1, x2, y2) relative to its bottom-left corner."""
+    type: Literal["icon"]
+    x: float
+    y: float
+    size: float
+    line_width: float
+    lines: List[Tuple[float, float, float, float]]
+
+
+class Code39Element(LayoutElement):
+    """Code39 barcode without check digit; `module` is the narrow bar width."""
+    type: Literal["code39"]
+    x: float
+    y: float
+    value: str
+    height: float
+    module: float
+
+
+class QrElement(LayoutElement):
+    type: Literal["qr"]
+    x: float
+    y: float
+    size: float
+    data: str
+
+
+Element = Annotated[
+    Union[
+        TextElement,
+        TextBlockElement,
+        RectElement,
+        LineElement,
+        IconElement,
+        Code39Element,
+        QrElement,
+    ],
+    Field(discriminator="type"),
+]
+
+
+class LabelLayout(BaseModel):
+    """
+    A label format. It is used for the orders whose material code starts
+    with one of `material_prefixes`; `box_id` is the template of the per-box
+    identification, filled with the label values plus the box `index`.
+    """
+    name: str
+    unit: Literal["pt", "mm"] = "pt"
+    width: float
+    height: float
+    material_prefixes: List[str] = []
+    box_id: str = "{index}"
+    elements: List[Element]
@@ -1,6 +1,40 @@
 import re
-from typing import Union
-from pydantic import BaseModel, Field, model_validator
+from datetime import date, datetime
+from typing import List, NamedTuple, Optional, Tuple, Union
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, model_validator
+
+# Client code in parentheses inside the description, e.g. "CHICOTE (TRUCKS: TC-100)"
+CLIENT_CODE_PATTERN = re.compile(r"\((.*?)\)")
+PARENTHESES_PATTERN = re.compile(r"\s*\(.*?\)")
+
+
+def extract_codes(
+    material_code: str, client: str, description: str, client_code: str = ""
+) -> Tuple[str, str, str]:
+    """
+    Extracts the client code from the description and formats the barcode.
+    TRUCKS clients keep only the part after "TRUCKS:".
+
+    Returns:
+        Tuple[str, str, str]: (description without the code, client code, barcode)
+    """
+    match = CLIENT_CODE_PATTERN.search(description)
+    if match:
+        raw_client_code = match.group(1).strip()
+        if client.upper().startswith("TRUCKS") and raw_client_code.upper().startswith("TRUCKS"):
+            client_code = raw_client_code.split(":")[-1].strip()
+        else:
+            client_code = raw_client_code
+
+        description = PARENTHESES_PATTERN.sub("", description).strip()
+
+    if client_code:
+        barcode = f"{material_code} ({client_code})"
+    else:
+        barcode = material_code
+
+    return description, client_code, barcode
+
 
 class OrdemDeProducao(BaseModel):
     """
@@ -20,19 +54,93 @@ class OrdemDeProducao(BaseModel):
 
     @model_validator(mode='after')
     def extract_and_format_codes(self) -> 'OrdemDeProducao':
-        match = re.search(r"\((.*?)\)", self.description)
-        if match:
-            raw_client_code = match.group(1).strip()
-            if self.client.upper().startswith("TRUCKS") and raw_client_code.upper().startswith("TRUCKS"):
-                self.client_code = raw_client_code.split(":")[-1].strip()
-            else:
-                self.client_code = raw_client_code
-                
-            self.description = re.sub(r"\s*\(.*?\)", "", self.description).strip()
-        
-        if self.client_code:
-            self.barcode = f"{self.material_code} ({self.client_code})"
-        else:
-            self.barcode = self.material_code
-            
-        return self
\ No newline at end of file
+        self.description, self.client_code, self.barcode = extract_codes(
+            self.material_code, self.client, self.description, self.client_code
+        )
+        return self
+
+
+class OpRow(NamedTuple):
+    """Raw values of one export row, before the codes are extracted."""
+    code: int
+    material_code: str
+    client: str
+    description: str
+    quantity: int
+
+
+_OP_ROWS = TypeAdapter(List[OpRow])
+
+
+def validate_op_rows(rows: List[OpRow]) -> List[dict]:
+    """
+    Validates a batch of export rows in one call and returns the cache entries,
+    identical to `OrdemDeProducao(...).model_dump()` with box_count=1 and
+    weight=0. Invalid rows are dropped.
+    """
+    try:
+        valid = _OP_ROWS.validate_python(rows)
+    except ValidationError as e:
+        invalid = {error["loc"][0] for error in e.errors() if error["loc"]}
+        valid = _OP_ROWS.validate_python(
+            [row for index, row in enumerate(rows) if index not in invalid]
+        )
+
+    ops = []
+    for code, material_code, client, description, quantity in valid:
+        description, client_code, barcode = extract_codes(material_code, client, description)
+        ops.append(
+            {
+                "code": code,
+                "material_code": material_code,
+                "client": client,
+                "description": description,
+                "quantity": quantity,
+                "box_count": 1,
+                "weight": 0,
+                "client_code": client_code,
+                "barcode": barcode,
+            }
+        )
+    return ops
+
+class SyncState(BaseModel):
+    """
+    High-water mark of the local OP cache.
+    Records when and for which delivery window the cache was last synchronized.
+    """
+    last_sync: datetime
+    last_full_sync: datetime
+    start_date: date
+    end_date: date
+    cache_file: str = ""
+
+
+class CacheGeneration(BaseModel):
+    """One generation file of a file-based OP cache, as recorded in its manifest."""
+    number: int
+    file: str
+    synced_at: datetime
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    rows: int
+    size: int
+
+
+class CacheManifest(BaseModel):
+    """Generations of a file-based OP cache, oldest first."""
+    generations: List[CacheGeneration] = []
+
+
+class MergeReport(BaseModel):
+    """Counts of cache entries changed by a synchronization."""
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.added} added, {self.updated} updated, "
+            f"{self.removed} removed, {self.unchanged} unchanged"
+        )
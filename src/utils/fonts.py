@@ -0,0 +1,169 @@
+"""
+Font registry shared by the Pillow (PNG) and ReportLab (PDF) label backends.
+
+Faces are referred to by name (e.g. "FiraCodeBold") and resolved to a file in
+src/assets/fonts. A face whose file is missing is reported once and replaced
+by its fallback face, so both backends render it the same way. Pillow fonts
+are kept in a bounded cache keyed by (file, pixel size) and can be preloaded
+in a background thread before the first label is printed.
+"""
+
+import logging
+import pathlib
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PIL import ImageFont
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+FONTS_PATH = pathlib.Path(__file__).resolve().parent.parent / "assets" / "fonts"
+
+FONT_FILES = {
+    "FiraCodeRegular": "FiraCode-Regular.ttf",
+    "FiraCodeBold": "FiraCode-Bold.ttf",
+    "ConsolasRegular": "Consolas-Regular.ttf",
+    "YugoSemiBold": "Yugo-SemiBold.ttc",
+    "YugoSemiLight": "Yugo-SemiLight.ttc",
+    "LucidaConsoleRegular": "LucidaConsole-Regular.ttf",
+    "DubaiBold": "Dubai-Bold.ttf",
+}
+
+# Face rendered in place of a face whose file is missing
+FALLBACKS = {
+    "ConsolasRegular": "FiraCodeRegular",
+    "YugoSemiBold": "FiraCodeBold",
+    "YugoSemiLight": "FiraCodeRegular",
+    "LucidaConsoleRegular": "FiraCodeRegular",
+    "DubaiBold": "FiraCodeBold",
+}
+DEFAULT_FACE = "FiraCodeRegular"
+# ReportLab standard font used when not even the fallback file exists
+PDF_STANDARD_FONT = "Helvetica"
+
+FONT_CACHE_SIZE = 64
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def _load_pil_font(path: Optional[str], size_px: int) -> ImageFont.FreeTypeFont:
+    if path is None:
+        return ImageFont.load_default()
+    try:
+        return ImageFont.truetype(path, size_px)
+    except IOError as e:
+        logging.warning("Could not load font %s: %s", path, e)
+        return ImageFont.load_default()
+
+
+class FontRegistry:
+    """
+    Resolves font faces to files once and hands out Pillow fonts and
+    ReportLab font names for them. Safe to use from several threads.
+    """
+
+    def __init__(
+        self,
+        folder: pathlib.Path = FONTS_PATH,
+        files: Dict[str, str] = FONT_FILES,
+        fallbacks: Dict[str, str] = FALLBACKS,
+    ) -> None:
+        self.folder = folder
+        self.files = files
+        self.fallbacks = fallbacks
+        self._lock = threading.Lock()
+        # face -> face whose file is used, None when no file is usable
+        self._resolved: Dict[str, Optional[str]] = {}
+        self._pdf_fonts: Dict[str, str] = {}
+
+    def _has_file(self, face: str) -> bool:
+        return face in self.files and (self.folder / self.files[face]).is_file()
+
+    def resolve(self, face: str) -> Optional[str]:
+        """Face whose file renders `face`: itself, its fallback, the default or None."""
+        with self._lock:
+            if face in self._resolved:
+                return self._resolved[face]
+
+            resolved = next(
+                (
+                    candidate
+                    for candidate in (face, self.fallbacks.get(face), DEFAULT_FACE)
+                    if candidate and self._has_file(candidate)
+                ),
+                None,
+            )
+            if resolved != face:
+                logging.warning(
+                    "Font '%s' not found in %s, using %s instead.",
+                    face,
+                    self.folder,
+                    resolved or "the built-in font",
+                )
+            self._resolved[face] = resolved
+            return resolved
+
+    def path(self, face: str) -> Optional[pathlib.Path]:
+        resolved = self.resolve(face)
+        return self.folder / self.files[resolved] if resolved else None
+
+    def check(self, faces: Optional[Iterable[str]] = None) -> List[str]:
+        """Resolves the faces (all known faces by default), reporting the missing ones. Returns them."""
+        faces = list(self.files) if faces is None else list(faces)
+        return [face for face in faces if self.resolve(face) != face]
+
+    def pil_font(self, face: str, size_px: int) -> ImageFont.FreeTypeFont:
+        """Pillow font for a face at a pixel size, from the shared cache."""
+        path = self.path(face)
+        return _load_pil_font(str(path) if path else None, size_px)
+
+    def pdf_font(self, face: str) -> str:
+        """
+        Registers a face with ReportLab under its own name, using the fallback
+        file when it is missing, and returns that name.
+        """
+        with self._lock:
+            registered = self._pdf_fonts.get(face)
+        if registered is not None:
+            return registered
+
+        path = self.path(face)
+        try:
+            if path is not None:
+                pdfmetrics.registerFont(TTFont(face, str(path)))
+            else:
+                pdfmetrics.registerFont(
+                    pdfmetrics.Font(face, PDF_STANDARD_FONT, "WinAnsiEncoding")
+                )
+        except Exception as e:
+            logging.warning("Could not register font '%s' with ReportLab: %s", face, e)
+            pdfmetrics.registerFont(
+                pdfmetrics.Font(face, PDF_STANDARD_FONT, "WinAnsiEncoding")
+            )
+
+        with self._lock:
+            self._pdf_fonts[face] = face
+        return face
+
+    def register_pdf_fonts(self, faces: Iterable[str]) -> None:
+        for face in faces:
+            self.pdf_font(face)
+
+    def preload(
+        self, pil_fonts: Iterable[Tuple[str, int]], pdf_faces: Iterable[str] = ()
+    ) -> threading.Thread:
+        """Loads the given (face, pixel size) fonts and PDF faces in a background thread."""
+        pil_fonts, pdf_faces = list(pil_fonts), list(pdf_faces)
+
+        def load() -> None:
+            for face, size_px in pil_fonts:
+                self.pil_font(face, size_px)
+            self.register_pdf_fonts(pdf_faces)
+            logging.info("Preloaded %d label fonts.", len(pil_fonts) + len(pdf_faces))
+
+        thread = threading.Thread(target=load, name="font-preload", daemon=True)
+        thread.start()
+        return thread
+
+
+FONTS = FontRegistry()
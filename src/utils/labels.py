@@ -1,29 +1,44 @@
 """
 Module for generating shipping labels.
-Provides a cross-platform implementation: PDF for Windows and PNG for Linux.
+Provides a cross-platform implementation: PDF for Windows and PNG for Linux,
+plus ZPL II and 1-bit PNG for thermal printers. The labels are drawn from the
+declarative layouts of src/utils/layout_engine.py, compiled once per backend.
 """
 
+import io
 import os
 import platform
 import pathlib
 import logging
+import math
 from datetime import datetime as dt
-from typing import Tuple, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Tuple, List, NamedTuple, Optional, Sequence
 
-import qrcode
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 
 from reportlab.pdfgen.canvas import Canvas
-from reportlab.platypus import Paragraph
 from reportlab.graphics.barcode import code39
-from reportlab.graphics.barcode import qr
-from reportlab.graphics.shapes import Drawing
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import mm
 
 from src.models.schema import OrdemDeProducao
+from src.utils.barcodes import CODE39_RATIO, code39_value, paste_code39, paste_qr, qr_matrix, qr_runs
+from src.utils.fonts import FONTS
+from src.utils.layout_engine import (
+    Code39Op,
+    DrawOp,
+    LineOp,
+    QrOp,
+    RectOp,
+    TextBlockOp,
+    TextOp,
+    compile_layout,
+    get_layout,
+    layout_fonts,
+    load_layouts,
+    select_layout,
+    wrap_words,
+)
+from src.utils.zpl import FONT0_WIDTH_RATIO, ZplLabel, recall_format
 
 # --- Constants & Paths ---
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent.parent
@@ -31,470 +46,537 @@ TMP_FOLDER = BASE_DIR / "tmp"
 LABELS_FOLDER = TMP_FOLDER / "labels"
 LABELS_FOLDER.mkdir(exist_ok=True, parents=True)
 
-FONTS_PATH = BASE_DIR / "src" / "assets" / "fonts"
-
-# Standard Logistic Format (Approx 100mm x 150mm)
-LABEL_W_PT, LABEL_H_PT = 428, 283
-MWM_W_MM, MWM_H_MM = 105.0, 75.0
-
 DPI = 203
-MM_TO_PX = DPI / 25.4
 PT_TO_PX = DPI / 72.0
 
-# --- Font Registration ---
-try:
-    pdfmetrics.registerFont(TTFont("ConsolasRegular", FONTS_PATH / "Consolas-Regular.ttf"))
-    pdfmetrics.registerFont(TTFont("FiraCodeRegular", FONTS_PATH / "FiraCode-Regular.ttf"))
-    pdfmetrics.registerFont(TTFont("FiraCodeBold", FONTS_PATH / "FiraCode-Bold.ttf"))
-    pdfmetrics.registerFont(TTFont("YugoSemiBold", FONTS_PATH / "Yugo-SemiBold.ttc"))
-    pdfmetrics.registerFont(TTFont("YugoSemiLight", FONTS_PATH / "Yugo-SemiLight.ttc"))
-    pdfmetrics.registerFont(TTFont("LucidaConsoleRegular", FONTS_PATH / "LucidaConsole-Regular.ttf"))
-    pdfmetrics.registerFont(TTFont("DubaiBold", FONTS_PATH / "Dubai-Bold.ttf"))
-except Exception as e:
-    logging.warning("Could not load some ReportLab fonts: %s", e)
+# Name of the PDF form holding the part of a label shared by every box
+BASE_FORM = "label_base"
+
+# ZPL labels are printed upside down, like the rotated PNG labels
+ZPL_INVERTED = True
+# Layouts with per-box fields are stored in the printer's RAM under this
+# name; boxes recall them with their own field values
+ZPL_FORMAT_NAME = "R:{name}.ZPL"
+# Per-box operations ZPL can fill in through ^FN fields
+ZPL_FIELD_OPS = (TextOp, Code39Op)
+
+
+class LabelDocument(NamedTuple):
+    """A label file rendered in memory: its file name and encoded contents."""
+    name: str
+    data: bytes
 
 
 # --- Helper Functions ---
 
-def get_pil_font(font_name: str, size_pt: float) -> ImageFont.FreeTypeFont:
-    """Loads a TrueType font for Pillow (PNG) rendering."""
-    size_px = int(size_pt * PT_TO_PX)
-    mappings = {
-        "FiraCodeRegular": "FiraCode-Regular.ttf",
-        "FiraCodeBold": "FiraCode-Bold.ttf",
-        "ConsolasRegular": "Consolas-Regular.ttf",
-        "YugoSemiBold": "Yugo-SemiBold.ttc",
-        "YugoSemiLight": "Yugo-SemiLight.ttc",
-        "LucidaConsoleRegular": "LucidaConsole-Regular.ttf",
-        "DubaiBold": "Dubai-Bold.ttf"
-    }
-    try:
-        return ImageFont.truetype(str(FONTS_PATH / mappings.get(font_name, "Arial.ttf")), size_px)
-    except IOError:
-        return ImageFont.load_default()
+def layout_faces(layout_name: str) -> List[str]:
+    return list(dict.fromkeys(face for face, _ in layout_fonts(get_layout(layout_name))))
+
+
+def layout_pil_fonts() -> List[Tuple[str, int]]:
+    """(face, pixel size) of every Pillow font drawn by the layouts."""
+    return [
+        (face, int(size_pt * PT_TO_PX))
+        for layout in load_layouts().values()
+        for face, size_pt in layout_fonts(layout)
+    ]
+
+
+def is_png_format(output_format: str) -> bool:
+    """Whether `output_format` gives PNG labels on this platform, the only ones a LabelRenderPool draws."""
+    if output_format in ("zpl", "pdf"):
+        return False
+    return output_format == "mono" or platform.system().lower().startswith("linux")
+
+
+def preload_label_fonts() -> None:
+    """Reports missing font files and loads every layout's fonts in the background."""
+    FONTS.check()
+    pdf_faces = [face for name in load_layouts() for face in layout_faces(name)]
+    FONTS.preload(layout_pil_fonts(), pdf_faces)
+
 
 def _draw_pdf_qr(c: Canvas, qr_data: str, x: float, y: float, size: float) -> None:
-    """Renders a QR code onto a ReportLab Canvas."""
-    qr_code = qr.QrCodeWidget(qr_data)
-    bounds = qr_code.getBounds()
-    w, h = bounds[2] - bounds[0], bounds[3] - bounds[1]
-    scale = min(size / w, size / h)
-    drawing = Drawing(w * scale, h * scale, transform=[scale, 0, 0, scale, 0, 0])
-    drawing.add(qr_code)
-    drawing.drawOn(c, x, y)
+    """Renders a QR code, from the cached module matrix, with its bottom-left corner at (x, y)."""
+    module = size / len(qr_matrix(qr_data))
+    top = y + size
+    for row, column, length in qr_runs(qr_data):
+        c.rect(x + column * module, top - (row + 1) * module, length * module, module, stroke=0, fill=1)
+
+def _draw_pdf_code39(c: Canvas, value: str, x: float, y: float, module: float, height: float) -> None:
+    """Renders a Code39 barcode with its bottom-left corner at (x, y) onto a ReportLab Canvas."""
+    barcode = code39.Standard39(
+        value, barWidth=module, barHeight=height, ratio=CODE39_RATIO, checksum=False, quiet=0
+    )
+    barcode.drawOn(c, x, y)
+
+
+# --- Layout Backends ---
+# Replay the compiled draw operations of a layout; `values` fills their templates.
+
+def _draw_png_ops(img: Image, ops: Sequence[DrawOp], values: Dict, dy: int = 0) -> None:
+    """Draws onto `img`, shifted `dy` pixels vertically (for patches of a label)."""
+    draw = ImageDraw.Draw(img)
+    for op in ops:
+        if op.when and not values.get(op.when):
+            continue
+
+        if isinstance(op, TextOp):
+            text = op.text.format_map(values)
+            if not text:
+                continue
+            x = op.x
+            if op.after:
+                after_text, after_font, after_size = op.after
+                x += draw.textlength(after_text.format_map(values), font=FONTS.pil_font(after_font, after_size))
+            draw.text(
+                (x, op.y + dy),
+                text,
+                font=FONTS.pil_font(op.font, op.size),
+                fill="black",
+                anchor="ms" if op.centered else "ls",
+            )
+        elif isinstance(op, TextBlockOp):
+            font = FONTS.pil_font(op.font, op.size)
+            lines = wrap_words(
+                op.text.format_map(values), op.width, lambda line: draw.textlength(line, font=font)
+            )
+            for line, y in zip(lines, op.baselines):
+                draw.text((op.x, y + dy), line, font=font, fill="black", anchor="ls")
+        elif isinstance(op, RectOp):
+            draw.rectangle([op.x0, op.y0 + dy, op.x1, op.y1 + dy], outline="black", width=op.line_width)
+        elif isinstance(op, LineOp):
+            draw.line([op.x1, op.y1 + dy, op.x2, op.y2 + dy], fill="black", width=op.line_width)
+        elif isinstance(op, Code39Op):
+            paste_code39(img, op.value.format_map(values), op.x, op.y + dy, op.module, op.height)
+        elif isinstance(op, QrOp):
+            paste_qr(img, op.data.format_map(values), op.x, op.y + dy, op.size)
+
+
+def _draw_pdf_ops(pdf: Canvas, ops: Sequence[DrawOp], values: Dict) -> None:
+    for op in ops:
+        if op.when and not values.get(op.when):
+            continue
+
+        if isinstance(op, TextOp):
+            text = op.text.format_map(values)
+            if not text:
+                continue
+            x = op.x
+            if op.after:
+                after_text, after_font, after_size = op.after
+                x += pdf.stringWidth(after_text.format_map(values), after_font, after_size)
+            pdf.setFont(op.font, op.size)
+            if op.centered:
+                pdf.drawCentredString(x, op.y, text)
+            else:
+                pdf.drawString(x, op.y, text)
+        elif isinstance(op, TextBlockOp):
+            lines = wrap_words(
+                op.text.format_map(values), op.width, lambda line: pdf.stringWidth(line, op.font, op.size)
+            )
+            pdf.setFont(op.font, op.size)
+            for line, y in zip(lines, op.baselines):
+                pdf.drawString(op.x, y, line)
+        elif isinstance(op, RectOp):
+            pdf.setLineWidth(op.line_width)
+            pdf.rect(op.x0, op.y1, op.x1 - op.x0, op.y0 - op.y1, stroke=1, fill=0)
+        elif isinstance(op, LineOp):
+            pdf.setLineWidth(op.line_width)
+            pdf.line(op.x1, op.y1, op.x2, op.y2)
+        elif isinstance(op, Code39Op):
+            value = op.value.format_map(values)
+            if value:
+                _draw_pdf_code39(pdf, value, op.x, op.y - op.height, op.module, op.height)
+        elif isinstance(op, QrOp):
+            _draw_pdf_qr(pdf, op.data.format_map(values), op.x, op.y - op.size, op.size)
+
+
+def _zpl_field_template(op: DrawOp) -> Tuple[str, bool]:
+    """Template filling the op's ^FN field, and whether the field is Code39 data."""
+    return (op.text, False) if isinstance(op, TextOp) else (op.value, True)
+
+
+def _zpl_field_value(template: str, barcode: bool, values: Dict) -> str:
+    """Value of a ^FN field; Code39 data is normalized as `ZplLabel.code39` does."""
+    value = template.format_map(values)
+    return code39_value(value) if barcode else value
+
+
+def _add_zpl_ops(
+    label: ZplLabel, ops: Sequence[DrawOp], values: Dict, fields: Optional[Dict[Tuple[str, bool], int]] = None
+) -> None:
+    """
+    Adds the operations to a ZPL format. With `fields` (field template -> field
+    number), text and barcodes become ^FN fields, filled in when the format
+    is recalled.
+    """
+    for op in ops:
+        if op.when and not values.get(op.when):
+            continue
+        field = fields[_zpl_field_template(op)] if fields else 0
+
+        if isinstance(op, TextOp):
+            text = "" if field else op.text.format_map(values)
+            x = op.x
+            if op.after:
+                after_text, _, after_size = op.after
+                x += int(len(after_text.format_map(values)) * after_size * FONT0_WIDTH_RATIO)
+            if op.centered and not field:
+                label.centered_text(x, op.y, text, op.size)
+            else:
+                label.text(x, op.y, text, op.size, field=field)
+        elif isinstance(op, TextBlockOp):
+            spacing = op.baselines[1] - op.baselines[0] - op.size if len(op.baselines) > 1 else 0
+            label.text_block(
+                op.x,
+                op.baselines[0] - op.size,
+                op.width,
+                op.text.format_map(values),
+                op.size,
+                len(op.baselines),
+                spacing,
+            )
+        elif isinstance(op, RectOp):
+            label.box(op.x0, op.y0, op.x1 - op.x0, op.y1 - op.y0, op.line_width)
+        elif isinstance(op, LineOp):
+            label.line(op.x1, op.y1, op.x2, op.y2, op.line_width)
+        elif isinstance(op, Code39Op):
+            value = "" if field else op.value.format_map(values)
+            label.code39(
+                op.x, op.y, value, module=op.module, height=op.height, ratio=CODE39_RATIO, field=field
+            )
+        elif isinstance(op, QrOp):
+            label.qr(op.x, op.y, op.data.format_map(values), op.size)
 
 
 class ShippingLabelGenerator:
     """Handles the routing and generation of production shipping labels."""
 
-    def __init__(self, ordem: OrdemDeProducao):
+    def __init__(
+        self,
+        ordem: OrdemDeProducao,
+        output_format: str = "",
+        render_pool: Optional["LabelRenderPool"] = None,
+    ):
+        """
+        `output_format` "zpl" emits ZPL II, "mono" 1-bit PNGs for thermal
+        printers and "pdf" one multi-page PDF on any platform; otherwise PNG
+        on Linux and PDF on Windows. Per-box labels of large orders are
+        rendered on `render_pool` when given.
+        """
         self.ordem = ordem
+        self.layout = select_layout(ordem.material_code)
+        self.render_pool = render_pool
         self.today_date = dt.now()
         self.is_linux = platform.system().lower().startswith("linux")
-        self.file_extension = ".png" if self.is_linux else ".pdf"
+        self.output_format = output_format
+        self.monochrome = output_format == "mono"
+        if output_format == "zpl":
+            self.file_extension = ".zpl"
+        elif output_format == "pdf":
+            self.file_extension = ".pdf"
+        elif self.monochrome:
+            self.file_extension = ".png"
+        else:
+            self.file_extension = ".png" if self.is_linux else ".pdf"
 
     def generate(self) -> Tuple[bool, str, List[str]]:
         """Main entry point. Returns success status, error message, and generated paths."""
+        success, error, documents = self.render()
+        if not success:
+            return False, error, []
+
+        try:
+            return True, "", self.save(documents)
+        except OSError as e:
+            logging.exception("Failed to write shipping label.")
+            return False, str(e), []
+
+    def render(self) -> Tuple[bool, str, List[LabelDocument]]:
+        """
+        Renders the label documents in memory, without touching the disk.
+        Returns success status, error message, and the encoded documents.
+        """
         if self.ordem.box_count <= 0 or self.ordem.quantity % self.ordem.box_count != 0:
             return False, "Invalid quantity: not divisible by box count.", []
 
         try:
-            if self.is_linux:
-                return self._generate_png_files()
-            return self._generate_pdf_file()
+            if self.output_format == "zpl":
+                return True, "", self._render_zpl_document()
+            if self.output_format == "pdf":
+                return True, "", self._render_pdf_document()
+            if self.is_linux or self.monochrome:
+                return True, "", self._render_png_documents()
+            return True, "", self._render_pdf_document()
         except Exception as e:
             logging.exception("Failed to generate shipping label.")
             return False, str(e), []
 
+    @staticmethod
+    def save(documents: Sequence[LabelDocument], folder: Optional[pathlib.Path] = None) -> List[str]:
+        """Writes rendered documents to `folder` (the labels folder by default); returns their paths."""
+        folder = folder or LABELS_FOLDER
+        paths = []
+        for document in documents:
+            output_path = folder / document.name
+            output_path.write_bytes(document.data)
+            paths.append(str(output_path))
+        return paths
+
+    def _values(self) -> Dict:
+        """Values of the layout templates shared by every box."""
+        return {
+            "today": self.today_date,
+            "date": self.today_date.strftime("%d/%m/%Y"),
+            "code": self.ordem.code,
+            "material_code": self.ordem.material_code,
+            "client": self.ordem.client,
+            "client_code": self.ordem.client_code,
+            "description": self.ordem.description,
+            "barcode": self.ordem.barcode,
+            "quantity": self.ordem.quantity,
+            "box_count": self.ordem.box_count,
+            "qty": self.ordem.quantity // self.ordem.box_count,
+            "weight": self.ordem.weight,
+        }
+
+    def _box_values(self, values: Dict, index: int) -> Dict:
+        return {**values, "index": index, "box_id": self._box_id(index, values)}
+
+    def _box_id(self, index: int, values: Optional[Dict] = None) -> str:
+        """Identification of a box, from the layout's template (e.g. supplier, date and box number)."""
+        return self.layout.box_id.format_map({**(values or self._values()), "index": index})
+
     # -------------------------------------------------------------------------
-    # PDF GENERATION (WINDOWS)
+    # PDF GENERATION (WINDOWS, OR ANY PLATFORM WITH "pdf")
     # -------------------------------------------------------------------------
 
-    def _generate_pdf_file(self) -> Tuple[bool, str, List[str]]:
-        """Generates a multi-page PDF document."""
-        is_mwm = self.ordem.material_code.startswith("MWM")
-        size = (MWM_W_MM * mm, MWM_H_MM * mm) if is_mwm else (LABEL_W_PT, LABEL_H_PT)
-        
-        output_path = LABELS_FOLDER / f"shipping_{self.ordem.code}{self.file_extension}"
-        pdf = Canvas(str(output_path), pagesize=size)
+    def _render_pdf_document(self) -> List[LabelDocument]:
+        """Renders a multi-page PDF document, printed as a single job."""
+        compiled = compile_layout(self.layout.name, "pdf", DPI)
+        FONTS.register_pdf_fonts(layout_faces(self.layout.name))
+        values = self._values()
+
+        encoded = io.BytesIO()
+        pdf = Canvas(encoded, pagesize=(compiled.width, compiled.height))
+        if self.is_linux:
+            # Upside down like the PNG labels, for the Linux thermal setups
+            pdf.setPageRotation(180)
+
+        # The invariant part is drawn once into a form that every page reuses
+        pdf.beginForm(BASE_FORM)
+        _draw_pdf_ops(pdf, compiled.base_ops, values)
+        pdf.endForm()
 
         for index in range(1, self.ordem.box_count + 1):
-            if is_mwm:
-                self._draw_mwm_pdf(pdf, index)
-            else:
-                self._draw_normal_pdf(pdf)
+            pdf.doForm(BASE_FORM)
+            if compiled.box_ops:
+                _draw_pdf_ops(pdf, compiled.box_ops, self._box_values(values, index))
             pdf.showPage()
-            
+
         pdf.save()
-        return True, "", [str(output_path)]
+        return [LabelDocument(self._document_name(), encoded.getvalue())]
 
-    def _draw_normal_pdf(self, pdf: Canvas) -> None:
-        """
-        Renders the standard logistic grid layout for 150x100mm labels.
-        Optimized for thermal printing with left-aligned metrics and wrapped text.
-        """
-        qty_per_box = self.ordem.quantity / self.ordem.box_count
-        pdf.setLineWidth(2)
-        pdf.setFont("FiraCodeBold", 12)
-        pdf.drawString(10, 222, f"DATA: {self.today_date.strftime('%d/%m/%Y')}")
-        pdf.rect(6, 0, 418, 215, stroke=1, fill=0)
-
-        # Horizontal separators
-        pdf.line(6, 160, 424, 160) # Below recipient
-        pdf.line(6, 95, 424, 95)   # Above description/QR
-        
-        # Vertical separators
-        pdf.line(200, 160, 200, 0) # Middle divider
-        pdf.line(305, 160, 305, 0) # Right divider
-
-        # --- Recipient Block ---
-        pdf.setFont("FiraCodeRegular", 9)
-        pdf.drawString(10, 198, "DESTINATÁRIO:")
-        
-        c_style = getSampleStyleSheet()["Normal"].clone("Dest")
-        c_style.fontName = "FiraCodeBold"
-        c_style.fontSize = 12
-        c_style.leading = 14
-        
-        p_client = Paragraph(self.ordem.client, c_style)
-        w_c, h_c = p_client.wrapOn(pdf, 395, 30)
-        p_client.drawOn(pdf, 10, 196 - h_c)
-
-        # Material ID
-        pdf.setFont("FiraCodeRegular", 10)
-        pdf.drawString(10, 145, "CÓDIGO MATERIAL:")
-        pdf.setFont("FiraCodeBold", 16)
-        pdf.drawString(10, 127, self.ordem.material_code)
-
-        if self.ordem.client_code:
-            label_y = 110
-            pdf.setFont("FiraCodeRegular", 9)
-            pdf.drawString(10, label_y, "CÓD. CLIENTE:")
-
-            cc_style = getSampleStyleSheet()["Normal"].clone("ClientCode")
-            cc_style.fontName = "FiraCodeBold"
-            cc_style.fontSize = 11
-            cc_style.leading = 12
-
-            p_cc = Paragraph(self.ordem.client_code, cc_style)
-            w_cc, h_cc = p_cc.wrapOn(pdf, 110, 35)
-
-            p_cc.drawOn(pdf, 85, (label_y + 11) - h_cc)
-
-        # Quantity
-        pdf.setFont("FiraCodeRegular", 10)
-        pdf.drawString(205, 145, "QTD TOTAL:")
-        pdf.setFont("FiraCodeBold", 18)
-        pdf.drawString(205, 122, f"{qty_per_box:.0f} UN")
-
-        # Weight
-        pdf.setFont("FiraCodeRegular", 10)
-        pdf.drawString(312, 145, "PESO:")
-        pdf.setFont("FiraCodeBold", 18)
-        pdf.drawString(312, 122, f"{self.ordem.weight} KG")
-
-        # Description
-        pdf.setFont("FiraCodeRegular", 10)
-        pdf.drawString(10, 82, "DESCRIÇÃO:")
-        
-        d_style = getSampleStyleSheet()["Normal"].clone("Desc")
-        d_style.fontName = "FiraCodeRegular"
-        d_style.fontSize = 10
-        d_style.leading = 11
-        
-        p_desc = Paragraph(self.ordem.description, d_style)
-        w_d, h_d = p_desc.wrapOn(pdf, 185, 60)
-        p_desc.drawOn(pdf, 10, 78 - h_d)
-
-        # QR Code centered
-        qr_data = f"{self.ordem.code};{self.ordem.material_code};{int(qty_per_box)}"
-        qr_size = 100
-        _draw_pdf_qr(pdf, qr_data, 203, 2, qr_size)
-        
-        pdf.setFont("FiraCodeRegular", 6)
-        pdf.drawCentredString(252, 3, "VERIFICAR CONTEÚDO")
-
-        # Instructions / Logistic Icons
-        pdf.setFont("FiraCodeRegular", 8)
-        pdf.drawCentredString(365, 82, "INSTRUÇÕES:")
-        
-        self._draw_vector_fragile(pdf, 325, 38)
-        self._draw_vector_up(pdf, 375, 38)
-        
-        pdf.setFont("FiraCodeBold", 7)
-        pdf.drawCentredString(342, 28, "FRÁGIL")
-        pdf.drawCentredString(392, 28, "P/ CIMA")
-
-    def _draw_vector_fragile(self, pdf: Canvas, x: float, y: float) -> None:
-        """Renders the fragile (glass) icon natively in vectors."""
-        pdf.setLineWidth(1.5)
-        pdf.rect(x, y, 35, 35) 
-        pdf.line(x+8, y+28, x+27, y+28)
-        pdf.line(x+8, y+28, x+17.5, y+15)
-        pdf.line(x+27, y+28, x+17.5, y+15)
-        pdf.line(x+17.5, y+15, x+17.5, y+6)
-        pdf.line(x+11, y+6, x+24, y+6)
-
-    def _draw_vector_up(self, pdf: Canvas, x: float, y: float) -> None:
-        """Renders the this-side-up (arrows) icon natively in vectors."""
-        pdf.setLineWidth(1.5)
-        pdf.rect(x, y, 35, 35) 
-        pdf.line(x+6, y+6, x+29, y+6) 
-        pdf.line(x+13, y+6, x+13, y+26)
-        pdf.line(x+9, y+20, x+13, y+28)
-        pdf.line(x+17, y+20, x+13, y+28)
-        pdf.line(x+22, y+6, x+22, y+26)
-        pdf.line(x+18, y+20, x+22, y+28)
-        pdf.line(x+26, y+20, x+22, y+28)
-
-    def _draw_mwm_pdf(self, pdf: Canvas, index: int) -> None:
-        """Renders the specialized MWM label format."""
-        mwm_margin = 7.5 * mm
-        internal_margin = 21.5 * mm
-        qty_per_box = self.ordem.quantity / self.ordem.box_count
-
-        pdf.rect(mwm_margin, 5.5 * mm, 90 * mm, 64 * mm)
-        pdf.line(mwm_margin, 43.5 * mm, 105 * mm - mwm_margin, 43.5 * mm)
-        pdf.line(mwm_margin, 32.5 * mm, 105 * mm - mwm_margin, 32.5 * mm)
-        pdf.line(mwm_margin, 19.5 * mm, 105 * mm - mwm_margin, 19.5 * mm)
-
-        pdf.setFont("YugoSemiBold", 9)
-        pdf.drawString(mwm_margin, 69 * mm, "MWM MOTORES E GERADORES")
-        pdf.drawString(87 * mm, 69 * mm, "V.2.3.4")
-        
-        pdf.setFont("LucidaConsoleRegular", 10)
-        pdf.drawString(8 * mm, 66 * mm, "Part:")
-        pdf.drawString(8 * mm, 40 * mm, "Qty:")
-        pdf.drawString(8 * mm, 28.2 * mm, "Lot:")
-        pdf.drawString(8 * mm, 15.5 * mm, "ID:")
-        
-        pdf.setFont("LucidaConsoleRegular", 8)
-        pdf.drawString(8 * mm, 43 * mm, "Supplier:15175")
-        
-        pdf.setFont("YugoSemiBold", 10)
-        pdf.drawString(72 * mm, 43.5 * mm, "Date:")
-        pdf.setFont("YugoSemiBold", 6)
-        pdf.drawString(internal_margin, 54.9 * mm, "fornecedor/fabricante")
-
-        pdf.setFont("YugoSemiLight", 8)
-        pdf.drawString(81.2 * mm, 42.8 * mm, self.today_date.strftime("%d/%m/%Y"))
-        
-        pdf.setFont("ConsolasRegular", 27)
-        pdf.drawString(internal_margin, 65 * mm, self.ordem.client_code)
-        
-        qty_str = f"{qty_per_box:.0f}"
-        pdf.setFont("ConsolasRegular", 22.9)
-        pdf.drawString(75 * mm, 39 * mm, qty_str)
-        
-        qty_width = pdf.stringWidth(qty_str, "ConsolasRegular", 22.9)
-        pdf.setFont("DubaiBold", 12.5)
-        pdf.drawString(75 * mm + qty_width + 2 * mm, 35.2 * mm, "PCs")
-
-        pdf.setFont("YugoSemiBold", 8.2)
-        pdf.drawString(internal_margin, 27.8 * mm, str(self.ordem.code))
-        id_str = f"15175{self.today_date.strftime('%Y%m%d')}{index:06d}"
-        pdf.drawString(internal_margin, 14.8 * mm, id_str)
-
-        barcodes = [
-            {"val": self.ordem.client_code, "y": 48 * mm},
-            {"val": qty_str, "y": 34 * mm},
-            {"val": str(self.ordem.code), "y": 20.3 * mm},
-            {"val": id_str, "y": 7 * mm}
-        ]
-        
-        for bc in barcodes:
-            if bc["val"]:
-                barcode = code39.Standard39(
-                    bc["val"], barWidth=0.25 * mm, barHeight=8 * mm, ratio=2.0, checksum=False
-                )
-                barcode.drawOn(pdf, 15 * mm, bc["y"])
+    def _document_name(self) -> str:
+        return f"shipping_{self.ordem.code}{self.file_extension}"
 
     # -------------------------------------------------------------------------
     # PNG GENERATION (LINUX)
     # -------------------------------------------------------------------------
 
-    def _generate_png_files(self) -> Tuple[bool, str, List[str]]:
-        """Generates multiple single-page PNG files for thermal printers."""
-        is_mwm = self.ordem.material_code.startswith("MWM")
-        w_px = int(MWM_W_MM * MM_TO_PX) if is_mwm else int(LABEL_W_PT * PT_TO_PX)
-        h_px = int(MWM_H_MM * MM_TO_PX) if is_mwm else int(LABEL_H_PT * PT_TO_PX)
-        
-        paths = []
-        for index in range(1, self.ordem.box_count + 1):
-            img = Image.new("RGB", (w_px, h_px), "white")
-            draw = ImageDraw.Draw(img)
+    def _render_png_documents(self) -> List[LabelDocument]:
+        """
+        Renders one single-page PNG per box for thermal printers.
+        The label is rendered once per OP; boxes only differ in the per-box
+        fields (e.g. the MWM ID row), which are redrawn on a copy of their
+        region for each box (on the render pool's processes for large orders).
+        """
+        compiled = compile_layout(self.layout.name, "png", DPI)
 
-            if is_mwm:
-                self._draw_mwm_png(draw, img, index)
+        # Thermal heads only print black or white: monochrome labels are drawn
+        # in 1-bit mode, without anti-aliasing, and saved as 1-bit PNGs
+        base = Image.new("1" if self.monochrome else "RGB", (compiled.width, compiled.height), "white")
+        _draw_png_ops(base, compiled.base_ops, self._values())
+
+        indexes = list(range(1, self.ordem.box_count + 1))
+        if compiled.box_ops:
+            if self.render_pool is not None and self.render_pool.accepts(len(indexes)):
+                labels = self.render_pool.render_boxes(self, base, indexes)
             else:
-                self._draw_normal_png(draw, img)
-            
+                labels = self._encode_png_boxes(base, indexes)
+        else:
             # Rotates 180 deg to feed correctly into standard Linux thermal setups
-            img = img.transpose(Image.Transpose.ROTATE_180)
-            
-            output_path = LABELS_FOLDER / f"shipping_{self.ordem.code}_{index:03d}.png"
-            img.save(output_path)
-            paths.append(str(output_path))
-            
-        return True, "", paths
-
-    def _draw_normal_png(self, draw: ImageDraw.Draw, img: Image) -> None:
-        """Renders the standard logistic grid layout via Pillow."""
-        qty_per_box = self.ordem.quantity / self.ordem.box_count
-
-        def pt(val): return int(val * PT_TO_PX)
-        def y_inv(y_val): return int((LABEL_H_PT - y_val) * PT_TO_PX)
-        
-        def draw_txt(x_pt, y_pt, text, font_name, size, anchor="ls"):
-            font = get_pil_font(font_name, size)
-            draw.text((pt(x_pt), y_inv(y_pt)), text, font=font, fill="black", anchor=anchor)
-
-        def wrap_text(text, max_w_pt, font_name, size_pt):
-            font = get_pil_font(font_name, size_pt)
-            words = text.split()
-            lines, current_line = [], ""
-            max_w_px = pt(max_w_pt)
-            for word in words:
-                if draw.textlength(current_line + " " + word, font=font) < max_w_px:
-                    current_line += " " + word
-                else:
-                    lines.append(current_line.strip())
-                    current_line = word
-            lines.append(current_line.strip())
-            return lines
-
-        # Header Date
-        draw_txt(10, 222, f"DATA: {self.today_date.strftime('%d/%m/%Y')}", "FiraCodeBold", 12)
-
-        # Border
-        draw.rectangle([pt(5), y_inv(215), pt(415), y_inv(5)], outline="black", width=pt(2))
-
-        # Grid Lines (Aligned perfectly)
-        draw.line([pt(5), y_inv(175), pt(415), y_inv(175)], fill="black", width=pt(2))
-        draw.line([pt(5), y_inv(100), pt(415), y_inv(100)], fill="black", width=pt(2))
-        
-        draw.line([pt(200), y_inv(175), pt(200), y_inv(5)], fill="black", width=pt(2))
-        draw.line([pt(305), y_inv(175), pt(305), y_inv(5)], fill="black", width=pt(2))
-
-        # Destinatário
-        draw_txt(10, 203, "DESTINATÁRIO:", "FiraCodeRegular", 9)
-        client_lines = wrap_text(self.ordem.client, 400, "FiraCodeBold", 12)
-        y_client = 190
-        for line in client_lines[:2]:
-            draw_txt(10, y_client, line, "FiraCodeBold", 12)
-            y_client -= 14
-
-        # Material Details
-        draw_txt(10, 158, "CÓDIGO MATERIAL:", "FiraCodeRegular", 10)
-        draw_txt(10, 140, self.ordem.material_code, "FiraCodeBold", 16)
-        
-        if self.ordem.client_code:
-            draw_txt(10, 115, "CÓD. CLIENTE: ", "FiraCodeRegular", 9)
-            draw_txt(85, 115, self.ordem.client_code, "FiraCodeBold", 11)
-        
-        # Description
-        draw_txt(10, 85, "DESCRIÇÃO:", "FiraCodeRegular", 10)
-        desc_lines = wrap_text(self.ordem.description, 185, "FiraCodeRegular", 10)
-        y_desc = 70
-        for line in desc_lines[:5]:
-            draw_txt(10, y_desc, line, "FiraCodeRegular", 10)
-            y_desc -= 12
-
-        # Quantity
-        draw_txt(205, 158, "QTD TOTAL:", "FiraCodeRegular", 10)
-        draw_txt(205, 125, f"{qty_per_box:.0f} UN", "FiraCodeBold", 18)
-
-        # Weight
-        draw_txt(312, 158, "PESO:", "FiraCodeRegular", 10)
-        draw_txt(312, 125, f"{self.ordem.weight} KG", "FiraCodeBold", 18)
-
-        # QR Code
-        qr_data = f"{self.ordem.code};{self.ordem.material_code};{int(qty_per_box)}"
-        qr_size_pt = 75
-        qr_x_pt = 215
-        
-        qr_obj = qrcode.QRCode(version=1, box_size=10, border=0)
-        qr_obj.add_data(qr_data)
-        qr_obj.make(fit=True)
-        q_img = qr_obj.make_image(fill_color="black", back_color="white")
-        q_img = q_img.resize((pt(qr_size_pt), pt(qr_size_pt)), Image.NEAREST)
-        
-        img.paste(q_img, (pt(qr_x_pt), y_inv(15 + qr_size_pt)))
-        draw_txt(252, 8, "VERIFICAR CONTEÚDO", "FiraCodeRegular", 6, anchor="ms")
-
-        # Logistic Icons
-        draw_txt(360, 85, "INSTRUÇÕES:", "FiraCodeRegular", 8, anchor="ms")
-        self._draw_vector_fragile_pil(draw, 315, 45)
-        self._draw_vector_up_pil(draw, 365, 45)
-        
-        draw_txt(332, 35, "FRÁGIL", "FiraCodeBold", 7, anchor="ms")
-        draw_txt(382, 35, "P/ CIMA", "FiraCodeBold", 7, anchor="ms")
-
-
-    def _draw_vector_fragile_pil(self, draw: ImageDraw.Draw, x: float, y: float) -> None:
-        """Renders the fragile (glass) icon natively in vectors for PIL."""
-        def pt(val): return int(val * PT_TO_PX)
-        def y_inv(y_val): return int((LABEL_H_PT - y_val) * PT_TO_PX)
-        lw = pt(1.5)
-        draw.rectangle([pt(x), y_inv(y+35), pt(x+35), y_inv(y)], outline="black", width=lw)
-        draw.line([pt(x+8), y_inv(y+28), pt(x+27), y_inv(y+28)], fill="black", width=lw)
-        draw.line([pt(x+8), y_inv(y+28), pt(x+17.5), y_inv(y+15)], fill="black", width=lw)
-        draw.line([pt(x+27), y_inv(y+28), pt(x+17.5), y_inv(y+15)], fill="black", width=lw)
-        draw.line([pt(x+17.5), y_inv(y+15), pt(x+17.5), y_inv(y+6)], fill="black", width=lw)
-        draw.line([pt(x+11), y_inv(y+6), pt(x+24), y_inv(y+6)], fill="black", width=lw)
-
-    def _draw_vector_up_pil(self, draw: ImageDraw.Draw, x: float, y: float) -> None:
-        """Renders the this-side-up (arrows) icon natively in vectors for PIL."""
-        def pt(val): return int(val * PT_TO_PX)
-        def y_inv(y_val): return int((LABEL_H_PT - y_val) * PT_TO_PX)
-        lw = pt(1.5)
-        draw.rectangle([pt(x), y_inv(y+35), pt(x+35), y_inv(y)], outline="black", width=lw)
-        draw.line([pt(x+6), y_inv(y+6), pt(x+29), y_inv(y+6)], fill="black", width=lw)
-        
-        draw.line([pt(x+13), y_inv(y+6), pt(x+13), y_inv(y+26)], fill="black", width=lw)
-        draw.line([pt(x+9), y_inv(y+20), pt(x+13), y_inv(y+28)], fill="black", width=lw)
-        draw.line([pt(x+17), y_inv(y+20), pt(x+13), y_inv(y+28)], fill="black", width=lw)
-        
-        draw.line([pt(x+22), y_inv(y+6), pt(x+22), y_inv(y+26)], fill="black", width=lw)
-        draw.line([pt(x+18), y_inv(y+20), pt(x+22), y_inv(y+28)], fill="black", width=lw)
-        draw.line([pt(x+26), y_inv(y+20), pt(x+22), y_inv(y+28)], fill="black", width=lw)
-
-    def _draw_mwm_png(self, draw: ImageDraw.Draw, img: Image, index: int) -> None:
-        """Renders the specialized MWM label format for PIL."""
-        try:
-            from barcode import Code39
-            from barcode.writer import ImageWriter
-        except ImportError:
-            logging.error("python-barcode is required to generate MWM PNG labels.")
-            return
-
-        def mm2px(mm_val): return int(mm_val * MM_TO_PX)
-        
-        mwm_margin = mm2px(7.5)
-        internal_margin = mm2px(21.5)
-
-        draw.rectangle([mwm_margin, mm2px(MWM_H_MM - 69.5), mm2px(97.5), mm2px(MWM_H_MM - 5.5)], outline="black", width=2)
-        
-        for y_mm in [43.5, 32.5, 19.5]:
-            y_px = mm2px(MWM_H_MM - y_mm)
-            draw.line([mwm_margin, y_px, mm2px(105 - 7.5), y_px], fill="black", width=2)
-
-        def draw_txt(x_mm, y_mm, text, font_name="FiraCodeRegular", size_pt=10):
-            font = get_pil_font(font_name, size_pt)
-            draw.text((mm2px(x_mm), mm2px(MWM_H_MM - y_mm) - size_pt), text, font=font, fill="black")
-
-        draw_txt(7.5, 69, "MWM MOTORES E GERADORES", "YugoSemiBold", 9)
-        draw_txt(8, 66, "Part:", "LucidaConsoleRegular", 10)
-        draw_txt(21.5, 65, self.ordem.client_code, "ConsolasRegular", 27)
-
-        def draw_code39(val, x_mm, y_mm):
-            if not val: return
-            options = {'module_width': 0.15, 'module_height': 8.0, 'quiet_zone': 1.0, 'font_size': 0, 'write_text': False}
-            try:
-                code_img = Code39(str(val), writer=ImageWriter(), add_checksum=False).render(options)
-                code_img = code_img.resize((int(code_img.width * 0.8), mm2px(8)))
-                img.paste(code_img, (mm2px(x_mm), mm2px(MWM_H_MM - y_mm - 8)))
-            except Exception:
-                pass
-
-        draw_code39(self.ordem.client_code, 15, 48)
\ No newline at end of file
+            encoded = io.BytesIO()
+            base.transpose(Image.Transpose.ROTATE_180).save(encoded, format="PNG")
+            labels = [encoded.getvalue()] * len(indexes)
+
+        return [LabelDocument(self._png_name(index), data) for index, data in zip(indexes, labels)]
+
+    def _png_name(self, index: int) -> str:
+        return f"shipping_{self.ordem.code}_{index:03d}.png"
+
+    def _encode_png_boxes(self, base: Image, indexes: List[int]) -> List[bytes]:
+        """Encodes the labels of the given boxes, patching the per-box region of the base."""
+        compiled = compile_layout(self.layout.name, "png", DPI)
+        values = self._values()
+        w_px, h_px = base.size
+        top_px = compiled.box_top
+        # Rotates 180 deg to feed correctly into standard Linux thermal setups;
+        # the per-box region then sits at the top of the image
+        rotated = base.transpose(Image.Transpose.ROTATE_180)
+
+        labels = []
+        for index in indexes:
+            patch = base.crop((0, top_px, w_px, h_px))
+            _draw_png_ops(patch, compiled.box_ops, self._box_values(values, index), dy=-top_px)
+            img = rotated.copy()
+            img.paste(patch.transpose(Image.Transpose.ROTATE_180), (0, 0))
+
+            encoded = io.BytesIO()
+            img.save(encoded, format="PNG")
+            labels.append(encoded.getvalue())
+        return labels
+
+    # -------------------------------------------------------------------------
+    # PREVIEW
+    # -------------------------------------------------------------------------
+
+    def render_preview(self, index: int = 1) -> Image:
+        """
+        Renders the label of box `index` in memory, upright, as the PNG
+        backend draws it (1-bit for "mono"). Nothing is written to disk.
+        """
+        compiled = compile_layout(self.layout.name, "png", DPI)
+        values = self._values()
+        img = Image.new("1" if self.monochrome else "RGB", (compiled.width, compiled.height), "white")
+        _draw_png_ops(img, compiled.base_ops, values)
+        _draw_png_ops(img, compiled.box_ops, self._box_values(values, index))
+        return img
+
+    # -------------------------------------------------------------------------
+    # ZPL GENERATION (ZEBRA PRINTERS)
+    # -------------------------------------------------------------------------
+
+    def _render_zpl_document(self) -> List[LabelDocument]:
+        """
+        Renders a single ZPL II document for all boxes. A layout without
+        per-box fields is one format printed box_count times; otherwise the
+        format is stored on the printer once and recalled for each box with
+        its field values.
+        """
+        compiled = compile_layout(self.layout.name, "zpl", DPI)
+        values = self._values()
+        indexes = range(1, self.ordem.box_count + 1)
+
+        def new_label() -> ZplLabel:
+            label = ZplLabel(compiled.width, compiled.height, inverted=ZPL_INVERTED)
+            _add_zpl_ops(label, compiled.base_ops, values)
+            return label
+
+        if not compiled.box_ops:
+            formats = [new_label().render(copies=self.ordem.box_count)]
+        elif all(isinstance(op, ZPL_FIELD_OPS) for op in compiled.box_ops):
+            name = ZPL_FORMAT_NAME.format(name=self.layout.name.upper()[:8])
+            templates = dict.fromkeys(_zpl_field_template(op) for op in compiled.box_ops)
+            fields = {template: number for number, template in enumerate(templates, 1)}
+            label = new_label()
+            _add_zpl_ops(label, compiled.box_ops, values, fields)
+            formats = [label.store(name)]
+            for index in indexes:
+                box_values = self._box_values(values, index)
+                formats.append(
+                    recall_format(
+                        name,
+                        {
+                            number: _zpl_field_value(template, barcode, box_values)
+                            for (template, barcode), number in fields.items()
+                        },
+                    )
+                )
+        else:
+            formats = []
+            for index in indexes:
+                label = new_label()
+                _add_zpl_ops(label, compiled.box_ops, self._box_values(values, index))
+                formats.append(label.render())
+
+        return [LabelDocument(self._document_name(), "".join(formats).encode("utf-8"))]
+
+
+def _init_render_worker() -> None:
+    """Loads the label fonts once in each render process."""
+    for face, size_px in layout_pil_fonts():
+        FONTS.pil_font(face, size_px)
+
+
+def _render_box_chunk(
+    ordem: OrdemDeProducao,
+    today_date: dt,
+    output_format: str,
+    base: Image,
+    indexes: List[int],
+) -> List[bytes]:
+    """Render process entry point: encodes the labels of a chunk of boxes."""
+    generator = ShippingLabelGenerator(ordem, output_format)
+    generator.today_date = today_date
+    return generator._encode_png_boxes(base, indexes)
+
+
+class LabelRenderPool:
+    """
+    Renders the per-box PNG labels of large orders on a ProcessPoolExecutor.
+
+    Boxes are split into one contiguous chunk per worker. Each worker gets the
+    rendered base label and the generator's date, and sends back the encoded
+    PNGs, so the labels and box IDs are the same as in a sequential render. Orders under
+    `min_boxes` are rendered in-process, where the pool would cost more.
+    """
+
+    def __init__(self, workers: int = 0, min_boxes: int = 16) -> None:
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.min_boxes = min_boxes
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_render_worker
+            )
+        return self._executor
+
+    def accepts(self, boxes: int) -> bool:
+        return self.workers > 1 and boxes >= self.min_boxes
+
+    def warm_up(self) -> None:
+        """Starts the worker processes (loading their fonts) ahead of the first order."""
+        if self.workers > 1:
+            executor = self._get_executor()
+            for _ in range(self.workers):
+                executor.submit(os.getpid)
+
+    def render_boxes(
+        self, generator: ShippingLabelGenerator, base: Image, indexes: List[int]
+    ) -> List[bytes]:
+        """Encodes the labels of `indexes` in parallel; they are returned in box order."""
+        chunk_size = math.ceil(len(indexes) / self.workers)
+        chunks = [indexes[i : i + chunk_size] for i in range(0, len(indexes), chunk_size)]
+        executor = self._get_executor()
+        futures = [
+            executor.submit(
+                _render_box_chunk,
+                generator.ordem,
+                generator.today_date,
+                generator.output_format,
+                base,
+                chunk,
+            )
+            for chunk in chunks
+        ]
+        return [label for future in futures for label in future.result()]
+
+    def shutdown(self) -> None:
+        """Stops the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
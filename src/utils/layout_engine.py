@@ -0,0 +1,308 @@
+"""
+Label layout engine.
+
+Layouts are JSON files in src/assets/layouts (see src/models/layout.py), so a
+new customer format is added by dropping a file there. Each layout is
+compiled once per (layout, backend, DPI) into flat lists of draw operations
+whose coordinates are already converted to the backend's space: points with
+the origin at the bottom-left for "pdf", dots with the origin at the top-left
+for "png" and "zpl". The backends in labels.py only replay those lists.
+
+Operations whose templates use a per-box value (`index`, `box_id`) are kept
+apart from the ones shared by every box of an order.
+"""
+
+import logging
+import pathlib
+from functools import lru_cache
+from string import Formatter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from src.models.layout import (
+    Code39Element,
+    IconElement,
+    LabelLayout,
+    LineElement,
+    QrElement,
+    RectElement,
+    TextBlockElement,
+    TextElement,
+)
+
+LAYOUTS_PATH = pathlib.Path(__file__).resolve().parent.parent / "assets" / "layouts"
+
+# Layout used when no layout claims the material code
+DEFAULT_LAYOUT = "normal"
+
+BACKENDS = ("pdf", "png", "zpl")
+
+# Template values that change from box to box
+BOX_FIELDS = frozenset({"index", "box_id"})
+
+# Size of one layout unit: (points, units per inch)
+UNITS = {"pt": (1.0, 72.0), "mm": (72.0 / 25.4, 25.4)}
+
+
+class TextOp(NamedTuple):
+    x: float
+    y: float  # baseline
+    text: str
+    font: str
+    size: float
+    centered: bool
+    when: str
+    # (text, font, size) whose width is added to x
+    after: Optional[Tuple[str, str, float]]
+
+
+class TextBlockOp(NamedTuple):
+    x: float
+    baselines: Tuple[float, ...]  # one per line, at most max_lines
+    width: float
+    text: str
+    font: str
+    size: float
+    when: str
+
+
+class RectOp(NamedTuple):
+    # Top-left and bottom-right corners
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    line_width: float
+    when: str
+
+
+class LineOp(NamedTuple):
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+    line_width: float
+    when: str
+
+
+class Code39Op(NamedTuple):
+    x: float
+    y: float  # top edge
+    value: str
+    height: float
+    module: float
+    when: str
+
+
+class QrOp(NamedTuple):
+    x: float
+    y: float  # top edge
+    data: str
+    size: float
+    when: str
+
+
+DrawOp = Union[TextOp, TextBlockOp, RectOp, LineOp, Code39Op, QrOp]
+
+
+class CompiledLayout(NamedTuple):
+    name: str
+    width: float
+    height: float
+    base_ops: Tuple[DrawOp, ...]
+    box_ops: Tuple[DrawOp, ...]
+    # Raster backends: first row touched by the per-box operations
+    box_top: int
+
+
+@lru_cache(maxsize=None)
+def load_layouts(folder: pathlib.Path = LAYOUTS_PATH) -> Dict[str, LabelLayout]:
+    """Reads every layout file of `folder`; invalid files are reported and skipped."""
+    layouts = {}
+    for path in sorted(folder.glob("*.json")):
+        try:
+            layout = LabelLayout.model_validate_json(path.read_text(encoding="utf-8"))
+        except (OSError, ValidationError) as e:
+            logging.error("Invalid label layout %s: %s", path.name, e)
+            continue
+        layouts[layout.name] = layout
+    return layouts
+
+
+def get_layout(name: str) -> LabelLayout:
+    layouts = load_layouts()
+    if name not in layouts:
+        raise KeyError(f"Label layout '{name}' not found in {LAYOUTS_PATH}")
+    return layouts[name]
+
+
+def select_layout(material_code: str) -> LabelLayout:
+    """Layout with the longest material prefix matching `material_code`, or the default one."""
+    matches = [
+        (len(prefix), layout.name)
+        for layout in load_layouts().values()
+        for prefix in layout.material_prefixes
+        if material_code.startswith(prefix)
+    ]
+    return get_layout(max(matches)[1] if matches else DEFAULT_LAYOUT)
+
+
+def template_fields(template: str) -> List[str]:
+    """Names of the values used by a format template."""
+    return [field.split(".")[0].split("[")[0] for _, field, _, _ in Formatter().parse(template) if field]
+
+
+def layout_fonts(layout: LabelLayout) -> List[Tuple[str, float]]:
+    """(face, point size) of every font drawn by a layout."""
+    fonts = []
+    for element in layout.elements:
+        if isinstance(element, (TextElement, TextBlockElement)):
+            fonts.append((element.font, element.size))
+        if isinstance(element, TextElement) and element.after is not None:
+            fonts.append((element.after.font, element.after.size))
+    return list(dict.fromkeys(fonts))
+
+
+def wrap_words(text: str, max_width: float, measure: Callable[[str], float]) -> List[str]:
+    """Greedy word wrap of `text` into lines narrower than `max_width`."""
+    lines, current_line = [], ""
+    for word in text.split():
+        if measure(current_line + " " + word) < max_width:
+            current_line += " " + word
+        else:
+            lines.append(current_line.strip())
+            current_line = word
+    lines.append(current_line.strip())
+    return lines
+
+
+class _Transform:
+    """Converts layout coordinates to the coordinates of a backend."""
+
+    def __init__(self, layout: LabelLayout, backend: str, dpi: int) -> None:
+        unit_pt, per_inch = UNITS[layout.unit]
+        self.unit_pt = unit_pt
+        self.raster = backend != "pdf"
+        self.height = layout.height
+        # Layout units to backend units, and points to backend units
+        self.scale = dpi / per_inch if self.raster else unit_pt
+        self.pt_scale = dpi / 72.0 if self.raster else 1.0
+
+    def length(self, value: float) -> float:
+        return int(value * self.scale) if self.raster else value * self.scale
+
+    def point(self, x: float, y: float) -> Tuple[float, float]:
+        if self.raster:
+            return int(x * self.scale), int((self.height - y) * self.scale)
+        return x * self.scale, y * self.scale
+
+    def size(self, size_pt: float) -> float:
+        """Font size in the backend: pixels for Pillow and ZPL, points for PDF."""
+        return int(size_pt * self.pt_scale) if self.raster else size_pt
+
+    def line_width(self, value: float) -> float:
+        return max(1, self.length(value)) if self.raster else value * self.scale
+
+
+def _compile_element(element, t: _Transform) -> List[DrawOp]:
+    when = element.when
+    if isinstance(element, TextElement):
+        after = None
+        if element.after is not None:
+            after = (element.after.text, element.after.font, t.size(element.after.size))
+        x, y = t.point(element.x, element.y)
+        return [TextOp(x, y, element.text, element.font, t.size(element.size), element.centered, when, after)]
+
+    if isinstance(element, TextBlockElement):
+        leading = element.leading / t.unit_pt
+        baselines = tuple(
+            t.point(element.x, element.y - line * leading)[1] for line in range(element.max_lines)
+        )
+        x = t.point(element.x, element.y)[0]
+        return [
+            TextBlockOp(
+                x, baselines, t.length(element.width), element.text, element.font, t.size(element.size), when
+            )
+        ]
+
+    if isinstance(element, RectElement):
+        x0, y0 = t.point(element.x, element.y + element.height)
+        x1, y1 = t.point(element.x + element.width, element.y)
+        return [RectOp(x0, y0, x1, y1, t.line_width(element.line_width), when)]
+
+    if isinstance(element, LineElement):
+        x1, y1 = t.point(element.x1, element.y1)
+        x2, y2 = t.point(element.x2, element.y2)
+        return [LineOp(x1, y1, x2, y2, t.line_width(element.line_width), when)]
+
+    if isinstance(element, IconElement):
+        line_width = t.line_width(element.line_width)
+        x0, y0 = t.point(element.x, element.y + element.size)
+        x1, y1 = t.point(element.x + element.size, element.y)
+        ops: List[DrawOp] = [RectOp(x0, y0, x1, y1, line_width, when)]
+        for ax, ay, bx, by in element.lines:
+            start = t.point(element.x + ax, element.y + ay)
+            end = t.point(element.x + bx, element.y + by)
+            ops.append(LineOp(*start, *end, line_width, when))
+        return ops
+
+    if isinstance(element, Code39Element):
+        x, y = t.point(element.x, element.y + element.height)
+        module = element.module * t.scale
+        if t.raster:
+            # Printers and bitmaps need a whole number of dots per bar
+            module = max(1, round(module))
+        return [Code39Op(x, y, element.value, t.length(element.height), module, when)]
+
+    if isinstance(element, QrElement):
+        x, y = t.point(element.x, element.y + element.size)
+        return [QrOp(x, y, element.data, t.length(element.size), when)]
+
+    raise TypeError(f"Unknown layout element: {element!r}")
+
+
+def _templates(op: DrawOp) -> List[str]:
+    if isinstance(op, TextOp):
+        return [op.text] + ([op.after[0]] if op.after else [])
+    if isinstance(op, TextBlockOp):
+        return [op.text]
+    if isinstance(op, Code39Op):
+        return [op.value]
+    if isinstance(op, QrOp):
+        return [op.data]
+    return []
+
+
+def is_box_op(op: DrawOp) -> bool:
+    return any(BOX_FIELDS.intersection(template_fields(t)) for t in _templates(op))
+
+
+def _op_top(op: DrawOp) -> float:
+    """Topmost raster row an operation can touch."""
+    if isinstance(op, TextOp):
+        return op.y - op.size
+    if isinstance(op, TextBlockOp):
+        return op.baselines[0] - op.size
+    if isinstance(op, RectOp):
+        return min(op.y0, op.y1) - op.line_width
+    if isinstance(op, LineOp):
+        return min(op.y1, op.y2) - op.line_width
+    return op.y
+
+
+@lru_cache(maxsize=None)
+def compile_layout(name: str, backend: str, dpi: int) -> CompiledLayout:
+    """Draw operations of a layout for a backend ("pdf", "png" or "zpl") at `dpi`."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown label backend: {backend}")
+    layout = get_layout(name)
+    t = _Transform(layout, backend, dpi)
+
+    ops = [op for element in layout.elements for op in _compile_element(element, t)]
+    base_ops = tuple(op for op in ops if not is_box_op(op))
+    box_ops = tuple(op for op in ops if is_box_op(op))
+
+    width, height = t.length(layout.width), t.length(layout.height)
+    box_top = max(0, int(min((_op_top(op) for op in box_ops), default=height))) if t.raster else 0
+    return CompiledLayout(name, width, height, base_ops, box_ops, box_top)
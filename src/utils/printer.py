@@ -1,13 +1,16 @@
 """
 Module to handle cross-platform document printing.
 Supports Windows via pywin32 (ShellExecute) and Linux via CUPS (lp/lpstat).
+Documents can be printed from files or straight from memory.
 """
 
 import os
 import platform
 import subprocess
+import tempfile
 import time
 import logging
+from typing import List, Sequence, Tuple, Union
 
 # Configure basic logging
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -27,6 +30,12 @@ class PrinterManager:
     # Time to wait (in seconds) on Windows to allow the external PDF viewer to spool the file
     WINDOWS_PRINT_DELAY = 3
 
+    # Extensions of files written in the printer's own language
+    RAW_EXTENSIONS = (".zpl",)
+
+    # Memory-backed folder for the documents of multi-document jobs on Linux
+    SHM_FOLDER = "/dev/shm"
+
     @staticmethod
     def is_windows() -> bool:
         """Check if the current operating system is Windows."""
@@ -116,14 +125,111 @@ class PrinterManager:
 
         logging.info("Sending '%s' to printer '%s'...", abs_path, target_printer)
 
+        # Printer-native files (ZPL) bypass the driver and go to the printer as is
+        is_raw = abs_path.lower().endswith(self.RAW_EXTENSIONS)
+
         if self.is_windows():
+            if is_raw:
+                return self._print_windows_raw(abs_path, target_printer)
             return self._print_windows(abs_path, target_printer)
         if self.is_linux():
-            return self._print_linux(abs_path, target_printer)
+            return self._print_linux(abs_path, target_printer, raw=is_raw)
 
         logging.error("Current operating system is not supported for printing.")
         return False
 
+    def print_documents(self, file_paths: List[str], printer_name: str = None) -> bool:
+        """
+        Print several documents (e.g. one label per box) as a single job where
+        the platform allows it: on Linux all files go to one 'lp' call, which
+        CUPS queues as one job. Elsewhere each file is printed in turn.
+
+        Returns:
+            bool: True if every document was dispatched successfully.
+        """
+        if not file_paths:
+            return False
+        if len(file_paths) == 1 or not self.is_linux():
+            results = [self.print_document(path, printer_name) for path in file_paths]
+            return all(results)
+
+        abs_paths = [os.path.abspath(path) for path in file_paths]
+        missing = [path for path in abs_paths if not os.path.exists(path)]
+        if missing:
+            logging.error("Files not found -> %s", ", ".join(missing))
+            return False
+
+        target_printer = printer_name or self.get_default_printer()
+        if not target_printer:
+            logging.error("No printer specified and no default printer could be found.")
+            return False
+
+        logging.info(
+            "Sending %d documents to printer '%s' as one job...", len(abs_paths), target_printer
+        )
+        is_raw = all(path.lower().endswith(self.RAW_EXTENSIONS) for path in abs_paths)
+        return self._print_linux(abs_paths, target_printer, raw=is_raw)
+
+    def can_print_streams(self, names: Sequence[str]) -> bool:
+        """
+        Whether documents with these file names can be printed from memory:
+        always on Linux; on Windows only printer-native ones, because
+        ShellExecute needs a file.
+        """
+        if self.is_linux():
+            return True
+        if self.is_windows():
+            return all(name.lower().endswith(self.RAW_EXTENSIONS) for name in names)
+        return False
+
+    def print_streams(
+        self, documents: Sequence[Tuple[str, bytes]], printer_name: str = None
+    ) -> bool:
+        """
+        Print documents held in memory, given as (file name, data) pairs,
+        without writing them to disk. On Linux a single document is piped to
+        'lp' through stdin; several are passed to one 'lp' call (one CUPS job)
+        from a memory-backed temporary folder, removed once 'lp' has handed
+        them to CUPS. On Windows printer-native documents are sent as RAW jobs.
+
+        Returns:
+            bool: True if every document was dispatched successfully.
+        """
+        names = [name for name, _ in documents]
+        if not documents or not self.can_print_streams(names):
+            logging.error("These documents cannot be printed from memory -> %s", ", ".join(names))
+            return False
+
+        target_printer = printer_name or self.get_default_printer()
+        if not target_printer:
+            logging.error("No printer specified and no default printer could be found.")
+            return False
+
+        logging.info(
+            "Sending %d documents from memory to printer '%s'...", len(documents), target_printer
+        )
+        is_raw = all(name.lower().endswith(self.RAW_EXTENSIONS) for name in names)
+
+        if self.is_windows():
+            results = [
+                self._send_windows_raw(data, name, target_printer) for name, data in documents
+            ]
+            return all(results)
+
+        if len(documents) == 1:
+            name, data = documents[0]
+            return self._print_linux_stream(data, name, target_printer, raw=is_raw)
+
+        folder = self.SHM_FOLDER if os.path.isdir(self.SHM_FOLDER) else None
+        with tempfile.TemporaryDirectory(prefix="labels_", dir=folder) as tmp_folder:
+            paths = []
+            for name, data in documents:
+                path = os.path.join(tmp_folder, name)
+                with open(path, "wb") as f:
+                    f.write(data)
+                paths.append(path)
+            return self._print_linux(paths, target_printer, raw=is_raw)
+
     def _print_windows(self, file_path: str, printer_name: str) -> bool:
         """Dispatch a print job on Windows using ShellExecute."""
         if not win32api:
@@ -137,10 +243,59 @@ class PrinterManager:
             logging.error("Failed to execute print command on Windows: %s", e)
             return False
 
-    def _print_linux(self, file_path: str, printer_name: str) -> bool:
-        """Dispatch a print job on Linux using the 'lp' command."""
+    def _print_windows_raw(self, file_path: str, printer_name: str) -> bool:
+        """Send a printer-native file to the Windows spooler as a RAW job."""
+        with open(file_path, "rb") as f:
+            data = f.read()
+        return self._send_windows_raw(data, os.path.basename(file_path), printer_name)
+
+    def _send_windows_raw(self, data: bytes, document_name: str, printer_name: str) -> bool:
+        """Send printer-native data to the Windows spooler as a RAW job."""
+        if not win32print:
+            raise RuntimeError("Library 'pywin32' is not installed.")
+
+        try:
+            handle = win32print.OpenPrinter(printer_name)
+            try:
+                win32print.StartDocPrinter(handle, 1, (document_name, None, "RAW"))
+                try:
+                    win32print.StartPagePrinter(handle)
+                    win32print.WritePrinter(handle, data)
+                    win32print.EndPagePrinter(handle)
+                finally:
+                    win32print.EndDocPrinter(handle)
+            finally:
+                win32print.ClosePrinter(handle)
+            return True
+        except Exception as e:
+            logging.error("Failed to send raw print job on Windows: %s", e)
+            return False
+
+    def _print_linux(
+        self, file_paths: Union[str, List[str]], printer_name: str, raw: bool = False
+    ) -> bool:
+        """Dispatch one print job with one or more files on Linux using the 'lp' command."""
+        if isinstance(file_paths, str):
+            file_paths = [file_paths]
+        command = ["lp", "-d", printer_name]
+        if raw:
+            command += ["-o", "raw"]
+        try:
+            subprocess.run(command + file_paths, check=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            logging.error("Failed to execute print command on Linux: %s", e)
+            return False
+
+    def _print_linux_stream(
+        self, data: bytes, title: str, printer_name: str, raw: bool = False
+    ) -> bool:
+        """Dispatch one print job on Linux, piping the document to 'lp' through stdin."""
+        command = ["lp", "-d", printer_name, "-t", title]
+        if raw:
+            command += ["-o", "raw"]
         try:
-            subprocess.run(["lp", "-d", printer_name, file_path], check=True)
+            subprocess.run(command, input=data, check=True)
             return True
         except subprocess.CalledProcessError as e:
             logging.error("Failed to execute print command on Linux: %s", e)
@@ -0,0 +1,119 @@
+"""
+ZPL II output for Zebra thermal printers.
+Builds label formats from printer-native commands (text, boxes, lines,
+Code39 and QR barcodes), so the printer firmware renders the label instead
+of receiving a raster. Coordinates and sizes are in printer dots.
+"""
+
+from typing import Dict, List
+
+from src.utils.barcodes import code39_value, qr_matrix
+
+# Characters that must be hex-escaped inside ^FD field data (^FH)
+_ESCAPED = {"_": "_5F", "^": "_5E", "~": "_7E"}
+
+# Approximate advance of the scalable font 0 as a fraction of its height
+FONT0_WIDTH_RATIO = 0.55
+
+
+def field_data(text: str) -> str:
+    """Field data escaped for ^FH, so any text can be printed."""
+    return "^FH^FD" + "".join(_ESCAPED.get(c, c) for c in str(text)) + "^FS"
+
+
+def _field(value: str, field: int) -> str:
+    """Field data, or a ^FN placeholder filled in when a stored format is recalled."""
+    return f"^FN{field}^FS" if field else field_data(value)
+
+
+def recall_format(name: str, fields: Dict[int, str], copies: int = 1) -> str:
+    """
+    Prints a format stored with `ZplLabel.store`, filling its numbered fields.
+    Barcode field values must already be normalized (`code39_value`).
+    """
+    values = "".join(f"^FN{number}{field_data(value)}" for number, value in fields.items())
+    return f"^XA^CI28^XF{name}^FS{values}^PQ{copies}^XZ\n"
+
+
+def qr_modules(data: str) -> int:
+    """Number of modules per side of the QR code the printer will build for `data`."""
+    return len(qr_matrix(data))
+
+
+class ZplLabel:
+    """Accumulates the commands of one ZPL II label format."""
+
+    def __init__(self, width: int, height: int, inverted: bool = False) -> None:
+        self.width = width
+        self.height = height
+        self.inverted = inverted
+        self._commands: List[str] = []
+
+    def text(self, x: int, baseline: int, text: str, height: int, field: int = 0) -> None:
+        """Left-aligned text with its baseline at `baseline`; `field` makes it a ^FN field."""
+        if text or field:
+            self._commands.append(f"^FT{x},{baseline}^A0N,{height},{height}{_field(text, field)}")
+
+    def centered_text(self, center_x: int, baseline: int, text: str, height: int) -> None:
+        """Text centered horizontally on `center_x`."""
+        width = int(len(text) * height * FONT0_WIDTH_RATIO)
+        self.text(center_x - width // 2, baseline, text, height)
+
+    def text_block(
+        self, x: int, top: int, width: int, text: str, height: int, max_lines: int, spacing: int = 0
+    ) -> None:
+        """Text wrapped by the printer into at most `max_lines` lines of `width` dots."""
+        if text:
+            self._commands.append(
+                f"^FO{x},{top}^A0N,{height},{height}^FB{width},{max_lines},{spacing},L,0"
+                f"{field_data(text)}"
+            )
+
+    def box(self, x: int, y: int, width: int, height: int, thickness: int) -> None:
+        """Rectangle outline; a box as thin as its thickness draws a line."""
+        self._commands.append(f"^FO{x},{y}^GB{width},{height},{thickness}^FS")
+
+    def line(self, x1: int, y1: int, x2: int, y2: int, thickness: int) -> None:
+        """Straight line; diagonals are drawn with ^GD."""
+        half = thickness // 2
+        if y1 == y2:
+            self.box(min(x1, x2), y1 - half, abs(x2 - x1), thickness, thickness)
+        elif x1 == x2:
+            self.box(x1 - half, min(y1, y2), thickness, abs(y2 - y1), thickness)
+        else:
+            # 'L' leans like "\" (down to the right), 'R' like "/"
+            orientation = "L" if (x2 - x1) * (y2 - y1) > 0 else "R"
+            self._commands.append(
+                f"^FO{min(x1, x2)},{min(y1, y2)}"
+                f"^GD{abs(x2 - x1)},{abs(y2 - y1)},{thickness},B,{orientation}^FS"
+            )
+
+    def code39(
+        self, x: int, y: int, value: str, module: int, height: int, ratio: float = 2.0, field: int = 0
+    ) -> None:
+        """
+        Code39 barcode without check digit or interpretation line, top-left at
+        (x, y). The value is normalized like the PDF/PNG barcodes (upper case,
+        unencodable characters dropped), so every output encodes the same data.
+        """
+        value = code39_value(value) if value else value
+        if value or field:
+            self._commands.append(
+                f"^FO{x},{y}^BY{module},{ratio:.1f},{height}^B3N,N,{height},N,N{_field(value, field)}"
+            )
+
+    def qr(self, x: int, y: int, data: str, size: int) -> None:
+        """QR code (error correction M) scaled to fit in `size` dots, top-left at (x, y)."""
+        magnification = max(1, min(10, size // qr_modules(data)))
+        self._commands.append(f"^FO{x},{y}^BQN,2,{magnification}{field_data('MA,' + data)}")
+
+    def _header(self) -> str:
+        return f"^CI28^PW{self.width}^LL{self.height}^PO{'I' if self.inverted else 'N'}"
+
+    def render(self, copies: int = 1) -> str:
+        """The label format, printed `copies` times."""
+        return "^XA" + self._header() + "".join(self._commands) + f"^PQ{copies}^XZ\n"
+
+    def store(self, name: str) -> str:
+        """Saves the format on the printer as `name` (e.g. "R:LABEL.ZPL") without printing it."""
+        return f"^XA^DF{name}^FS" + self._header() + "".join(self._commands) + "^XZ\n"